@@ -0,0 +1,69 @@
+"""
+Synthetic MAS model outputs for benchmarking.
+
+The benchmarks run offline, so instead of the sample data they use synthetic
+MAS outputs written by `psipy.data.synthetic`.
+"""
+from pathlib import Path
+
+# psipy only imports scipy when it is first needed, so it is imported here to
+# make sure the import time isn't included in the benchmarks
+import scipy.interpolate  # noqa: F401
+import scipy.sparse  # noqa: F401
+
+from psipy.data.synthetic import write_mas_run
+
+#: (n_phi, n_theta, n_r) shape of cell centred variables for each benchmark
+#: grid size. "medium" is the same size as the MAS sample data.
+GRID_SIZES = {
+    "small": (64, 56, 71),
+    "medium": (128, 111, 141),
+    "large": (256, 222, 282),
+}
+
+
+def make_mas_run(directory, size, timesteps=(1,)):
+    """
+    Write a synthetic MAS run with rho, br, bt, and bp variables.
+
+    Parameters
+    ----------
+    directory : pathlib.Path
+        Directory to write files to. Created if it doesn't exist.
+    size : str
+        Grid size, one of the keys of `GRID_SIZES`.
+    timesteps : tuple of int
+        Timesteps to write.
+
+    Returns
+    -------
+    pathlib.Path
+        The directory.
+    """
+    return write_mas_run(
+        directory,
+        GRID_SIZES[size],
+        timesteps=timesteps,
+        variables=("rho", "br", "bt", "bp"),
+    )
+
+
+def make_mas_runs(sizes=tuple(GRID_SIZES), directory="psipy-benchmark-data"):
+    """
+    Write a synthetic MAS run for each of the given grid sizes.
+
+    Parameters
+    ----------
+    sizes : list of str, optional
+        Grid sizes, each one of the keys of `GRID_SIZES`. Defaults to all
+        the grid sizes.
+    directory : pathlib.Path, str
+        Directory to write a subdirectory for each run to.
+
+    Returns
+    -------
+    dict
+        Mapping of grid size names to run directories.
+    """
+    directory = Path(directory).resolve()
+    return {size: str(make_mas_run(directory / size, size)) for size in sizes}
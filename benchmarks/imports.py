@@ -0,0 +1,19 @@
+"""
+Benchmarks for the time taken to import psipy.
+"""
+
+
+def timeraw_import_psipy():
+    return "import psipy"
+
+
+def timeraw_import_model():
+    return "import psipy.model"
+
+
+def timeraw_import_io():
+    return "import psipy.io"
+
+
+def timeraw_import_tracing():
+    return "import psipy.tracing"
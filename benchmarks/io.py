@@ -0,0 +1,41 @@
+"""
+Benchmarks for reading model output files.
+"""
+import astropy.units as u
+
+from psipy.io import read_mas_file
+from psipy.model import MASOutput
+from .common import GRID_SIZES, make_mas_runs
+
+
+class ReadMAS:
+    params = list(GRID_SIZES)
+    param_names = ["grid"]
+    timeout = 300
+
+    def setup_cache(self):
+        return make_mas_runs()
+
+    def time_read_mas_file(self, runs, grid):
+        read_mas_file(runs[grid], "rho")
+
+    def peakmem_read_mas_file(self, runs, grid):
+        read_mas_file(runs[grid], "rho")
+
+    def time_read_mas_file_bounded(self, runs, grid):
+        read_mas_file(runs[grid], "rho", r=(None, 10))
+
+    def time_open_model(self, runs, grid):
+        MASOutput(runs[grid]).variables
+
+    def time_load_variable(self, runs, grid):
+        MASOutput(runs[grid])["rho"]
+
+    def peakmem_load_variable(self, runs, grid):
+        MASOutput(runs[grid])["rho"]
+
+    def time_load_variable_float64(self, runs, grid):
+        MASOutput(runs[grid], dtype="float64")["rho"]
+
+    def time_change_units(self, runs, grid):
+        MASOutput(runs[grid])["rho"].unit = u.m**-3
@@ -0,0 +1,50 @@
+"""
+Benchmarks for plotting model variables.
+"""
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+
+from psipy.model import MASOutput  # noqa: E402
+from .common import GRID_SIZES, make_mas_runs  # noqa: E402
+
+
+class PlotCuts:
+    params = list(GRID_SIZES)
+    param_names = ["grid"]
+    timeout = 300
+
+    def setup_cache(self):
+        return make_mas_runs()
+
+    def setup(self, runs, grid):
+        self.rho = MASOutput(runs[grid])["rho"]
+        self.fig = plt.figure()
+
+    def teardown(self, runs, grid):
+        plt.close("all")
+
+    def _draw(self):
+        self.fig.canvas.draw()
+
+    def time_plot_radial_cut(self, runs, grid):
+        self.rho.plot_radial_cut(0, 0, ax=self.fig.add_subplot())
+        self._draw()
+
+    def peakmem_plot_radial_cut(self, runs, grid):
+        self.rho.plot_radial_cut(0, 0, ax=self.fig.add_subplot())
+        self._draw()
+
+    def time_plot_phi_cut(self, runs, grid):
+        self.rho.plot_phi_cut(0, 0, ax=self.fig.add_subplot(projection="polar"))
+        self._draw()
+
+    def time_plot_equatorial_cut(self, runs, grid):
+        self.rho.plot_equatorial_cut(0, ax=self.fig.add_subplot(projection="polar"))
+        self._draw()
+
+    def time_contour_radial_cut(self, runs, grid):
+        self.rho.contour_radial_cut(0, [1e-2], 0, ax=self.fig.add_subplot())
+        self._draw()
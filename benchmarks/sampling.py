@@ -0,0 +1,69 @@
+"""
+Benchmarks for sampling model variables.
+"""
+import astropy.units as u
+import numpy as np
+
+from psipy.model import MASOutput
+from .common import GRID_SIZES, make_mas_runs
+
+
+class SampleAtCoords:
+    params = (list(GRID_SIZES), [100, 10_000])
+    param_names = ["grid", "n_points"]
+    timeout = 300
+
+    def setup_cache(self):
+        return make_mas_runs()
+
+    def setup(self, runs, grid, n_points):
+        self.rho = MASOutput(runs[grid])["rho"]
+        rng = np.random.default_rng(0)
+        self.lon = rng.uniform(0, 2 * np.pi, n_points) * u.rad
+        self.lat = rng.uniform(-np.pi / 2, np.pi / 2, n_points) * u.rad
+        self.r = rng.uniform(2, 25, n_points) * u.R_sun
+
+    def time_sample_at_coords(self, runs, grid, n_points):
+        self.rho.sample_at_coords(self.lon, self.lat, self.r)
+
+    def peakmem_sample_at_coords(self, runs, grid, n_points):
+        self.rho.sample_at_coords(self.lon, self.lat, self.r)
+
+    def time_sample_radial_normalized(self, runs, grid, n_points):
+        self.rho.radial_normalized(-2).sample_at_coords(self.lon, self.lat, self.r)
+
+
+class SampleTrajectories:
+    """
+    Sample several variables along a dozen spacecraft trajectories.
+    """
+
+    params = (list(GRID_SIZES), [1_000, 100_000])
+    param_names = ["grid", "n_points"]
+    timeout = 300
+    variables = ["rho", "br", "bt", "bp"]
+
+    def setup_cache(self):
+        return make_mas_runs()
+
+    def setup(self, runs, grid, n_points):
+        self.model = MASOutput(runs[grid])
+        self.model.load_many(self.variables)
+        rng = np.random.default_rng(0)
+        n = n_points // 12
+        self.trajectories = {
+            f"spacecraft_{i}": (
+                rng.uniform(0, 2 * np.pi, n) * u.rad,
+                rng.uniform(-np.pi / 2, np.pi / 2, n) * u.rad,
+                rng.uniform(2, 25, n) * u.R_sun,
+            )
+            for i in range(12)
+        }
+
+    def time_sample_at_coords_loop(self, runs, grid, n_points):
+        for var in self.variables:
+            for lon, lat, r in self.trajectories.values():
+                self.model[var].sample_at_coords(lon, lat, r)
+
+    def time_sample_trajectories(self, runs, grid, n_points):
+        self.model.sample_trajectories(self.variables, self.trajectories)
@@ -0,0 +1,131 @@
+"""
+Benchmarks for tracing magnetic field lines.
+"""
+import tempfile
+from pathlib import Path
+
+import astropy.units as u
+import numpy as np
+
+from psipy.model import MASOutput
+from psipy.tracing import FieldLines, FootpointMap, FortranTracer
+from .common import GRID_SIZES, make_mas_runs
+
+
+def _seeds(n_seeds):
+    rng = np.random.default_rng(0)
+    return {
+        "r": rng.uniform(2, 25, n_seeds) * u.R_sun,
+        "lat": rng.uniform(-60, 60, n_seeds) * u.deg,
+        "lon": rng.uniform(0, 360, n_seeds) * u.deg,
+    }
+
+
+class Trace:
+    params = (list(GRID_SIZES), [10, 1000])
+    param_names = ["grid", "n_seeds"]
+    timeout = 300
+
+    def setup_cache(self):
+        return make_mas_runs()
+
+    def setup(self, runs, grid, n_seeds):
+        self.model = MASOutput(runs[grid])
+        self.model.load_many(["br", "bt", "bp"])
+        self.tracer = FortranTracer()
+        self.seeds = _seeds(n_seeds)
+
+    def time_trace(self, runs, grid, n_seeds):
+        self.tracer.trace(self.model, **self.seeds)
+
+    def peakmem_trace(self, runs, grid, n_seeds):
+        self.tracer.trace(self.model, **self.seeds)
+
+
+class FieldLinesIO:
+    params = [10, 1000]
+    param_names = ["n_seeds"]
+    timeout = 300
+
+    def setup_cache(self):
+        return make_mas_runs(["small"])
+
+    def setup(self, runs, n_seeds):
+        model = MASOutput(runs["small"])
+        self.flines = FortranTracer().trace(model, **_seeds(n_seeds))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / "flines.npz"
+        self.flines.save(self.path)
+
+    def teardown(self, runs, n_seeds):
+        self.tmpdir.cleanup()
+
+    def time_save(self, runs, n_seeds):
+        self.flines.save(self.path)
+
+    def time_load(self, runs, n_seeds):
+        FieldLines.load(self.path)
+
+    def peakmem_load(self, runs, n_seeds):
+        FieldLines.load(self.path)
+
+
+class SampleFieldLines:
+    params = ([1000, 100_000], ["sample", "loop"])
+    param_names = ["n_flines", "method"]
+    timeout = 300
+
+    def setup_cache(self):
+        return make_mas_runs(["medium"])
+
+    def setup(self, runs, n_flines, method):
+        if method == "loop" and n_flines > 1000:
+            # Too slow to be worth running
+            raise NotImplementedError
+        self.rho = MASOutput(runs["medium"])["rho"]
+        rng = np.random.default_rng(0)
+        xs = [
+            np.column_stack(
+                [
+                    rng.uniform(0, 2 * np.pi, 50),
+                    rng.uniform(-1.4, 1.4, 50),
+                    rng.uniform(2, 25, 50),
+                ]
+            )
+            for _ in range(n_flines)
+        ]
+        self.flines = FieldLines(xs, u.R_sun)
+
+    def time_sample(self, runs, n_flines, method):
+        if method == "sample":
+            self.flines.sample(self.rho)
+        else:
+            for fline in self.flines:
+                self.rho.sample_at_coords(fline.lon, fline.lat, fline.r)
+
+
+class Footpoints:
+    params = ([1000, 100_000], ["map", "trace"])
+    param_names = ["n_points", "method"]
+    timeout = 300
+
+    def setup_cache(self):
+        return make_mas_runs(["small"])
+
+    def setup(self, runs, n_points, method):
+        if method == "trace" and n_points > 1000:
+            # Too slow to be worth running
+            raise NotImplementedError
+        self.model = MASOutput(runs["small"])
+        self.tracer = FortranTracer()
+        self.points = _seeds(n_points)
+        self.points["r"] = np.full(n_points, 20) * u.R_sun
+        self.map = FootpointMap.build(
+            self.tracer, self.model, 20 * u.R_sun, shape=(90, 45)
+        )
+
+    def time_footpoints(self, runs, n_points, method):
+        if method == "map":
+            self.map(self.points["lon"], self.points["lat"])
+        else:
+            self.tracer.trace(self.model, **self.points)
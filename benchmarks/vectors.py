@@ -0,0 +1,61 @@
+"""
+Benchmarks for assembling vector fields from staggered components, and
+regridding variables.
+"""
+import numpy as np
+
+from psipy.model import MASOutput
+from psipy.model.regrid import _cached_regridder
+from .common import GRID_SIZES, make_mas_runs
+
+
+class CellCornerB:
+    params = list(GRID_SIZES)
+    param_names = ["grid"]
+    timeout = 300
+
+    def setup_cache(self):
+        return make_mas_runs()
+
+    def setup(self, runs, grid):
+        self.model = MASOutput(runs[grid])
+        self.model.load_many(["br", "bt", "bp"])
+
+    def time_cell_corner_b(self, runs, grid):
+        self.model.cell_corner_b()
+
+    def peakmem_cell_corner_b(self, runs, grid):
+        self.model.cell_corner_b()
+
+    def time_load_and_cell_corner_b(self, runs, grid):
+        MASOutput(runs[grid]).cell_corner_b()
+
+
+class Regrid:
+    params = list(GRID_SIZES)
+    param_names = ["grid"]
+    timeout = 300
+
+    def setup_cache(self):
+        return make_mas_runs()
+
+    def setup(self, runs, grid):
+        self.model = MASOutput(runs[grid])
+        self.variables = self.model.load_many(["rho", "br", "bt", "bp"])
+        for var in self.variables:
+            var.data
+        self.target = dict(
+            phi=np.linspace(0, 2 * np.pi, 180, endpoint=False),
+            theta=np.linspace(-np.pi / 2, np.pi / 2, 90),
+            r=np.linspace(1, 30, 100) * self.variables[0].r_coords.unit,
+        )
+
+    def time_regrid_variables(self, runs, grid):
+        # Includes calculating the weights for each source grid
+        _cached_regridder.cache_clear()
+        for var in self.variables:
+            var.regrid(**self.target)
+
+    def time_regrid_cached(self, runs, grid):
+        for var in self.variables:
+            var.regrid(**self.target)
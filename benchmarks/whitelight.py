@@ -0,0 +1,25 @@
+"""
+Benchmarks for synthetic white-light images.
+"""
+import astropy.units as u
+
+from psipy.model import MASOutput, thomson_image
+from .common import make_mas_run
+
+
+class ThomsonImage:
+    params = [512, 2048]
+    param_names = ["resolution"]
+    timeout = 600
+
+    def setup_cache(self):
+        return str(make_mas_run("psipy-benchmark-data/medium", "medium"))
+
+    def setup(self, directory, resolution):
+        self.rho = MASOutput(directory)["rho"]
+
+    def time_thomson_image(self, directory, resolution):
+        thomson_image(self.rho, 30 * u.deg, 5 * u.deg, shape=resolution)
+
+    def peakmem_thomson_image(self, directory, resolution):
+        thomson_image(self.rho, 30 * u.deg, 5 * u.deg, shape=resolution)
@@ -1,6 +1,32 @@
-from pkg_resources import DistributionNotFound, get_distribution
+import importlib
 
 try:
-    __version__ = get_distribution(__name__).version
-except DistributionNotFound:
+    from importlib.metadata import PackageNotFoundError
+    from importlib.metadata import version as _version
+except ImportError:  # Python 3.7
+    from pkg_resources import DistributionNotFound as PackageNotFoundError
+    from pkg_resources import get_distribution
+
+    def _version(name):
+        return get_distribution(name).version
+
+
+try:
+    __version__ = _version(__name__)
+except PackageNotFoundError:
     pass  # package is not installed
+
+# Sub-packages are only imported when first accessed, so that importing
+# psipy (or one of its sub-packages) doesn't import heavy dependencies that
+# are not needed.
+_submodules = ["data", "io", "model", "tracing", "util", "visualization"]
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + _submodules)
@@ -8,7 +8,7 @@ from pathlib import Path
 import pytest
 from pytest_cases import fixture, fixture_union
 
-from psipy.data import sample_data
+from psipy.data import sample_data, synthetic
 from psipy.model import mas, pluto
 
 test_data_dir = (Path(__file__) / ".." / ".." / "data").resolve()
@@ -74,3 +74,23 @@ def pluto_model():
 
 
 fixture_union("model", [mas_model, pluto_model])
+
+
+@fixture(scope="session")
+def synthetic_mas_directory(tmp_path_factory) -> Path:
+    """
+    A synthetic MAS run, which can be used without downloading any data.
+    """
+    return synthetic.write_mas_run(
+        tmp_path_factory.mktemp("mas_synthetic"), timesteps=[1, 2]
+    )
+
+
+@fixture(scope="session")
+def synthetic_pluto_directory(tmp_path_factory) -> Path:
+    """
+    A synthetic PLUTO run, which can be used without downloading any data.
+    """
+    return synthetic.write_pluto_run(
+        tmp_path_factory.mktemp("pluto_synthetic"), timesteps=[0, 1]
+    )
@@ -1 +1,2 @@
 from .sample_data import *
+from .synthetic import *
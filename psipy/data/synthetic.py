@@ -0,0 +1,336 @@
+"""
+Functions for writing synthetic model output data.
+
+The outputs have the same file formats, grids, and variable names as real
+model outputs, but contain analytic fields. They can be written at any
+resolution and for any number of timesteps, so they are useful for testing
+and benchmarking without downloading the sample data.
+"""
+import os
+from pathlib import Path
+from typing import Sequence, Tuple
+
+import numpy as np
+
+__all__ = ["write_mas_run", "write_pluto_run"]
+
+
+# Mesh each variable is defined on along the (phi, theta, r) axes. 'main' is
+# the mesh of cell edges, and 'half' the mesh of cell centres. This follows
+# the staggered grid of MAS outputs, where vector components are on the main
+# mesh along their own direction and the half mesh along the others.
+_mas_meshes = {
+    "rho": ("half", "half", "half"),
+    "t": ("half", "half", "half"),
+    "p": ("half", "half", "half"),
+    "br": ("half", "half", "main"),
+    "bt": ("half", "main", "half"),
+    "bp": ("main", "half", "half"),
+    "vr": ("half", "half", "main"),
+    "vt": ("half", "main", "half"),
+    "vp": ("main", "half", "half"),
+}
+_pluto_variables = ["rho", "prs", "vx1", "vx2", "vx3", "Bx1", "Bx2", "Bx3"]
+
+# Tilt of the magnetic dipole axis from the rotation axis
+_dipole_tilt = np.deg2rad(15)
+# Longitude the dipole rotates by every timestep
+_rotation_per_step = np.deg2rad(5)
+
+
+def _stretched_edges(lo, hi, n, ratio):
+    """
+    Get ``n`` cell edges between ``lo`` and ``hi``, where the last cell is
+    ``ratio`` times as wide as the first.
+    """
+    widths = ratio ** np.linspace(0, 1, n - 1)
+    edges = np.concatenate([[0], np.cumsum(widths)])
+    return lo + (hi - lo) * edges / edges[-1]
+
+
+def _phi_chunks(shape, chunk_size=2**24):
+    """
+    Split the phi axis of an array into chunks of about ``chunk_size`` bytes
+    (of double precision data), so large arrays are never held in memory.
+    """
+    row_bytes = 8 * int(np.prod(shape[1:]))
+    step = max(chunk_size // row_bytes, 1)
+    for start in range(0, shape[0], step):
+        yield start, min(start + step, shape[0])
+
+
+def _mas_meshes_for_shape(shape, r_range):
+    """
+    Get the main and half meshes along each axis of a MAS grid.
+
+    ``shape`` is the shape of variables on the half mesh. Like MAS, the half
+    mesh in theta and r has a ghost cell beyond each boundary, and the phi
+    meshes are periodic.
+    """
+    n_phi, n_theta, n_r = shape
+    p_main = np.linspace(0, 2 * np.pi, n_phi, endpoint=False)
+    p_half = p_main + np.pi / n_phi
+
+    # Cells get smaller towards the equator in theta, and larger with height
+    # in r
+    x = np.linspace(-1, 1, n_theta - 1)
+    t_main = np.pi / 2 * (1 + (x + x**3) / 2)
+    r_main = _stretched_edges(*r_range, n_r - 1, ratio=10)
+
+    meshes = []
+    for main in [t_main, r_main]:
+        centres = (main[1:] + main[:-1]) / 2
+        ghosts = [2 * main[0] - centres[0], 2 * main[-1] - centres[-1]]
+        meshes.append((main, np.concatenate([[ghosts[0]], centres, [ghosts[1]]])))
+    return {"phi": (p_main, p_half), "theta": meshes[0], "r": meshes[1]}
+
+
+def _dipole_field(phi, theta, r, step):
+    """
+    Get the spherical components of a tilted dipole magnetic field, and the
+    cosine of the magnetic colatitude.
+    """
+    phi = phi - step * _rotation_per_step
+    cos_tilt, sin_tilt = np.cos(_dipole_tilt), np.sin(_dipole_tilt)
+    # Unit vector along the dipole axis in spherical components
+    m_r = cos_tilt * np.cos(theta) + sin_tilt * np.sin(theta) * np.cos(phi)
+    m_t = -cos_tilt * np.sin(theta) + sin_tilt * np.cos(theta) * np.cos(phi)
+    m_p = -sin_tilt * np.sin(phi)
+    # B = (3 (m . r) r - m) / r**3
+    return (2 * m_r / r**3, -m_t / r**3, -m_p / r**3), m_r
+
+
+def _mas_variable(var, phi, theta, r, step):
+    """
+    Get the data for a synthetic MAS variable, in MAS code units.
+    """
+    P, T, R = np.meshgrid(phi, theta, r, indexing="ij")
+    b, cos_mag_colat = _dipole_field(P, T, R, step)
+    if var in ["br", "bt", "bp"]:
+        return b[["br", "bt", "bp"].index(var)]
+
+    # Slow, dense wind around the magnetic equator and fast wind elsewhere
+    streamer = np.exp(-((cos_mag_colat / 0.3) ** 2))
+    rho = (1 + 2 * streamer) / R**2
+    temperature = 0.05 * (1 + streamer) / np.sqrt(R)
+    if var == "rho":
+        return rho
+    elif var == "t":
+        return temperature
+    elif var == "p":
+        return rho * temperature
+    elif var == "vr":
+        return (1.5 - 0.8 * streamer) * (1 - 0.9 * np.exp(-(R - 1) / 5))
+    elif var == "vt":
+        return 0.01 * np.sin(2 * T) / R
+    elif var == "vp":
+        return 0.01 * np.sin(T) / R
+
+
+def _pluto_variable(var, phi, theta, r, step):
+    """
+    Get the data for a synthetic PLUTO variable.
+    """
+    P, T, R = np.meshgrid(phi, theta, r, indexing="ij")
+    _, cos_mag_colat = _dipole_field(P, T, R, step)
+    # Slow, dense wind around the current sheet and fast wind elsewhere
+    streamer = np.exp(-((cos_mag_colat / 0.1) ** 2))
+    vr = 1 - 0.5 * streamer
+    br = np.tanh(cos_mag_colat / 0.05) / (100 * R**2)
+    if var == "rho":
+        return (1 + 4 * streamer) / R**2
+    elif var == "prs":
+        return (1 + 4 * streamer) / R ** (10 / 3)
+    elif var == "vx1":
+        return vr
+    elif var == "Bx1":
+        return br
+    elif var == "Bx3":
+        # Parker spiral
+        return -br * R * np.sin(T) / vr
+    return np.zeros_like(R)
+
+
+def _write_hdf4(path, coords, compute):
+    from pyhdf.SD import SD, SDC
+
+    shape = [len(c) for c in coords]
+    sd_id = SD(str(path), SDC.WRITE | SDC.CREATE | SDC.TRUNC)
+    try:
+        sds_id = sd_id.create("Data-Set-2", SDC.FLOAT32, shape)
+        for i, coord in enumerate(coords):
+            dim = sds_id.dim(i)
+            dim.setname(f"fakeDim{i}")
+            dim.setscale(SDC.FLOAT32, coord.tolist())
+        for start, stop in _phi_chunks(shape):
+            sds_id[start:stop] = compute(start, stop)
+        sds_id.endaccess()
+    finally:
+        sd_id.end()
+
+
+def _write_hdf5(path, coords, compute):
+    import h5py as h5
+
+    shape = [len(c) for c in coords]
+    with h5.File(path, "w") as f:
+        dataset = f.create_dataset("Data", shape=shape, dtype=np.float32)
+        for start, stop in _phi_chunks(shape):
+            dataset[start:stop] = compute(start, stop)
+        # The dimension scales are stored in the opposite order to the data
+        # axes in MAS files
+        for i, coord in enumerate(coords[::-1]):
+            name = f"dim{i + 1}"
+            f[name] = coord
+            f[name].make_scale()
+            dataset.dims[i].attach_scale(f[name])
+
+
+def write_mas_run(
+    directory: os.PathLike,
+    shape: Tuple[int, int, int] = (128, 111, 141),
+    *,
+    timesteps: Sequence[int] = (1,),
+    variables: Sequence[str] = ("rho", "br", "bt", "bp", "vr", "vt", "vp"),
+    file_format: str = "h5",
+    r_range: Tuple[float, float] = (1, 30),
+) -> Path:
+    """
+    Write a synthetic MAS run.
+
+    The magnetic field is a dipole tilted from the rotation axis, which
+    rotates in longitude from one timestep to the next. The density,
+    temperature, pressure and velocity have a slow, dense wind around the
+    magnetic equator. Each variable is written on the same staggered grid
+    as in MAS outputs, which is non-uniform in theta and r.
+
+    Parameters
+    ----------
+    directory :
+        Directory to write files to. It is created if it doesn't exist.
+    shape : tuple of int
+        Shape of variables defined at the cell centres (e.g. ``rho``) along
+        the (phi, theta, r) axes. The default is the same shape as the MAS
+        sample data.
+    timesteps : sequence of int
+        Timesteps to write.
+    variables : sequence of str
+        Variables to write. Must be a subset of 'rho', 't', 'p', 'br', 'bt',
+        'bp', 'vr', 'vt', and 'vp'.
+    file_format : {'h5', 'hdf'}
+        Write HDF5 ('h5') or HDF4 ('hdf') files.
+    r_range : tuple of float
+        Inner and outer radial boundaries, in solar radii.
+
+    Returns
+    -------
+    pathlib.Path
+        The directory.
+    """
+    unknown = set(variables) - set(_mas_meshes)
+    if unknown:
+        raise ValueError(
+            f"Unknown variables {sorted(unknown)}, variables must be a subset "
+            f"of {list(_mas_meshes)}"
+        )
+    writers = {"h5": _write_hdf5, "hdf": _write_hdf4}
+    if file_format not in writers:
+        raise ValueError(f"file_format must be one of {list(writers)}")
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    meshes = _mas_meshes_for_shape(shape, r_range)
+    for var in variables:
+        phi, theta, r = [
+            meshes[axis][mesh == "half"].astype(np.float32)
+            for axis, mesh in zip(["phi", "theta", "r"], _mas_meshes[var])
+        ]
+        for step in timesteps:
+
+            def compute(start, stop):
+                data = _mas_variable(var, phi[start:stop], theta, r, step)
+                return data.astype(np.float32)
+
+            writers[file_format](
+                directory / f"{var}{step:03}.{file_format}", [phi, theta, r], compute
+            )
+    return directory
+
+
+def write_pluto_run(
+    directory: os.PathLike,
+    shape: Tuple[int, int, int] = (128, 111, 141),
+    *,
+    timesteps: Sequence[int] = (0,),
+    variables: Sequence[str] = ("rho", "Bx1", "Bx2", "Bx3"),
+    r_range: Tuple[float, float] = (0.1, 1.1),
+) -> Path:
+    """
+    Write a synthetic PLUTO run.
+
+    The magnetic field is a Parker spiral, whose polarity changes across a
+    current sheet tilted from the equator. The current sheet rotates in
+    longitude from one timestep to the next. All variables are defined at
+    the cell centres of a grid that is uniform in phi and theta, and
+    logarithmically spaced in r.
+
+    Parameters
+    ----------
+    directory :
+        Directory to write files to. It is created if it doesn't exist.
+    shape : tuple of int
+        Shape of the variables along the (phi, theta, r) axes. The default is
+        the same shape as the PLUTO sample data.
+    timesteps : sequence of int
+        Timesteps to write.
+    variables : sequence of str
+        Variables to write. Must be a subset of 'rho', 'prs', 'vx1', 'vx2',
+        'vx3', 'Bx1', 'Bx2', and 'Bx3'.
+    r_range : tuple of float
+        Inner and outer radial boundaries, in AU.
+
+    Returns
+    -------
+    pathlib.Path
+        The directory.
+    """
+    unknown = set(variables) - set(_pluto_variables)
+    if unknown:
+        raise ValueError(
+            f"Unknown variables {sorted(unknown)}, variables must be a subset "
+            f"of {_pluto_variables}"
+        )
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    n_phi, n_theta, n_r = shape
+    edges = [
+        np.geomspace(*r_range, n_r + 1),
+        np.linspace(0, np.pi, n_theta + 1),
+        np.linspace(0, 2 * np.pi, n_phi + 1),
+    ]
+
+    # Grid file, with the edges of each cell along the r, theta, phi axes
+    with open(directory / "grid.out", "w") as f:
+        f.write("# GEOMETRY:   SPHERICAL\n")
+        for edge in edges:
+            f.write(f"{len(edge) - 1}\n")
+            for i, (lo, hi) in enumerate(zip(edge[:-1], edge[1:])):
+                f.write(f" {i + 1}  {lo:.12e}    {hi:.12e}\n")
+
+    # Log file listing the timesteps and variables in the output files
+    with open(directory / "dbl.out", "w") as f:
+        for step in timesteps:
+            f.write(
+                f"{step} {step * 1e-2:.6e} {1e-4:.6e} {step * 100} "
+                f"multiple_files little {' '.join(variables)}\n"
+            )
+
+    r, theta, phi = [(edge[1:] + edge[:-1]) / 2 for edge in edges]
+    for var in variables:
+        for step in timesteps:
+            with open(directory / f"{var}.{step:04}.dbl", "wb") as f:
+                for start, stop in _phi_chunks(shape):
+                    data = _pluto_variable(var, phi[start:stop], theta, r, step)
+                    f.write(data.astype("<f8").tobytes())
+    return directory
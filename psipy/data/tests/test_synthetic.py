@@ -0,0 +1,98 @@
+import astropy.units as u
+import numpy as np
+import pytest
+
+from psipy.conftest import get_mas_directory
+from psipy.data import synthetic
+from psipy.model import MASOutput, PLUTOOutput
+from psipy.tracing import FortranTracer
+
+
+def test_mas_run(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    saved = set(model.variables) - set(model.derived_variables)
+    assert saved == {"bp", "br", "bt", "rho", "vp", "vr", "vt"}
+    rho = model["rho"]
+    assert rho.data.shape == (128, 111, 141, 2)
+    assert rho.data.dtype == np.float32
+    assert list(rho.time_coords) == [1, 2]
+    # Check the grid is staggered in the same way as MAS outputs
+    for var in ["br", "vr"]:
+        assert model[var].data.shape == (128, 111, 140, 2)
+        np.testing.assert_allclose(model[var].r_coords[0], 1 * u.R_sun)
+    for var in ["bt", "vt"]:
+        assert model[var].data.shape == (128, 110, 141, 2)
+        np.testing.assert_allclose(
+            model[var].theta_coords[[0, -1]], [-np.pi / 2, np.pi / 2]
+        )
+    for var in ["bp", "vp"]:
+        assert model[var].data.shape == (128, 111, 141, 2)
+        np.testing.assert_allclose(model[var].phi_coords[0], 0)
+    # Check the grid is non-uniform
+    assert not np.allclose(np.diff(rho.r_coords), np.diff(rho.r_coords)[0])
+    assert not np.allclose(np.diff(rho.theta_coords), np.diff(rho.theta_coords)[0])
+
+
+def test_mas_run_matches_sample_data(synthetic_mas_directory):
+    # Variables are on the same grids as the MAS sample data
+    directory = get_mas_directory("mas_hdf5")
+    sample = MASOutput(directory)
+    model = MASOutput(synthetic_mas_directory)
+    # Coordinates on the main mesh start at the lower boundary of the domain
+    boundaries = {"phi": 0, "theta": -np.pi / 2, "r": 1}
+    for var in ["rho", "br", "bt", "bp", "vr", "vt", "vp"]:
+        assert model[var].data.shape[:3] == sample[var].data.shape[:3]
+        for dim, boundary in boundaries.items():
+            on_main = [
+                np.isclose(m[var].data.coords[dim][0], boundary, atol=1e-6)
+                for m in [model, sample]
+            ]
+            assert on_main[0] == on_main[1], (var, dim)
+
+
+def test_mas_run_trace(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    flines = FortranTracer().trace(
+        model, lon=[0, 90] * u.deg, lat=[10, 60] * u.deg, r=[2, 2] * u.R_sun
+    )
+    assert len(flines) == 2
+
+
+def test_mas_run_hdf4(tmp_path):
+    synthetic.write_mas_run(tmp_path / "h5", (16, 11, 21), variables=["rho"])
+    synthetic.write_mas_run(
+        tmp_path / "hdf", (16, 11, 21), variables=["rho"], file_format="hdf"
+    )
+    assert (tmp_path / "hdf" / "rho001.hdf").exists()
+    np.testing.assert_equal(
+        MASOutput(tmp_path / "hdf")["rho"].data.values,
+        MASOutput(tmp_path / "h5")["rho"].data.values,
+    )
+
+
+def test_mas_run_errors(tmp_path):
+    with pytest.raises(ValueError, match="Unknown variables"):
+        synthetic.write_mas_run(tmp_path, variables=["rho", "not_a_var"])
+    with pytest.raises(ValueError, match="file_format must be one of"):
+        synthetic.write_mas_run(tmp_path, file_format="nc")
+
+
+def test_pluto_run(synthetic_pluto_directory):
+    model = PLUTOOutput(synthetic_pluto_directory)
+    assert model.variables == ["Bx1", "Bx2", "Bx3", "rho"]
+    rho = model["rho"]
+    assert rho.data.shape == (128, 111, 141, 2)
+    assert list(rho.time_coords) == [0, 1]
+    np.testing.assert_allclose(
+        rho.r_coords[[0, -1]].to_value(u.AU), [0.1, 1.1], rtol=0.02
+    )
+
+    flines = FortranTracer().trace(
+        model, lon=[0, 90] * u.deg, lat=[10, 60] * u.deg, r=[0.5, 0.5] * u.AU
+    )
+    assert len(flines) == 2
+
+
+def test_pluto_run_errors(tmp_path):
+    with pytest.raises(ValueError, match="Unknown variables"):
+        synthetic.write_pluto_run(tmp_path, variables=["br"])
@@ -2,6 +2,7 @@
 I/O tools.
 """
 
+from .manifest import *
 from .mas import *
 from .pluto import *
 from .util import *
@@ -0,0 +1,265 @@
+"""
+Tools for writing and reading manifests of model output directories.
+
+A manifest is a JSON file saved in a model output directory that lists the
+output files, along with the variable, timestep, data shape, data type, size
+and modification time of each file. If a manifest is present, the directory
+does not need to be listed to find the variables and timesteps present,
+which can be slow for directories with many files (particularly on network
+filesystems).
+
+The manifest is only used if the directory has not been modified since the
+manifest was written (e.g. by adding or removing files). This is checked
+using the modification time of the directory. Each file is also checked
+against the manifest when it is read, and a warning raised if it has
+changed.
+
+Filesystems with coarse modification times (such as some network
+filesystems) don't update the modification time of the directory for changes
+made soon after the manifest is written. To catch these changes, the number
+of entries in the directory is compared with the manifest when a file is
+first read, and a warning raised if they differ. This needs the directory to
+be listed, so it is only done once for each modification time of the
+directory and manifest.
+"""
+import copy
+import functools
+import json
+import os
+import warnings
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import xarray as xr
+
+from .util import HDF4File, index_directory
+
+__all__ = ["write_manifest", "read_manifest", "MANIFEST_FILENAME"]
+
+MANIFEST_FILENAME = "psipy_manifest.json"
+_MANIFEST_VERSION = 2
+
+
+def write_manifest(directory: os.PathLike, model: str) -> Path:
+    """
+    Write a manifest of the model output files in a directory.
+
+    Parameters
+    ----------
+    directory :
+        Path to the folder containing the model output files.
+    model : {'mas', 'pluto'}
+        Model that created the files.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the manifest file.
+    """
+    from . import mas, pluto
+
+    parsers = {"mas": mas._parse_mas_filename, "pluto": pluto._parse_pluto_filename}
+    if model not in parsers:
+        raise ValueError(f"model must be one of {list(parsers)}, got '{model}'")
+
+    directory = Path(directory)
+    index = index_directory(directory, parsers[model])
+    if not len(index):
+        raise FileNotFoundError(f"No variable files found in {directory}")
+    if model == "pluto":
+        grid = pluto.read_pluto_grid(directory / "grid.out")
+        pluto_shape = [g.shape[0] for g in grid[::-1]]
+
+    files = []
+    for var, var_files in sorted(index.items()):
+        for timestep, path in var_files.items():
+            if path.suffix == ".dbl":
+                shape, dtype = pluto_shape, "float64"
+            else:
+                shape, dtype = _data_info(path, var)
+            stat = path.stat()
+            files.append(
+                {
+                    "var": var,
+                    "timestep": timestep,
+                    "filename": path.name,
+                    "shape": shape,
+                    "dtype": dtype,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+            )
+
+    manifest_path = directory / MANIFEST_FILENAME
+    manifest = {
+        "version": _MANIFEST_VERSION,
+        "model": model,
+        "n_entries": _count_entries(directory),
+        "files": files,
+    }
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+    # Writing the manifest modifies the directory, so set the manifest
+    # modification time to match. Any later changes to the directory will
+    # then make the directory newer than the manifest.
+    dir_stat = directory.stat()
+    os.utime(manifest_path, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+    return manifest_path
+
+
+def _count_entries(directory):
+    """
+    Count the entries in a directory, apart from the manifest itself.
+    """
+    ignore = {MANIFEST_FILENAME, Path(MANIFEST_FILENAME).with_suffix(".tmp").name}
+    return sum(name not in ignore for name in os.listdir(directory))
+
+
+def _data_info(path, var):
+    """
+    Get the shape and data type of the data in a single output file, without
+    reading the data.
+    """
+    if path.suffix == ".h5":
+        import h5py as h5
+
+        with h5.File(path, "r") as hdf5_file:
+            dataset = hdf5_file["Data"]
+            return list(dataset.shape), str(dataset.dtype)
+    elif path.suffix == ".hdf":
+        with HDF4File(path) as sd_id:
+            sds_id = sd_id.select("Data-Set-2")
+            rank, shape = sds_id.info()[1:3]
+            shape = [shape] if rank == 1 else list(shape)
+            # Read a single value to get the data type
+            value = sds_id.get(start=[0] * rank, count=[1] * rank)
+            return shape, str(np.asarray(value).dtype)
+    elif path.suffix == ".nc":
+        with xr.open_dataset(path) as data:
+            return list(data[var].shape), str(data[var].dtype)
+    raise ValueError(f"Unknown file type: {path}")
+
+
+def read_manifest(directory: os.PathLike, model: Optional[str] = None):
+    """
+    Read the manifest of a model output directory.
+
+    Parameters
+    ----------
+    directory :
+        Path to the folder containing the model output files.
+    model : {'mas', 'pluto'}, optional
+        If given, only return the manifest if it was written for this model.
+
+    Returns
+    -------
+    manifest : dict or None
+        The manifest, or `None` if there is no manifest or the directory has
+        been modified since it was written. The ``'files'`` item is a list of
+        dicts with ``'var'``, ``'timestep'``, ``'filename'``, ``'shape'``,
+        ``'dtype'``, ``'size'``, and ``'mtime_ns'`` keys.
+    """
+    loaded = _load_manifest(directory, model, check_entries=True)
+    if loaded is None:
+        return None
+    return copy.deepcopy(loaded[0])
+
+
+def _load_manifest(directory, model=None, check_entries=False):
+    """
+    Load a manifest, and a mapping of filenames to manifest entries.
+
+    Returns `None` if there is no valid manifest. If *check_entries* is
+    `True`, the number of entries in the directory is also checked against
+    the manifest (which lists the directory the first time it is checked).
+    """
+    directory = Path(directory)
+    manifest_path = directory / MANIFEST_FILENAME
+    try:
+        manifest_stat = manifest_path.stat()
+        dir_stat = directory.stat()
+    except FileNotFoundError:
+        return None
+    if dir_stat.st_mtime_ns > manifest_stat.st_mtime_ns:
+        # Directory has changed since the manifest was written
+        return None
+
+    loaded = _read_manifest(
+        manifest_path, manifest_stat.st_mtime_ns, manifest_stat.st_size
+    )
+    if loaded is None or (model is not None and loaded[0]["model"] != model):
+        return None
+    if check_entries:
+        n_entries = _count_entries_cached(
+            directory, dir_stat.st_mtime_ns, manifest_stat.st_mtime_ns
+        )
+        if n_entries != loaded[0]["n_entries"]:
+            # Files have been added or removed without changing the directory
+            # modification time
+            return None
+    return loaded
+
+
+@functools.lru_cache(maxsize=32)
+def _count_entries_cached(directory, dir_mtime, manifest_mtime):
+    return _count_entries(directory)
+
+
+@functools.lru_cache(maxsize=32)
+def _read_manifest(manifest_path, mtime, size):
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != _MANIFEST_VERSION:
+        return None
+    entries = {entry["filename"]: entry for entry in manifest["files"]}
+    index: Dict[str, Dict[int, Path]] = {}
+    for entry in manifest["files"]:
+        index.setdefault(entry["var"], {})[entry["timestep"]] = (
+            manifest_path.parent / entry["filename"]
+        )
+    index = {var: dict(sorted(files.items())) for var, files in index.items()}
+    return manifest, entries, index
+
+
+def manifest_index(directory: os.PathLike, model: str):
+    """
+    Get a ``{var: {timestep: path}}`` index of output files from a manifest.
+
+    Returns `None` if there is no valid manifest. The directory is not
+    listed, so files added without changing the modification time of the
+    directory are only found by `check_manifest`.
+    """
+    loaded = _load_manifest(directory, model)
+    if loaded is None:
+        return None
+    return {var: files.copy() for var, files in loaded[2].items()}
+
+
+def check_manifest(path: os.PathLike, model: str) -> None:
+    """
+    Warn if a file, or the files in its directory, have changed since the
+    manifest in its directory was written.
+    """
+    path = Path(path)
+    loaded = _load_manifest(path.parent, model)
+    if loaded is None:
+        return
+    if _load_manifest(path.parent, model, check_entries=True) is None:
+        warnings.warn(
+            f"Files have been added to or removed from {path.parent} since the "
+            "manifest was written. Use psipy.io.write_manifest to update the "
+            "manifest."
+        )
+    entry = loaded[1].get(path.name)
+    stat = path.stat()
+    if entry is None or (entry["size"], entry["mtime_ns"]) != (
+        stat.st_size,
+        stat.st_mtime_ns,
+    ):
+        warnings.warn(
+            f"{path} has changed since the manifest in {path.parent} was "
+            "written. Use psipy.io.write_manifest to update the manifest."
+        )
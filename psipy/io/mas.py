@@ -5,31 +5,89 @@ Files come in two types, .hdf or .h5. In both cases filenames always have the
 structure '{var}{timestep}.{extension}', where:
 
 - 'var' is the variable name
-- 'timestep' is the three digit (zero padded) timestep
+- 'timestep' is the three or six digit (zero padded) timestep
 - 'extension' is '.hdf' or '.h5'
 """
-import glob
 import os
+import re
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 import numpy as np
 import xarray as xr
 
-from .util import read_hdf4, read_hdf5
+from psipy.util import instrumentation
+from .manifest import check_manifest, manifest_index
+from .util import (
+    bounds_to_slice,
+    colatitude_bounds,
+    index_directory,
+    read_hdf4,
+    read_hdf5,
+    select_timesteps,
+)
 
-__all__ = ["read_mas_file", "get_mas_variables", "convert_hdf_to_netcdf"]
+__all__ = [
+    "read_mas_file",
+    "get_mas_variables",
+    "get_mas_index",
+    "convert_hdf_to_netcdf",
+]
 
+_mas_filename = re.compile(r"(?P<var>\D+)(?P<timestep>\d+)\.(hdf|h5|nc)")
 
-def get_mas_filenames(directory: os.PathLike, var: str) -> List[str]:
+
+def _parse_mas_filename(filename):
+    match = _mas_filename.fullmatch(filename)
+    if match is None:
+        return None
+    return match["var"], int(match["timestep"])
+
+
+def get_mas_index(directory: os.PathLike) -> Dict[str, Dict[int, Path]]:
     """
-    Get all MAS filenames in a given directory for a given variable.
+    Get an index of the MAS output files in a directory.
+
+    If the directory has an up to date manifest (see
+    `psipy.io.write_manifest`) the index is read from the manifest. Otherwise
+    the directory is only listed the first time this is called (and again if
+    files are added to or removed from the directory).
+
+    Parameters
+    ----------
+    directory :
+        Path to the folder containing the MAS data files.
+
+    Returns
+    -------
+    index : dict
+        Mapping of variable names to ``{timestep: path}`` dictionaries, each
+        sorted by timestep.
     """
-    directory = Path(directory)
-    return sorted(glob.glob(str(directory / f"{var}*")))
+    index = manifest_index(directory, "mas")
+    if index is None:
+        index = index_directory(directory, _parse_mas_filename)
+    return index
 
 
-def read_mas_file(directory, var):
+def get_mas_filenames(directory: os.PathLike, var: str) -> List[Path]:
+    """
+    Get all MAS filenames in a given directory for a given variable.
+    """
+    return list(get_mas_index(directory).get(var, {}).values())
+
+
+def read_mas_file(
+    directory,
+    var,
+    *,
+    r=None,
+    lat=None,
+    lon=None,
+    time=None,
+    timesteps=None,
+    dtype=None,
+):
     """
     Read in a set of MAS output files.
 
@@ -39,34 +97,71 @@ def read_mas_file(directory, var):
         Directory to look in.
     var : str
         Variable name.
+    r, lat, lon : tuple of float, optional
+        ``(min, max)`` bounds of the region to read. ``r`` is in solar radii,
+        and ``lat`` and ``lon`` are in radians. Either value can be `None` to
+        leave that side of the region unbounded. Only data within these
+        bounds, plus the cells enclosing them, is read from disk.
+    time : tuple of int, optional
+        ``(min, max)`` timesteps (inclusive) to read.
+    timesteps : slice or list of int, optional
+        Timesteps to read. A list selects timesteps by value, and a slice
+        selects by position in the sorted list of timesteps (after applying
+        ``time``), e.g. ``slice(None, None, 10)`` reads every 10th timestep.
+    dtype : numpy.dtype, optional
+        If given, convert the data to this type as it is read. By default
+        data is returned with the type it is stored with.
 
     Returns
     -------
     data : xarray.DataArray
         Loaded data.
     """
-    files = get_mas_filenames(directory, var)
-    if not len(files):
+    all_files = get_mas_index(directory).get(var, {})
+    if not len(all_files):
         raise FileNotFoundError(
             f'Could not find file for variable "{var}" in ' f"directory {directory}"
         )
 
-    if Path(files[0]).suffix == ".nc":
-        return xr.open_mfdataset(files, parallel=True)
+    files = select_timesteps(all_files, time, timesteps)
+    if not len(files):
+        raise ValueError(
+            f'No files for variable "{var}" in directory {directory} '
+            "match the requested timesteps"
+        )
+    for f in files:
+        check_manifest(f, "mas")
+
+    if files[0].suffix == ".nc":
+        data = xr.open_mfdataset(files, parallel=True)
+        data = data.isel(
+            phi=bounds_to_slice(data.coords["phi"], lon),
+            theta=bounds_to_slice(data.coords["theta"], lat),
+            r=bounds_to_slice(data.coords["r"], r),
+        )
+        if dtype is not None:
+            data[var] = data[var].astype(dtype)
+        return data
+
+    if (r, lat, lon) == (None, None, None):
+        bounds = None
+    else:
+        bounds = [lon, colatitude_bounds(lat), r]
 
-    data = [_read_mas(f, var) for f in files]
+    data = [_read_mas(f, var, bounds, dtype) for f in files]
     return xr.concat(data, dim="time")
 
 
-def _read_mas(path, var):
+def _read_mas(path, var, bounds=None, dtype=None):
     """
     Read a single MAS file.
     """
     f = Path(path)
-    if f.suffix == ".hdf":
-        data, coords = read_hdf4(f)
-    elif f.suffix == ".h5":
-        data, coords = read_hdf5(f)
+    with instrumentation.timer("io.read_file", path=str(f)):
+        if f.suffix == ".hdf":
+            data, coords = read_hdf4(f, bounds=bounds, dtype=dtype)
+        elif f.suffix == ".h5":
+            data, coords = read_hdf5(f, bounds=bounds, dtype=dtype)
 
     dims = ["phi", "theta", "r", "time"]
     # Convert from co-latitude to latitude
@@ -116,15 +211,10 @@ def get_mas_variables(path):
     var_names : list
         List of variable names present in the given directory.
     """
-    files = glob.glob(str(path / "*[0-9][0-9][0-9].*"))
-    # Get the variable name from the filename
-    # Here we take the filename before .hdf, and remove the last three
-    # characters which give the timestep
-    var_names = [Path(f).stem.split(".")[0][:-3] for f in files]
+    var_names = list(get_mas_index(path))
     if not len(var_names):
         raise FileNotFoundError(f"No variable files found in {path}")
-    # Use list(set()) to get unique values
-    return list(set(var_names))
+    return var_names
 
 
 def get_timestep(path: os.PathLike) -> int:
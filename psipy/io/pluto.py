@@ -1,13 +1,29 @@
 """
 Tools for reading pluto model outputs.
 """
-import glob
+import os
 from pathlib import Path
+from typing import Dict
 
 import numpy as np
 import xarray as xr
 
-__all__ = ["read_pluto_files", "get_pluto_variables", "read_pluto_grid"]
+from psipy.util import instrumentation
+from .manifest import check_manifest, manifest_index
+from .util import (
+    bounds_to_slice,
+    colatitude_bounds,
+    index_directory,
+    read_converted,
+    select_timesteps,
+)
+
+__all__ = [
+    "read_pluto_files",
+    "get_pluto_variables",
+    "get_pluto_index",
+    "read_pluto_grid",
+]
 
 
 def get_timestep(path):
@@ -20,7 +36,52 @@ def get_timestep(path):
     return int(tstep)
 
 
-def read_pluto_files(directory, var):
+def _parse_pluto_filename(filename):
+    # Filenames have the structure '{var}.{timestep}.dbl'
+    var, _, rest = filename.partition(".")
+    timestep, _, suffix = rest.partition(".")
+    if suffix != "dbl" or not timestep.isdigit():
+        return None
+    return var, int(timestep)
+
+
+def get_pluto_index(directory: os.PathLike) -> Dict[str, Dict[int, Path]]:
+    """
+    Get an index of the PLUTO output files in a directory.
+
+    If the directory has an up to date manifest (see
+    `psipy.io.write_manifest`) the index is read from the manifest. Otherwise
+    the directory is only listed the first time this is called (and again if
+    files are added to or removed from the directory).
+
+    Parameters
+    ----------
+    directory :
+        Path to the folder containing the PLUTO data files.
+
+    Returns
+    -------
+    index : dict
+        Mapping of variable names to ``{timestep: path}`` dictionaries, each
+        sorted by timestep.
+    """
+    index = manifest_index(directory, "pluto")
+    if index is None:
+        index = index_directory(directory, _parse_pluto_filename)
+    return index
+
+
+def read_pluto_files(
+    directory,
+    var,
+    *,
+    r=None,
+    lat=None,
+    lon=None,
+    time=None,
+    timesteps=None,
+    dtype=None,
+):
     """
     Read in a single variable from a set of PLUTO output files.
 
@@ -30,25 +91,50 @@ def read_pluto_files(directory, var):
         Directory to look in.
     var : str
         Variable name.
+    r, lat, lon : tuple of float, optional
+        ``(min, max)`` bounds of the region to read. ``r`` is in the units of
+        the PLUTO grid, and ``lat`` and ``lon`` are in radians. Either value
+        can be `None` to leave that side of the region unbounded. Only data
+        within these bounds, plus the cells enclosing them, is read from disk.
+    time : tuple of int, optional
+        ``(min, max)`` timesteps (inclusive) to read.
+    timesteps : slice or list of int, optional
+        Timesteps to read. A list selects timesteps by value, and a slice
+        selects by position in the sorted list of timesteps (after applying
+        ``time``), e.g. ``slice(None, None, 10)`` reads every 10th timestep.
+    dtype : numpy.dtype, optional
+        If given, convert the data to this type as it is read. By default
+        data is returned with the type it is stored with (float64).
 
     Returns
     -------
     data : xarray.DataArray
         Loaded data.
     """
-    directory = Path(directory)
-    files = glob.glob(str(directory / f"{var}*.dbl"))
-    if not len(files):
+    all_files = get_pluto_index(directory).get(var, {})
+    if not len(all_files):
         raise FileNotFoundError(
             f'Could not find any files for variable "{var}" in '
             f"directory {directory}"
         )
-    files.sort()
+    files = select_timesteps(all_files, time, timesteps)
+    if not len(files):
+        raise ValueError(
+            f'No files for variable "{var}" in directory {directory} '
+            "match the requested timesteps"
+        )
+    if (r, lat, lon) == (None, None, None):
+        bounds = None
+    else:
+        bounds = [lon, colatitude_bounds(lat), r]
+
     all_data = []
     times = []
     for file in files:
+        check_manifest(file, "pluto")
         times.append(get_timestep(file))
-        data, grid = read_pluto_dbl(file)
+        with instrumentation.timer("io.read_file", path=str(file)):
+            data, grid = read_pluto_dbl(file, bounds=bounds, dtype=dtype)
         all_data.append(data)
 
     # Take grid centers as the grid points
@@ -94,7 +180,7 @@ def read_pluto_grid(path):
     return dim_1[:, 1:], dim_2[:, 1:], dim_3[:, 1:]
 
 
-def read_pluto_dbl(path):
+def read_pluto_dbl(path, bounds=None, dtype=None):
     """
     Read in a single PLUTO output file.
 
@@ -102,6 +188,13 @@ def read_pluto_dbl(path):
     ----------
     path :
         Path to the dbl file.
+    bounds : list, optional
+        ``(min, max)`` coordinate bounds (or `None`) for the phi, theta, and r
+        axes. If given, only the part of the file within these bounds is read
+        from disk. See `psipy.io.bounds_to_slice` for how the bounds are
+        applied.
+    dtype : numpy.dtype, optional
+        If given, convert the data to this type as it is read.
 
     Returns
     -------
@@ -117,12 +210,26 @@ def read_pluto_dbl(path):
     being read.
     """
     path = Path(path)
-    data = np.fromfile(path, np.float64)
     grid = read_pluto_grid(path.parent / "grid.out")
 
     grid = grid[::-1]
-    grid_dims = list(g.shape[0] for g in grid)
-    data = data.reshape(grid_dims)
+    grid_dims = tuple(g.shape[0] for g in grid)
+    if bounds is None and dtype is None:
+        data = np.fromfile(path, np.float64).reshape(grid_dims)
+    else:
+        # Memory map the file so only the selected region is read
+        mapped = np.memmap(path, np.float64, mode="r", shape=grid_dims)
+        if bounds is not None:
+            slices = tuple(
+                bounds_to_slice(np.mean(g, axis=1), b) for g, b in zip(grid, bounds)
+            )
+            mapped = mapped[slices]
+            grid = tuple(g[s] for g, s in zip(grid, slices))
+        if dtype is None:
+            data = np.array(mapped)
+        else:
+            data = read_converted(lambda i, j: mapped[i:j], mapped.shape, dtype)
+    instrumentation.count("io.bytes_read", 8 * data.size, path=str(path))
 
     return data, grid
 
@@ -141,12 +248,7 @@ def get_pluto_variables(directory):
     var_names : list
         List of variable names present in the given directory.
     """
-    files = glob.glob(str(Path(directory) / "*.dbl"))
-    # Get the variable name from the filename
-    # Take anything before the . in the first three characters
-    var_names = [Path(f).stem[:3].split(".")[0] for f in files]
-    # Only return unique names
-    var_names = list(set(var_names))
+    var_names = list(get_pluto_index(directory))
     if not len(var_names):
         raise FileNotFoundError(f"No variable files found in {directory}")
     var_names.sort()
@@ -0,0 +1,111 @@
+import os
+import shutil
+from pathlib import Path
+
+import h5py as h5
+import pytest
+
+from psipy.io import manifest, mas
+from psipy.model import MASOutput
+
+
+@pytest.fixture
+def mas_copy(tmp_path):
+    # Copy the files, so the manifest isn't written to the test data directory
+    directory = Path(__file__).parents[3] / "data" / "mas_hdf5"
+    if not directory.exists():
+        pytest.xfail(f"Could not find MAS data directory at {directory}")
+    for f in directory.iterdir():
+        shutil.copy2(f, tmp_path)
+    return tmp_path
+
+
+def test_write_manifest(mas_copy):
+    path = manifest.write_manifest(mas_copy, "mas")
+    assert path == mas_copy / manifest.MANIFEST_FILENAME
+
+    contents = manifest.read_manifest(mas_copy)
+    assert contents["model"] == "mas"
+    assert manifest.read_manifest(mas_copy, "pluto") is None
+
+    files = {entry["filename"]: entry for entry in contents["files"]}
+    assert set(files) == {f.name for f in mas_copy.glob("*.h5")}
+    entry = files["rho002.h5"]
+    assert entry["var"] == "rho"
+    assert entry["timestep"] == 2
+    assert entry["size"] == (mas_copy / "rho002.h5").stat().st_size
+    with h5.File(mas_copy / "rho002.h5") as f:
+        assert entry["shape"] == list(f["Data"].shape)
+        assert entry["dtype"] == str(f["Data"].dtype)
+
+
+def test_manifest_index(mas_copy, monkeypatch):
+    MASOutput(mas_copy).write_manifest()
+    index = mas.get_mas_index(mas_copy)
+
+    # Check the directory isn't listed when there's a manifest
+    def index_directory(*args):
+        raise RuntimeError("Directory should not be listed")
+
+    monkeypatch.setattr(mas, "index_directory", index_directory)
+    assert mas.get_mas_index(mas_copy) == index
+    model = MASOutput(mas_copy)
+    model["rho"]
+
+    # Adding a file means the manifest is out of date
+    shutil.copy2(mas_copy / "rho002.h5", mas_copy / "rho003.h5")
+    assert manifest.read_manifest(mas_copy) is None
+    with pytest.raises(RuntimeError, match="should not be listed"):
+        mas.get_mas_index(mas_copy)
+
+
+def test_manifest_same_mtime(mas_copy):
+    # On filesystems with coarse modification times, adding a file soon after
+    # writing the manifest may not change the directory modification time
+    manifest.write_manifest(mas_copy, "mas")
+    dir_stat = mas_copy.stat()
+    shutil.copy2(mas_copy / "rho002.h5", mas_copy / "rho003.h5")
+    os.utime(mas_copy, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+    assert mas_copy.stat().st_mtime_ns == dir_stat.st_mtime_ns
+
+    assert manifest.read_manifest(mas_copy) is None
+    # The directory isn't listed when it's opened, so the change is only found
+    # when a file is read
+    assert list(mas.get_mas_index(mas_copy)["rho"]) == [2]
+    with pytest.warns(UserWarning, match="added to or removed from"):
+        mas.read_mas_file(mas_copy, "rho")
+
+
+def test_manifest_listed_once(mas_copy, monkeypatch):
+    manifest.write_manifest(mas_copy, "mas")
+    listed = []
+    listdir = os.listdir
+
+    def counting_listdir(path):
+        listed.append(path)
+        return listdir(path)
+
+    monkeypatch.setattr(os, "listdir", counting_listdir)
+    # Opening the directory doesn't list it
+    for _ in range(5):
+        mas.get_mas_index(mas_copy)
+    assert listed == []
+    # The number of entries is only counted once, when a file is first read
+    for _ in range(3):
+        mas.read_mas_file(mas_copy, "rho")
+    assert len(listed) == 1
+
+
+def test_changed_file(mas_copy):
+    manifest.write_manifest(mas_copy, "mas")
+    stat = (mas_copy / "rho002.h5").stat()
+    os.utime(mas_copy / "rho002.h5", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10))
+    with pytest.warns(UserWarning, match="has changed since the manifest"):
+        mas.read_mas_file(mas_copy, "rho")
+
+
+def test_write_manifest_errors(tmp_path):
+    with pytest.raises(ValueError, match="model must be one of"):
+        manifest.write_manifest(tmp_path, "not_a_model")
+    with pytest.raises(FileNotFoundError, match="No variable files found"):
+        manifest.write_manifest(tmp_path, "mas")
@@ -46,3 +46,64 @@ def test_save_netcdf(mas_directory):
     netcdf_model = MASOutput(netcdf_dir)
     hdf_model = MASOutput(mas_directory)
     assert netcdf_model._data == hdf_model._data
+
+
+def test_read_mas_file_bounds(mas_directory):
+    data = mas.read_mas_file(mas_directory, "rho")["rho"]
+    subset = mas.read_mas_file(
+        mas_directory, "rho", r=(None, 10), lat=(-0.5, 0.5), lon=(1, 2)
+    )["rho"]
+    assert subset.shape[:3] < data.shape[:3]
+    # Cells enclosing the bounds are included
+    assert subset.coords["r"].max() >= 10
+    assert subset.coords["theta"].min() <= -0.5
+    assert subset.coords["theta"].max() >= 0.5
+    assert subset.coords["phi"].min() <= 1
+    assert subset.coords["phi"].max() >= 2
+    xr.testing.assert_equal(
+        data.sel(r=subset.r, theta=subset.theta, phi=subset.phi), subset
+    )
+
+    with pytest.raises(ValueError, match="match the requested timesteps"):
+        mas.read_mas_file(mas_directory, "rho", time=(-2, -1))
+
+
+@pytest.fixture
+def mas_timesteps_directory(mas_directory, tmp_path):
+    # Pretend there are 12 timesteps by linking to a single file
+    src = mas.get_mas_filenames(mas_directory, "rho")[0]
+    for t in range(1, 13):
+        os.symlink(src, tmp_path / f"rho{t:03}{src.suffix}")
+    return tmp_path
+
+
+def test_read_mas_file_timesteps(mas_timesteps_directory):
+    data = mas.read_mas_file(
+        mas_timesteps_directory, "rho", timesteps=slice(None, None, 5)
+    )
+    np.testing.assert_array_equal(data.coords["time"], [1, 6, 11])
+
+    data = mas.read_mas_file(
+        mas_timesteps_directory, "rho", time=(4, 8), timesteps=slice(None, None, 2)
+    )
+    np.testing.assert_array_equal(data.coords["time"], [4, 6, 8])
+
+    data = mas.read_mas_file(mas_timesteps_directory, "rho", timesteps=[12, 3])
+    np.testing.assert_array_equal(data.coords["time"], [3, 12])
+
+    with pytest.raises(ValueError, match=r"Timesteps \[13\] are not available"):
+        mas.read_mas_file(mas_timesteps_directory, "rho", timesteps=[3, 13])
+
+
+def test_mas_index(mas_timesteps_directory):
+    index = mas.get_mas_index(mas_timesteps_directory)
+    assert list(index) == ["rho"]
+    assert list(index["rho"]) == list(range(1, 13))
+
+    # Index is updated when the directory changes
+    src = index["rho"][1]
+    os.symlink(src, mas_timesteps_directory / f"br001{src.suffix}")
+    (mas_timesteps_directory / "notes.txt").touch()
+    index = mas.get_mas_index(mas_timesteps_directory)
+    assert sorted(index) == ["br", "rho"]
+    assert sorted(mas.get_mas_variables(mas_timesteps_directory)) == ["br", "rho"]
@@ -1,3 +1,4 @@
+import numpy as np
 import xarray as xr
 
 from psipy.io import pluto
@@ -7,3 +8,11 @@ def test_read_pluto_files(pluto_directory):
     # Check that loading a single file works
     data = pluto.read_pluto_files(pluto_directory, "rho")
     assert isinstance(data, xr.Dataset)
+
+
+def test_read_pluto_files_dtype(pluto_directory):
+    data = pluto.read_pluto_files(pluto_directory, "rho")
+    data_32 = pluto.read_pluto_files(pluto_directory, "rho", dtype=np.float32)
+    assert data["rho"].dtype == np.float64
+    assert data_32["rho"].dtype == np.float32
+    np.testing.assert_allclose(data_32["rho"], data["rho"], rtol=1e-6)
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 
 from psipy.io import util
@@ -6,3 +7,34 @@ from psipy.io import util
 def test_HDF4_error(tmp_path):
     with pytest.raises(FileNotFoundError):
         util.HDF4File(tmp_path / "not_a_file.hdf")
+
+
+@pytest.mark.parametrize(
+    "coords, bounds, expected",
+    [
+        ([1, 2, 3, 4], None, slice(0, 4)),
+        ([1, 2, 3, 4], (2.5, 2.6), slice(1, 3)),
+        ([4, 3, 2, 1], (2.5, 2.6), slice(1, 3)),
+        ([1, 2, 3, 4], (2, 3), slice(1, 3)),
+        ([1, 2, 3, 4], (None, 2.5), slice(0, 3)),
+        ([1, 2, 3, 4], (1.5, None), slice(0, 4)),
+        ([4, 3, 2, 1], (None, 1.5), slice(2, 4)),
+    ],
+)
+def test_bounds_to_slice(coords, bounds, expected):
+    assert util.bounds_to_slice(coords, bounds) == expected
+
+
+def test_bounds_to_slice_error():
+    with pytest.raises(ValueError, match="Lower bound"):
+        util.bounds_to_slice([1, 2, 3], (3, 1))
+
+
+def test_read_converted():
+    data = np.arange(100.0).reshape(10, 10)
+    # Use a small chunk size to test reading in more than one chunk
+    out = util.read_converted(
+        lambda i, j: data[i:j], data.shape, np.float32, chunk_size=100
+    )
+    assert out.dtype == np.float32
+    np.testing.assert_array_equal(out, data)
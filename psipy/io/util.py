@@ -1,10 +1,12 @@
+import functools
 import os
+from pathlib import Path
 
-import h5py as h5
 import numpy as np
-import pyhdf.SD as h4
 
-__all__ = ["read_hdf4", "read_hdf5"]
+from psipy.util import instrumentation
+
+__all__ = ["read_hdf4", "read_hdf5", "bounds_to_slice"]
 
 
 class HDF4File:
@@ -13,6 +15,8 @@ class HDF4File:
     """
 
     def __init__(self, file_name):
+        import pyhdf.SD as h4
+
         file_name = str(file_name)
         if not os.path.exists(file_name):
             raise FileNotFoundError(f"Could not find {file_name}")
@@ -25,7 +29,181 @@ class HDF4File:
         self.file_obj.end()
 
 
-def read_hdf4(path, sds_id="Data-Set-2"):
+def bounds_to_slice(coords, bounds=None):
+    """
+    Get the slice of a coordinate array that covers a range of values.
+
+    The slice includes the coordinates either side of the range (if present),
+    so that values anywhere inside the range can be interpolated from the
+    sliced data.
+
+    Parameters
+    ----------
+    coords : array-like
+        Monotonically increasing or decreasing coordinate values.
+    bounds : tuple of float, optional
+        ``(min, max)`` values of the range. Either can be `None` to leave that
+        side of the range unbounded. If not given, the slice covers all the
+        coordinates.
+
+    Returns
+    -------
+    slice
+    """
+    n = len(coords)
+    if bounds is None:
+        return slice(0, n)
+    lo, hi = bounds
+    lo = -np.inf if lo is None else lo
+    hi = np.inf if hi is None else hi
+    if lo > hi:
+        raise ValueError(f"Lower bound ({lo}) is greater than upper bound ({hi})")
+
+    coords = np.asarray(coords)
+    descending = n > 1 and coords[0] > coords[-1]
+    if descending:
+        coords = coords[::-1]
+    start = max(np.searchsorted(coords, lo, side="right") - 1, 0)
+    stop = min(np.searchsorted(coords, hi, side="left") + 1, n)
+    if descending:
+        start, stop = n - stop, n - start
+    return slice(int(start), int(stop))
+
+
+def index_directory(directory, parse_filename):
+    """
+    Index the model output files in a directory.
+
+    The directory is only listed once; the index is cached, and only rebuilt
+    if the directory is modified (e.g. files are added or removed).
+
+    Parameters
+    ----------
+    directory :
+        Directory to index.
+    parse_filename : callable
+        Function that takes a filename and returns a ``(variable, timestep)``
+        tuple, or `None` if the file is not a model output file.
+
+    Returns
+    -------
+    index : dict
+        Mapping of variable names to ``{timestep: path}`` dictionaries, each
+        sorted by timestep.
+    """
+    directory = Path(directory)
+    try:
+        mtime = directory.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    index = _index_directory(directory, mtime, parse_filename)
+    return {var: files.copy() for var, files in index.items()}
+
+
+@functools.lru_cache(maxsize=32)
+def _index_directory(directory, mtime, parse_filename):
+    index = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            parsed = parse_filename(entry.name)
+            if parsed is not None:
+                var, timestep = parsed
+                index.setdefault(var, {})[timestep] = Path(entry.path)
+    return {var: dict(sorted(files.items())) for var, files in index.items()}
+
+
+def select_timesteps(files, time=None, timesteps=None):
+    """
+    Select files from a ``{timestep: path}`` mapping.
+
+    Parameters
+    ----------
+    files : dict
+        Mapping of timesteps to file paths, sorted by timestep.
+    time : tuple of int, optional
+        ``(min, max)`` timesteps (inclusive) to select.
+    timesteps : slice or list of int, optional
+        Timesteps to select. A list selects timesteps by value, and a slice
+        selects by position in the sorted list of timesteps (after applying
+        ``time``), e.g. ``slice(None, None, 10)`` selects every 10th timestep.
+
+    Returns
+    -------
+    list
+        Selected file paths, sorted by timestep.
+    """
+    steps = [t for t in files if in_bounds(t, time)]
+    if isinstance(timesteps, slice):
+        steps = steps[timesteps]
+    elif timesteps is not None:
+        missing = sorted(set(timesteps) - set(steps))
+        if missing:
+            raise ValueError(f"Timesteps {missing} are not available")
+        steps = sorted(set(timesteps))
+    return [files[t] for t in steps]
+
+
+def in_bounds(value, bounds=None):
+    """
+    Check if a value is within ``(min, max)`` bounds (inclusive).
+
+    Either bound can be `None`, and if ``bounds`` is `None` this always
+    returns `True`.
+    """
+    if bounds is None:
+        return True
+    lo, hi = bounds
+    return (lo is None or value >= lo) and (hi is None or value <= hi)
+
+
+def colatitude_bounds(lat_bounds=None):
+    """
+    Convert ``(min, max)`` latitude bounds to co-latitude bounds.
+    """
+    if lat_bounds is None:
+        return None
+    lo, hi = lat_bounds
+    return (
+        None if hi is None else np.pi / 2 - hi,
+        None if lo is None else np.pi / 2 - lo,
+    )
+
+
+def read_converted(read, shape, dtype, chunk_size=2**24):
+    """
+    Read an array in chunks, converting each chunk to a new data type.
+
+    This avoids ever holding a copy of the whole array in its original data
+    type in memory.
+
+    Parameters
+    ----------
+    read : callable
+        Function that takes ``(start, stop)`` indices along the first axis of
+        the array, and returns the data between those indices.
+    shape : tuple of int
+        Shape of the array.
+    dtype : numpy.dtype
+        Data type to convert to.
+    chunk_size : int, optional
+        Approximate size of each chunk in bytes (in the output data type).
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    out = np.empty(shape, dtype)
+    if out.size == 0:
+        return out
+    row_bytes = out[0].nbytes
+    step = max(chunk_size // row_bytes, 1)
+    for start in range(0, shape[0], step):
+        stop = min(start + step, shape[0])
+        out[start:stop] = read(start, stop)
+    return out
+
+
+def read_hdf4(path, sds_id="Data-Set-2", bounds=None, dtype=None):
     """
     Read a HDF4 file.
 
@@ -38,6 +216,13 @@ def read_hdf4(path, sds_id="Data-Set-2"):
         Path to the file.
     sds_id : str, optional
         ID of the dataset to get.
+    bounds : list, optional
+        ``(min, max)`` coordinate bounds (or `None`) for each axis of the data,
+        in the same order as the returned coordinates. If given, only the part
+        of the dataset within the bounds is read from disk. See
+        `bounds_to_slice` for how the bounds are applied.
+    dtype : numpy.dtype, optional
+        If given, convert the data to this type as it is read.
 
     Returns
     -------
@@ -51,15 +236,38 @@ def read_hdf4(path, sds_id="Data-Set-2"):
     with HDF4File(path) as sd_id:
         sds_id = sd_id.select("Data-Set-2")
 
-        # Get the scalar data
-        data = sds_id.get()
         # Get coordinate information
-        coords = [sds_id.dim(i).getscale() for i in range(np.ndim(data))]
+        ndim = sds_id.info()[1]
+        coords = [np.array(sds_id.dim(i).getscale()) for i in range(ndim)]
+        if bounds is None and dtype is None:
+            # Get the scalar data
+            data = sds_id.get()
+            instrumentation.count("io.bytes_read", data.nbytes, path=str(path))
+        else:
+            if bounds is None:
+                slices = [slice(0, len(c)) for c in coords]
+            else:
+                slices = [bounds_to_slice(c, b) for c, b in zip(coords, bounds)]
+                coords = [c[s] for c, s in zip(coords, slices)]
+            start = [s.start for s in slices]
+            count = [s.stop - s.start for s in slices]
+
+            def read(i, j):
+                chunk = sds_id.get(
+                    start=[start[0] + i] + start[1:], count=[j - i] + count[1:]
+                )
+                instrumentation.count("io.bytes_read", chunk.nbytes, path=str(path))
+                return chunk
+
+            if dtype is None:
+                data = read(0, count[0])
+            else:
+                data = read_converted(read, count, dtype)
 
     return data, coords
 
 
-def read_hdf5(path, dataset_name="Data"):
+def read_hdf5(path, dataset_name="Data", bounds=None, dtype=None):
     """
     Read a HDF5 file.
 
@@ -72,6 +280,13 @@ def read_hdf5(path, dataset_name="Data"):
         Path to the file.
     dataset_name : str, optional
         ID of the dataset to get.
+    bounds : list, optional
+        ``(min, max)`` coordinate bounds (or `None`) for each axis of the data,
+        in the same order as the returned coordinates. If given, only the part
+        of the dataset within the bounds is read from disk. See
+        `bounds_to_slice` for how the bounds are applied.
+    dtype : numpy.dtype, optional
+        If given, convert the data to this type as it is read.
 
     Returns
     -------
@@ -80,13 +295,27 @@ def read_hdf5(path, dataset_name="Data"):
     coords : list of ndarray
         Coordinate values along each axis of the data.
     """
+    import h5py as h5
+
     with h5.File(path, "r") as hdf5_file:
-        # Get the scalar data
-        data = np.array(hdf5_file[dataset_name])
+        dataset = hdf5_file[dataset_name]
         # Get coordinate information
-        coords = [
-            np.array(hdf5_file[dataset_name].dims[i][0]) for i in range(np.ndim(data))
-        ]
+        coords = [np.array(dataset.dims[i][0]) for i in range(dataset.ndim)]
         coords = coords[::-1]
+        if bounds is None:
+            slices = tuple(slice(0, n) for n in dataset.shape)
+        else:
+            slices = tuple(bounds_to_slice(c, b) for c, b in zip(coords, bounds))
+            coords = [c[s] for c, s in zip(coords, slices)]
+        # Get the scalar data. HDF5 converts the data type as it reads, so
+        # there is never a copy of the data in the original data type.
+        data = np.empty(
+            [s.stop - s.start for s in slices],
+            dtype=dataset.dtype if dtype is None else dtype,
+        )
+        dataset.read_direct(data, source_sel=slices)
+        instrumentation.count(
+            "io.bytes_read", data.size * dataset.dtype.itemsize, path=str(path)
+        )
 
     return data, coords
@@ -2,6 +2,11 @@
 Tools for storing and working with model output.
 """
 from .base import *
+from .calculus import *
+from .derived import *
+from .interpolate import *
 from .mas import *
 from .pluto import *
+from .sampling import *
 from .variable import *
+from .whitelight import *
@@ -1,11 +1,21 @@
 import abc
+import collections
+import concurrent.futures
 import os
+import threading
+import warnings
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import astropy.units as u
+import numpy as np
 import xarray as xr
 
+from psipy.util import instrumentation
+from .derived import DerivedVariable, compute_derived
+from .reductions import _prefetch, reduce_time
+from .regrid import _is_periodic
+from .sampling import Trajectory, sample_trajectories
 from .variable import Variable
 
 __all__ = ["ModelOutput"]
@@ -34,18 +44,100 @@ class ModelOutput(abc.ABC):
     use `ModelOutput.variables`, and to see the list of already loaded variables
     use `ModelOutput.loaded_variables`.
 
+    If ``max_memory`` is given, loading a variable that takes the total size of
+    loaded variables over ``max_memory`` unloads the least recently used
+    variables until the total is under the limit again. Variables can be kept
+    loaded regardless of this limit using `ModelOutput.pin`.
+
+    Variables can be accessed from several threads at once. Each variable is
+    only ever loaded once; if a variable is requested while another thread
+    is loading it, the request waits for that load to finish. To load several
+    variables concurrently use `ModelOutput.load_many`.
+
+    A subset of the model domain can be loaded using the ``r``, ``lat``,
+    ``lon``, and ``time`` arguments. Only the data within these bounds (plus
+    the cells enclosing them, so values anywhere within the bounds can be
+    interpolated) is read from disk.
+
     Parameters
     ----------
     path :
         Path to the directory containing the model output files.
+    r : tuple, optional
+        ``(min, max)`` radial bounds. Either value can be `None` to leave that
+        side unbounded. Values can be given as `~astropy.units.Quantity`, or
+        as numbers in the radial units of the model.
+    lat, lon : tuple, optional
+        ``(min, max)`` latitude and longitude bounds. Values can be given as
+        `~astropy.units.Quantity`, or as numbers in radians. Longitude bounds
+        can't wrap around 0 (``min`` must be less than ``max``). Vectors that
+        need all longitudes (e.g. ``cell_corner_b``, which is used for
+        tracing) can't be calculated from a model with longitude bounds.
+    time : tuple of int, optional
+        ``(min, max)`` timesteps (inclusive) to load.
+    timesteps : slice or list of int, optional
+        Timesteps to load. A list selects timesteps by value, and a slice
+        selects by position in the sorted list of timesteps (after applying
+        ``time``), e.g. ``slice(None, None, 10)`` loads every 10th timestep.
+    dtype : numpy.dtype, optional
+        Floating point data type to store variables with. Data is converted as
+        it is read from disk. For example, ``dtype=np.float32`` halves the
+        memory used by double precision model outputs. By default data is
+        stored with the type it has on disk.
+    max_memory : int, str, astropy.units.Quantity, optional
+        Memory budget for loaded variables. Can be given as a number of bytes,
+        a string (e.g. ``"16GB"``), or a `~astropy.units.Quantity` with units
+        of bytes. If not given, variables are never unloaded.
     """
 
-    def __init__(self, path: os.PathLike):
+    #: Derived variables available by default, if all their inputs are
+    #: present and a variable with the same name wasn't saved by the model.
+    default_derived_variables: List[DerivedVariable] = []
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        *,
+        r: Optional[Tuple] = None,
+        lat: Optional[Tuple] = None,
+        lon: Optional[Tuple] = None,
+        time: Optional[Tuple[int, int]] = None,
+        timesteps: Optional[Union[slice, List[int]]] = None,
+        dtype: Optional[Union[str, type, np.dtype]] = None,
+        max_memory: Optional[Union[int, str, u.Quantity]] = None,
+    ):
         self.path = Path(path)
+        self._bounds = {
+            "r": _parse_bounds(r, self.get_runit()),
+            "lat": _parse_bounds(lat, u.rad),
+            "lon": _parse_bounds(lon, u.rad),
+            "time": time,
+        }
+        if timesteps is not None and not isinstance(timesteps, slice):
+            timesteps = [int(t) for t in timesteps]
+        self._timesteps = timesteps
+        if dtype is not None:
+            dtype = np.dtype(dtype)
+            if not np.issubdtype(dtype, np.floating):
+                raise ValueError(f"dtype must be a floating point type, got {dtype}")
+        self._dtype = dtype
         # Leave data empty for now, as we want to load on demand
-        self._data: dict[str, xr.Dataset] = {}
+        # Variables are stored in order of use, least recent first
+        self._data: collections.OrderedDict[str, Variable] = collections.OrderedDict()
+        self._pinned: set[str] = set()
+        # _lock guards _data and _pinned, and each variable has its own lock
+        # that is held while it is being read from disk
+        self._lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.max_memory = max_memory
         self._variables = self.get_variables()
         self._variables.sort()
+        self._derived: Dict[str, DerivedVariable] = {}
+        for derived in self.default_derived_variables:
+            if derived.name not in self.variables and set(derived.inputs) <= set(
+                self.variables
+            ):
+                self.add_derived_variable(derived)
 
     def __str__(self):
         return f"{self.__class__.__name__}\n" f"Variables: {self.variables}"
@@ -56,13 +148,46 @@ class ModelOutput(abc.ABC):
         """
         if var not in self.variables:
             raise RuntimeError(
-                f"{var} not in list of known variables: " f"{self._variables}"
+                f"{var} not in list of known variables: " f"{self.variables}"
             )
-        if var in self.loaded_variables:
-            # Already loaded
-            return self._data[var]
+        with self._lock:
+            if var in self._data:
+                # Already loaded
+                instrumentation.count("model.cache_hit", var=var)
+                self._data.move_to_end(var)
+                return self._data[var]
+            load_lock = self._load_locks.setdefault(var, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if var in self._data:
+                    # Loaded by another thread while waiting for the lock
+                    instrumentation.count("model.cache_hit", var=var)
+                    self._data.move_to_end(var)
+                    return self._data[var]
 
-        data = self.load_file(var)
+            # Read from disk without holding _lock, so other variables can be
+            # accessed and loaded at the same time
+            instrumentation.count("model.cache_miss", var=var)
+            with instrumentation.timer("model.load", var=var):
+                variable = self._load_variable(var)
+            with self._lock:
+                self._data[var] = variable
+                self._free_memory()
+            return variable
+
+    def _load_variable(
+        self, var: str, timesteps: Optional[List[int]] = None
+    ) -> Variable:
+        """
+        Load a variable from disk, or calculate a derived variable.
+        """
+        if var in self._derived:
+            return self._compute_derived(var, timesteps)
+        if timesteps is None:
+            data = self.load_file(var)
+        else:
+            data = self.load_file(var, timesteps=timesteps)
 
         # Get units
         try:
@@ -71,12 +196,426 @@ class ModelOutput(abc.ABC):
             raise RuntimeError(
                 "Do not know what units are for " f'variable "{var}"'
             ) from e
-        data *= factor
 
         runit = self.get_runit()
-        # Save a reference on this ModelOutput object
-        self._data[var] = Variable(data, var, unit, runit)
-        return self._data[var]
+        # The unit conversion factor is only applied when values are needed.
+        return Variable(data, var, unit, runit, scale=factor)
+
+    def _compute_derived(
+        self, var: str, timesteps: Optional[List[int]] = None
+    ) -> Variable:
+        """
+        Calculate a derived variable.
+
+        Input variables that are already loaded are used as they are, and
+        other inputs are read one timestep at a time.
+        """
+        derived = self._derived[var]
+        if timesteps is None:
+            timesteps = self._get_timesteps(var)
+
+        def read(input_var, t):
+            with self._lock:
+                loaded = self._data.get(input_var)
+            if loaded is not None:
+                t_idx = np.flatnonzero(loaded.time_coords == t)[0]
+                return loaded.isel(time=t_idx)
+            return self._load_variable(input_var, timesteps=[t]).isel(time=0)
+
+        data = compute_derived(
+            derived,
+            read,
+            [self._get_unit(input_var) for input_var in derived.inputs],
+            timesteps,
+            dtype=self.dtype,
+        )
+        return Variable(data.to_dataset(), var, derived.unit, self.get_runit())
+
+    def _get_timesteps(self, var: str) -> List[int]:
+        """
+        Get the timesteps of a variable, including derived variables.
+
+        Derived variables are available at the timesteps where all their
+        inputs are available.
+        """
+        if var not in self._derived:
+            with self._lock:
+                loaded = self._data.get(var)
+            if loaded is not None:
+                return [int(t) for t in loaded.time_coords]
+            return self.get_timesteps(var)
+        timesteps = set.intersection(
+            *(
+                set(self._get_timesteps(input_var))
+                for input_var in self._derived[var].inputs
+            )
+        )
+        return sorted(timesteps)
+
+    def _get_unit(self, var: str) -> u.Unit:
+        if var in self._derived:
+            return self._derived[var].unit
+        return self.get_unit(var)[0]
+
+    def add_derived_variable(self, derived: DerivedVariable) -> None:
+        """
+        Add a variable calculated from other variables.
+
+        Once added, the derived variable can be accessed like any other
+        variable. It is calculated the first time it is accessed, and then
+        kept loaded (subject to ``max_memory``) like other variables.
+
+        Parameters
+        ----------
+        derived : DerivedVariable
+            Derived variable. All its inputs must be variables of this model.
+
+        Examples
+        --------
+        To add the magnetic pressure to a MAS model::
+
+            from psipy.model import DerivedVariable
+
+            model.add_derived_variable(
+                DerivedVariable(
+                    "pmag",
+                    ("br", "bt", "bp"),
+                    lambda br, bt, bp: (br**2 + bt**2 + bp**2) / (2 * const.mu0),
+                    u.Pa,
+                    grid="br",
+                )
+            )
+            pmag = model["pmag"]
+        """
+        if derived.name in self._variables:
+            raise ValueError(f"{derived.name} is already a saved variable")
+        missing = set(derived.inputs) - set(self.variables)
+        if missing:
+            raise ValueError(
+                f"Inputs {sorted(missing)} of {derived.name} are not variables of "
+                "this model"
+            )
+        with self._lock:
+            if derived.name in self._data:
+                # Drop any value calculated from an old definition
+                self.unload(derived.name)
+            self._derived[derived.name] = derived
+
+    @property
+    def derived_variables(self) -> Dict[str, DerivedVariable]:
+        """
+        Mapping from derived variable names to their definitions.
+
+        These are included in `ModelOutput.variables`.
+        """
+        return self._derived.copy()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Locks can't be pickled
+        del state["_lock"]
+        del state["_load_locks"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._load_locks = {}
+
+    def load_many(
+        self, variables: Iterable[str], max_workers: Optional[int] = None
+    ) -> List[Variable]:
+        """
+        Load several variables concurrently.
+
+        Parameters
+        ----------
+        variables : list of str
+            Variable names.
+        max_workers : int, optional
+            Maximum number of threads used to load variables. Defaults to the
+            number of variables.
+
+        Returns
+        -------
+        list of Variable
+            The requested variables, in the same order as ``variables``.
+        """
+        variables = list(variables)
+        for var in variables:
+            if var not in self.variables:
+                raise RuntimeError(
+                    f"{var} not in list of known variables: " f"{self.variables}"
+                )
+        if len(variables) <= 1 or max_workers == 1:
+            return [self[var] for var in variables]
+
+        max_workers = max_workers or len(variables)
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+            return list(pool.map(self.__getitem__, variables))
+
+    def sample_trajectories(
+        self,
+        variables: Iterable[str],
+        trajectories: Dict[str, Union[Trajectory, Tuple]],
+        max_workers: Optional[int] = None,
+    ) -> xr.Dataset:
+        """
+        Sample several variables along several trajectories.
+
+        The variables are loaded (see `ModelOutput.load_many`), and then
+        sampled with `~psipy.model.sample_trajectories`, which finds where
+        each point is on each distinct grid only once.
+
+        Parameters
+        ----------
+        variables : list of str
+            Variable names.
+        trajectories : dict
+            Mapping from trajectory names to the `~psipy.model.Trajectory`
+            to sample along, or a ``(lon, lat, r)`` or ``(lon, lat, r, t)``
+            tuple of its coordinates.
+        max_workers : int, optional
+            Maximum number of threads used to load variables. Defaults to the
+            number of variables.
+
+        Returns
+        -------
+        xarray.Dataset
+            Sampled values of each variable. See
+            `~psipy.model.sample_trajectories` for details.
+        """
+        return sample_trajectories(
+            self.load_many(variables, max_workers=max_workers), trajectories
+        )
+
+    def reduce_time(
+        self,
+        var: str,
+        method: str,
+        *,
+        q: Optional[float] = None,
+        max_workers: Optional[int] = None,
+    ) -> Variable:
+        """
+        Reduce a variable over time, reading one timestep at a time.
+
+        Only a few timesteps are held in memory at once, so this can be used
+        to reduce runs with more timesteps than fit in memory. If the variable
+        is already loaded, it is reduced without reading it from disk again.
+
+        Parameters
+        ----------
+        var : str
+            Variable name.
+        method : {'mean', 'std', 'min', 'max', 'quantile'}
+            Reduction. 'std' is the population standard deviation.
+        q : float, optional
+            Quantile to calculate, between 0 and 1. Only used (and required)
+            if ``method='quantile'``. Quantiles are estimated using the P²
+            algorithm, so are approximate if there are five or more
+            timesteps.
+        max_workers : int, optional
+            If greater than one, read up to this many timesteps ahead in a
+            pool of threads.
+
+        Returns
+        -------
+        Variable
+            Variable with a single timestep. The time coordinate is the first
+            timestep of the variable.
+        """
+        if var not in self.variables:
+            raise RuntimeError(
+                f"{var} not in list of known variables: " f"{self.variables}"
+            )
+        with self._lock:
+            loaded = self._data.get(var)
+        if loaded is not None:
+            return loaded.reduce_time(method, q=q, max_workers=max_workers)
+
+        data = reduce_time(
+            lambda t: self._load_variable(var, timesteps=[t]).isel(time=0),
+            self._get_timesteps(var),
+            method,
+            q=q,
+            max_workers=max_workers,
+        )
+        return Variable(
+            data.expand_dims("time", axis=-1).to_dataset(name=var),
+            var,
+            self._get_unit(var),
+            self.get_runit(),
+        )
+
+    def volume_integral(
+        self,
+        var: str,
+        *,
+        power: float = 1,
+        absolute: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> u.Quantity:
+        """
+        Integrate a variable over the volume of the model at each timestep,
+        reading one timestep at a time.
+
+        See `Variable.volume_integral` for more information. If the variable
+        is already loaded, it is integrated without reading it from disk
+        again.
+
+        Parameters
+        ----------
+        var : str
+            Variable name.
+        power : float, optional
+            Raise the data to this power before integrating.
+        absolute : bool, optional
+            If `True`, integrate the absolute value of the data.
+        max_workers : int, optional
+            If greater than one, read up to this many timesteps ahead in a
+            pool of threads.
+
+        Returns
+        -------
+        astropy.units.Quantity
+            Integral at each timestep.
+        """
+        return self._integrate(
+            var, "volume_integral", max_workers, power=power, absolute=absolute
+        )
+
+    def shell_integral(
+        self,
+        var: str,
+        *,
+        power: float = 1,
+        absolute: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> u.Quantity:
+        """
+        Integrate a variable over the spherical shell through each radial
+        coordinate at each timestep, reading one timestep at a time.
+
+        See `Variable.shell_integral` for more information. If the variable is
+        already loaded, it is integrated without reading it from disk again.
+
+        Parameters
+        ----------
+        var : str
+            Variable name.
+        power : float, optional
+            Raise the data to this power before integrating.
+        absolute : bool, optional
+            If `True`, integrate the absolute value of the data.
+        max_workers : int, optional
+            If greater than one, read up to this many timesteps ahead in a
+            pool of threads.
+
+        Returns
+        -------
+        astropy.units.Quantity
+            (r, time) shaped array with the integral over each shell at each
+            timestep.
+        """
+        return self._integrate(
+            var, "shell_integral", max_workers, power=power, absolute=absolute
+        )
+
+    def _integrate(self, var, method, max_workers, **kwargs):
+        if var not in self.variables:
+            raise RuntimeError(
+                f"{var} not in list of known variables: " f"{self.variables}"
+            )
+        with self._lock:
+            loaded = self._data.get(var)
+        if loaded is not None:
+            return getattr(loaded, method)(**kwargs)
+
+        integrals = [
+            getattr(variable, method)(**kwargs)
+            for variable in _prefetch(
+                lambda t: self._load_variable(var, timesteps=[t]),
+                self._get_timesteps(var),
+                max_workers,
+            )
+        ]
+        if not integrals:
+            raise ValueError(f"No timesteps to integrate {var} over")
+        return np.concatenate(integrals, axis=-1)
+
+    def _free_memory(self):
+        """
+        Unload least recently used variables until the memory used by loaded
+        variables is under ``max_memory``.
+
+        The most recently used variable and pinned variables are never
+        unloaded.
+        """
+        if self.max_memory is None:
+            return
+        with self._lock:
+            unloadable = [
+                var for var in list(self._data)[:-1] if var not in self._pinned
+            ]
+            while self.memory_usage > self.max_memory and unloadable:
+                var = unloadable.pop(0)
+                instrumentation.count("model.evict", var=var)
+                self.unload(var)
+
+            if self.memory_usage > self.max_memory:
+                warnings.warn(
+                    f"Memory used by loaded variables ({self.memory_usage} "
+                    f"bytes) is over max_memory ({self.max_memory} bytes), "
+                    "but no more variables can be unloaded"
+                )
+
+    def unload(self, var: str) -> None:
+        """
+        Unload a variable, so it is no longer kept in memory.
+
+        The variable is loaded from disk again the next time it is accessed.
+        Any references to the variable held elsewhere are not affected.
+
+        Parameters
+        ----------
+        var : str
+            Variable name.
+        """
+        with self._lock:
+            if var not in self._data:
+                raise ValueError(f"{var} is not loaded")
+            del self._data[var]
+            self._pinned.discard(var)
+
+    def pin(self, var: str) -> None:
+        """
+        Load a variable, and keep it loaded even if ``max_memory`` is
+        exceeded.
+
+        Parameters
+        ----------
+        var : str
+            Variable name.
+        """
+        variable = self[var]
+        with self._lock:
+            # Put the variable back in case another thread unloaded it
+            self._data.setdefault(var, variable)
+            self._pinned.add(var)
+
+    def unpin(self, var: str) -> None:
+        """
+        Allow a pinned variable to be unloaded again.
+
+        Parameters
+        ----------
+        var : str
+            Variable name.
+        """
+        with self._lock:
+            self._pinned.discard(var)
+            self._free_memory()
 
     # Abstract methods start here
     #
@@ -95,8 +634,21 @@ class ModelOutput(abc.ABC):
     def load_file(self, var):
         """
         Load data for variable *var*.
+
+        Implementations can also take a ``timesteps`` keyword argument, with
+        a list of timesteps to load instead of the timesteps selected when
+        creating the model. This is needed to use `ModelOutput.reduce_time`.
         """
 
+    def get_timesteps(self, var) -> List[int]:
+        """
+        Return the timesteps of variable *var* that are selected in this
+        model.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support listing timesteps"
+        )
+
     @abc.abstractmethod
     def get_unit(self, var) -> Tuple[u.Unit, float]:
         """
@@ -137,16 +689,121 @@ class ModelOutput(abc.ABC):
         """
 
     # Properties start here
+    @property
+    def bounds(self) -> Dict[str, Optional[Tuple]]:
+        """
+        ``(min, max)`` bounds of the loaded region along each dimension.
+
+        Radial bounds are in the radial units of the model, latitude and
+        longitude bounds are in radians, and time bounds are in timesteps.
+        `None` means the dimension is not bounded.
+        """
+        return self._bounds.copy()
+
+    @property
+    def dtype(self) -> Optional[np.dtype]:
+        """
+        Data type variables are stored with, or `None` if variables are stored
+        with the data type they have on disk.
+        """
+        return self._dtype
+
+    @property
+    def timestep_selection(self) -> Optional[Union[slice, List[int]]]:
+        """
+        Timesteps selected when creating the model, or `None` if all
+        timesteps (within the time bounds) are loaded.
+        """
+        return self._timesteps
+
+    @property
+    def max_memory(self) -> Optional[int]:
+        """
+        Memory budget for loaded variables in bytes, or `None` if there is no
+        limit.
+        """
+        return self._max_memory
+
+    @max_memory.setter
+    def max_memory(self, max_memory):
+        if isinstance(max_memory, str):
+            max_memory = u.Quantity(max_memory)
+        if isinstance(max_memory, u.Quantity):
+            max_memory = max_memory.to_value(u.byte)
+        self._max_memory = None if max_memory is None else int(max_memory)
+        self._free_memory()
+
     @property
     def loaded_variables(self) -> List[str]:
         """
-        List of loaded variable names.
+        List of loaded variable names, from least to most recently used.
         """
-        return list(self._data.keys())
+        with self._lock:
+            return list(self._data.keys())
+
+    @property
+    def loaded_nbytes(self) -> Dict[str, int]:
+        """
+        Mapping of loaded variable names to the number of bytes they use,
+        from least to most recently used.
+        """
+        with self._lock:
+            return {var: data.nbytes for var, data in self._data.items()}
+
+    @property
+    def memory_usage(self) -> int:
+        """
+        Total number of bytes used by loaded variables.
+        """
+        return sum(self.loaded_nbytes.values())
+
+    @property
+    def pinned_variables(self) -> List[str]:
+        """
+        List of pinned variable names.
+        """
+        return sorted(self._pinned)
 
     @property
     def variables(self) -> List[str]:
         """
-        List of all variable names present in the directory.
+        List of all variable names present in the directory, and derived
+        variables that can be calculated from them.
         """
-        return self._variables
+        if not self._derived:
+            return self._variables
+        return sorted(self._variables + list(self._derived))
+
+
+def _parse_bounds(bounds, unit):
+    """
+    Convert ``(min, max)`` bounds to a tuple of floats in *unit*.
+    """
+    if bounds is None:
+        return None
+    if len(bounds) != 2:
+        raise ValueError(f"Bounds must be a (min, max) tuple, got {bounds}")
+    parsed = []
+    for b in bounds:
+        if isinstance(b, u.Quantity):
+            b = b.to_value(unit)
+        parsed.append(None if b is None else float(b))
+    if None not in parsed and parsed[0] > parsed[1]:
+        raise ValueError(
+            f"Lower bound ({parsed[0]}) is greater than upper bound ({parsed[1]}). "
+            "Bounds that wrap around (e.g. longitudes either side of 0) are not "
+            "supported."
+        )
+    return tuple(parsed)
+
+
+def _check_all_longitudes(var, name):
+    """
+    Check that *var* covers all longitudes, so a layer of cells can be added
+    at phi = 2pi by wrapping around.
+    """
+    if not _is_periodic(var.phi_coords, 2 * np.pi):
+        raise ValueError(
+            f"{name} needs variables that cover all longitudes, but {var.name} "
+            "only covers some (was the model loaded with longitude bounds?)"
+        )
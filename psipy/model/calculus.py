@@ -0,0 +1,363 @@
+"""
+Vector calculus on the native (staggered) grids of model variables.
+
+The operators here take finite differences in spherical coordinates directly
+on the grids that vector components are saved on, without interpolating the
+components onto a common grid first. Each output is put on the grid where
+its finite differences naturally sit. For example, on the MAS grid the
+divergence of the magnetic field is on the cell centres (the same grid as the
+density), and each component of its curl is on the cell edges along that
+component's direction.
+
+Derivatives are taken between neighbouring grid points, and are calculated
+one timestep and one chunk of longitudes at a time, so only chunk-sized
+intermediate arrays are created. Values at the poles (where the metric
+factors are singular) are NaN.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import xarray as xr
+
+from .derived import _CHUNK_SIZE
+from .regrid import _is_periodic, _linear_weights
+from .variable import Variable
+
+__all__ = ["divergence", "curl", "gradient"]
+
+_DIMS = ["phi", "theta", "r"]
+_PERIODS = [2 * np.pi, None, None]
+
+
+def _difference_weights(source, target, period=None):
+    """
+    Get the indices and coefficients to take the derivative of data on
+    *source* coordinates at *target* coordinates.
+
+    Targets between two source coordinates use the difference between those
+    two points, and targets on a source coordinate use the difference between
+    its neighbours. At the ends of the source coordinates one-sided
+    differences are used.
+    """
+    source = np.asarray(source, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    n = source.size
+    if n < 2:
+        raise ValueError("At least two coordinates are needed to take derivatives")
+
+    index = np.arange(n)
+    if _is_periodic(source, period):
+        source = np.concatenate([[source[-1] - period], source, [source[0] + period]])
+        index = np.concatenate([[n - 1], index, [0]])
+        target = source[1] + np.mod(target - source[1], period)
+
+    lower = np.clip(
+        np.searchsorted(source, target, side="left") - 1, 0, source.size - 2
+    )
+    upper = np.clip(np.searchsorted(source, target, side="right"), lower + 1, None)
+    upper = np.minimum(upper, source.size - 1)
+    inverse_width = 1 / (source[upper] - source[lower])
+    return index[lower], index[upper], -inverse_width, inverse_width
+
+
+def _interpolation_weights(source, target, period=None):
+    """
+    Get the indices and coefficients to linearly interpolate data on *source*
+    coordinates to *target* coordinates, or `None` if they are the same.
+    """
+    weights = _linear_weights(source, target, period)
+    if weights is None:
+        return None
+    lower, upper, weight = weights
+    return lower, upper, 1 - weight, weight
+
+
+def _apply(values, stencils, metric, phi_slice):
+    """
+    Apply stencils along each dimension of a chunk of longitudes of a
+    (phi, theta, r) array.
+
+    *metric* is multiplied with the data (after selecting the chunk of
+    longitudes, but before applying the theta and r stencils).
+    """
+    for axis, stencil in enumerate(stencils):
+        if axis == 1 and metric is not None:
+            values = values * metric
+        if stencil is None:
+            if axis == 0:
+                values = values[phi_slice]
+            continue
+        lower, upper, lower_coeff, upper_coeff = stencil
+        if axis == 0:
+            lower, upper = lower[phi_slice], upper[phi_slice]
+            lower_coeff, upper_coeff = lower_coeff[phi_slice], upper_coeff[phi_slice]
+        shape = [1, 1, 1]
+        shape[axis] = -1
+        lower_coeff = lower_coeff.reshape(shape).astype(values.dtype, copy=False)
+        upper_coeff = upper_coeff.reshape(shape).astype(values.dtype, copy=False)
+        values = (
+            np.take(values, lower, axis=axis) * lower_coeff
+            + np.take(values, upper, axis=axis) * upper_coeff
+        )
+    return values
+
+
+def _coords(var, dim):
+    """
+    Coordinates of a variable along *dim*, without applying any pending unit
+    conversion to its data.
+    """
+    if dim == "r":
+        return var.r_coords.value
+    return getattr(var, f"{dim}_coords")
+
+
+def _metric(name, lat, r):
+    """
+    Metric factor on a (theta, r) grid, broadcastable to (phi, theta, r).
+    """
+    lat = lat[None, :, None]
+    r = r[None, None, :]
+    with np.errstate(divide="ignore"):
+        cos_lat = np.cos(lat)
+        # Avoid huge values from rounding errors at the poles
+        cos_lat = np.where(np.abs(cos_lat) < 1e-6, np.nan, cos_lat)
+        return {
+            "1": np.ones_like(r),
+            "r": r,
+            "r2": r**2,
+            "cos_lat": cos_lat,
+            "1/r": 1 / r,
+            "1/r2": 1 / r**2,
+            "1/(r cos_lat)": 1 / (r * cos_lat),
+        }[name]
+
+
+def _evaluate(
+    components: Dict[str, Variable],
+    grid: Dict[str, np.ndarray],
+    terms: Sequence[Tuple[str, str, Optional[str], str, float]],
+    name: str,
+) -> Variable:
+    """
+    Evaluate a sum of derivatives of components on a grid.
+
+    Each term is ``(component, dim, source_metric, target_metric, sign)``,
+    which is ``sign * target_metric * d(source_metric * component)/d(dim)``.
+    """
+    first = next(iter(components.values()))
+    target = [grid[dim] for dim in _DIMS]
+    shape = tuple(len(coords) for coords in target)
+    dtype = np.result_type(*(var.dtype for var in components.values()))
+    if not np.issubdtype(dtype, np.floating):
+        dtype = np.float64
+
+    prepared = []
+    for component, dim, source_metric, target_metric, sign in terms:
+        var = components[component]
+        source = [_coords(var, d) for d in _DIMS]
+        stencils = [
+            _difference_weights(s, t, period)
+            if d == dim
+            else _interpolation_weights(s, t, period)
+            for d, s, t, period in zip(_DIMS, source, target, _PERIODS)
+        ]
+        if source_metric is not None:
+            source_metric = _metric(source_metric, source[1], source[2])
+            source_metric = source_metric.astype(dtype)
+        target_metric = sign * _metric(target_metric, target[1], target[2])
+        prepared.append(
+            (var, stencils, source_metric, target_metric.astype(dtype, copy=False))
+        )
+
+    result = np.empty(shape + (first.n_timesteps,), dtype=dtype)
+    chunk_size = max(1, _CHUNK_SIZE // (shape[1] * shape[2]))
+    for t_idx in range(first.n_timesteps):
+        values = [np.asarray(var.isel(time=t_idx)) for var, *_ in prepared]
+        for start in range(0, shape[0], chunk_size):
+            phi_slice = slice(start, start + chunk_size)
+            chunk = result[phi_slice, :, :, t_idx]
+            chunk[:] = 0
+            for data, (_, stencils, source_metric, target_metric) in zip(
+                values, prepared
+            ):
+                chunk += target_metric * _apply(
+                    data, stencils, source_metric, phi_slice
+                )
+
+    data = xr.DataArray(
+        result,
+        dims=_DIMS + ["time"],
+        coords=dict(zip(_DIMS, target), time=first.time_coords),
+        name=name,
+    )
+    runit = first.r_coords.unit
+    return Variable(data.to_dataset(), name, first.unit / runit, runit)
+
+
+def _check_components(r, theta, phi):
+    components = {"r": r, "theta": theta, "phi": phi}
+    for dim, var in components.items():
+        if var.unit != r.unit:
+            raise ValueError(
+                f"All components must have the same unit, but the {dim} "
+                f"component has unit {var.unit} and the r component has unit "
+                f"{r.unit}"
+            )
+        if var.r_coords.unit != r.r_coords.unit:
+            raise ValueError("All components must have the same radial unit")
+        if not np.array_equal(var.time_coords, r.time_coords):
+            raise ValueError("All components must have the same timesteps")
+    return components
+
+
+def _other(dim):
+    return "theta" if dim == "r" else "r"
+
+
+def divergence(
+    r: Variable, theta: Variable, phi: Variable, *, name: str = "div"
+) -> Variable:
+    """
+    Calculate the divergence of a vector.
+
+    Along each dimension, the divergence is on the grid of the components
+    that aren't along that dimension. For the MAS magnetic field and
+    velocity this is the half mesh along every dimension (the cell centres,
+    the same grid as the density).
+
+    Parameters
+    ----------
+    r, theta, phi : Variable
+        Vector components. The theta component is positive towards the south
+        pole (increasing co-latitude), as in MAS outputs.
+    name : str, optional
+        Name of the returned variable.
+
+    Returns
+    -------
+    Variable
+        Divergence, in units of the components divided by the radial unit.
+
+    Examples
+    --------
+    ::
+
+        div_b = divergence(*mas_output.load_many(["br", "bt", "bp"]))
+    """
+    components = _check_components(r, theta, phi)
+    grid = {dim: _coords(components[_other(dim)], dim) for dim in _DIMS}
+    terms = [
+        ("r", "r", "r2", "1/r2", 1),
+        ("theta", "theta", "cos_lat", "1/(r cos_lat)", -1),
+        ("phi", "phi", None, "1/(r cos_lat)", 1),
+    ]
+    return _evaluate(components, grid, terms, name)
+
+
+def curl(
+    r: Variable,
+    theta: Variable,
+    phi: Variable,
+    *,
+    names: Sequence[str] = ("curl_r", "curl_t", "curl_p"),
+) -> Tuple[Variable, Variable, Variable]:
+    r"""
+    Calculate the curl of a vector.
+
+    Along each of the other two dimensions, each component of the curl is on
+    the grid of the input component along that dimension, and along its own
+    dimension it is on the grid of the other two input components. For the
+    MAS magnetic field and velocity this puts each component on the half
+    mesh along its own dimension and the main mesh along the other two
+    dimensions (the cell edges), which isn't the grid of any of the input
+    components.
+
+    Parameters
+    ----------
+    r, theta, phi : Variable
+        Vector components. The theta component is positive towards the south
+        pole (increasing co-latitude), as in MAS outputs.
+    names : tuple of str, optional
+        Names of the returned r, theta, and phi components.
+
+    Returns
+    -------
+    tuple of Variable
+        r, theta, and phi components of the curl, in units of the components
+        divided by the radial unit.
+
+    Examples
+    --------
+    To calculate the current density (in Gaussian units,
+    :math:`\mathbf{J} = c \nabla \times \mathbf{B} / 4 \pi`)::
+
+        curl_br, curl_bt, curl_bp = curl(*mas_output.load_many(["br", "bt", "bp"]))
+    """
+    components = _check_components(r, theta, phi)
+    terms = {
+        "r": [
+            ("phi", "theta", "cos_lat", "1/(r cos_lat)", -1),
+            ("theta", "phi", None, "1/(r cos_lat)", -1),
+        ],
+        "theta": [
+            ("r", "phi", None, "1/(r cos_lat)", 1),
+            ("phi", "r", "r", "1/r", -1),
+        ],
+        "phi": [
+            ("theta", "r", "r", "1/r", 1),
+            ("r", "theta", None, "1/r", 1),
+        ],
+    }
+    result = []
+    for component, name in zip(["r", "theta", "phi"], names):
+        grid = {
+            dim: _coords(components[_other(dim) if dim == component else dim], dim)
+            for dim in _DIMS
+        }
+        result.append(_evaluate(components, grid, terms[component], name))
+    return tuple(result)
+
+
+def gradient(
+    f: Variable,
+    *,
+    names: Sequence[str] = ("grad_r", "grad_t", "grad_p"),
+) -> Tuple[Variable, Variable, Variable]:
+    """
+    Calculate the gradient of a scalar.
+
+    Each component of the gradient is on the grid of the scalar, except
+    along its own dimension where it is halfway between the grid points of
+    the scalar.
+
+    Parameters
+    ----------
+    f : Variable
+        Scalar.
+    names : tuple of str, optional
+        Names of the returned r, theta, and phi components.
+
+    Returns
+    -------
+    tuple of Variable
+        r, theta, and phi components of the gradient, in units of the scalar
+        divided by the radial unit. The theta component is positive towards
+        the south pole (increasing co-latitude), as in MAS outputs.
+    """
+    components = {"f": f}
+    terms = {
+        "r": ("f", "r", None, "1", 1),
+        "theta": ("f", "theta", None, "1/r", -1),
+        "phi": ("f", "phi", None, "1/(r cos_lat)", 1),
+    }
+    result = []
+    for component, name in zip(["r", "theta", "phi"], names):
+        grid = {}
+        for dim in _DIMS:
+            coords = _coords(f, dim)
+            if dim == component:
+                coords = (coords[1:] + coords[:-1]) / 2
+            grid[dim] = coords
+        result.append(_evaluate(components, grid, [terms[component]], name))
+    return tuple(result)
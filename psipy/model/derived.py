@@ -0,0 +1,245 @@
+"""
+Variables derived from other model variables.
+
+Derived variables are calculated from variables saved by the model (e.g. the
+magnetic field strength from the three magnetic field components). The input
+variables are interpolated onto a common grid and the derived variable
+calculated one timestep, and one chunk of longitudes, at a time, so only
+small intermediate arrays are created.
+
+Derived variables are accessed through a model output like any other
+variable, see `ModelOutput.derived_variables`.
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Tuple, Union
+
+import astropy.constants as const
+import astropy.units as u
+import numpy as np
+import xarray as xr
+
+from .regrid import _linear_weights
+
+__all__ = ["DerivedVariable", "MAS_DERIVED_VARIABLES"]
+
+_DIMS = ["phi", "theta", "r"]
+# Maximum number of values in each input that are interpolated at once
+_CHUNK_SIZE = 2**22
+
+
+@dataclass(frozen=True)
+class DerivedVariable:
+    """
+    A variable calculated from other variables.
+
+    Parameters
+    ----------
+    name : str
+        Variable name.
+    inputs : tuple of str
+        Names of the variables it is calculated from.
+    func : callable
+        Function that takes the input variables as `~astropy.units.Quantity`
+        arrays (in the same order as ``inputs``), all interpolated onto the
+        same grid, and returns the derived variable.
+    unit : astropy.units.Unit
+        Unit of the derived variable.
+    grid : str or tuple of str, optional
+        Name of the input whose grid the derived variable is calculated on.
+        A tuple of three names takes the phi, theta, and r coordinates from
+        different inputs, e.g. to use the cell centres of a staggered grid.
+        Defaults to the grid of the first input.
+    description : str, optional
+        Description of the variable.
+    """
+
+    name: str
+    inputs: Tuple[str, ...]
+    func: Callable
+    unit: u.Unit
+    grid: Optional[Union[str, Tuple[str, str, str]]] = None
+    description: str = ""
+
+    def __post_init__(self):
+        missing = set(self.grid_inputs) - set(self.inputs)
+        if missing:
+            raise ValueError(
+                f"Grid of {self.name} must be the grid of one of its inputs, "
+                f"but {sorted(missing)} are not inputs"
+            )
+
+    @property
+    def grid_inputs(self) -> Tuple[str, str, str]:
+        """
+        Names of the inputs the phi, theta, and r coordinates are taken from.
+        """
+        grid = self.grid or self.inputs[0]
+        if isinstance(grid, str):
+            return (grid, grid, grid)
+        return tuple(grid)
+
+
+def _interpolate(values, weights, phi_slice):
+    """
+    Interpolate a chunk of longitudes of a (phi, theta, r) array, using
+    weights from `_linear_weights` for each dimension.
+    """
+    for axis, axis_weights in enumerate(weights):
+        if axis_weights is None:
+            if axis == 0:
+                values = values[phi_slice]
+            continue
+        lower, upper, weight = axis_weights
+        if axis == 0:
+            lower, upper, weight = lower[phi_slice], upper[phi_slice], weight[phi_slice]
+        shape = [1, 1, 1]
+        shape[axis] = -1
+        weight = weight.reshape(shape).astype(values.dtype, copy=False)
+        lower = np.take(values, lower, axis=axis)
+        upper = np.take(values, upper, axis=axis)
+        values = lower + weight * (upper - lower)
+    return values
+
+
+def compute_derived(
+    derived: DerivedVariable,
+    read: Callable[[str, int], xr.DataArray],
+    units: Sequence[u.Unit],
+    timesteps: Sequence[int],
+    dtype: Optional[np.dtype] = None,
+) -> xr.DataArray:
+    """
+    Calculate a derived variable.
+
+    Parameters
+    ----------
+    derived : DerivedVariable
+        Variable to calculate.
+    read : callable
+        Function that takes an input name and a timestep, and returns the
+        ``(phi, theta, r)`` data for that input at that timestep.
+    units : list of astropy.units.Unit
+        Units of each input.
+    timesteps : list of int
+        Timesteps to calculate the variable at.
+    dtype : numpy.dtype, optional
+        Data type of the result. Defaults to the common floating point type
+        of the inputs.
+
+    Returns
+    -------
+    xarray.DataArray
+        ``(phi, theta, r, time)`` data array.
+    """
+    if not len(timesteps):
+        raise ValueError(f"No timesteps to calculate {derived.name} at")
+
+    result = None
+    for t_idx, t in enumerate(timesteps):
+        inputs = {var: read(var, t) for var in derived.inputs}
+        if result is None:
+            coords = [
+                inputs[var].coords[dim].values
+                for var, dim in zip(derived.grid_inputs, _DIMS)
+            ]
+            weights = [
+                [
+                    _linear_weights(data.coords[dim].values, target, period)
+                    for dim, target, period in zip(
+                        _DIMS, coords, [2 * np.pi, None, None]
+                    )
+                ]
+                for data in inputs.values()
+            ]
+            if dtype is None:
+                dtype = np.result_type(*inputs.values())
+                if not np.issubdtype(dtype, np.floating):
+                    dtype = np.float64
+            shape = tuple(len(c) for c in coords)
+            result = np.empty(shape + (len(timesteps),), dtype=dtype)
+            chunk_size = max(1, _CHUNK_SIZE // (shape[1] * shape[2]))
+
+        values = [np.asarray(data) for data in inputs.values()]
+        for start in range(0, shape[0], chunk_size):
+            phi_slice = slice(start, start + chunk_size)
+            args = [
+                u.Quantity(_interpolate(v, w, phi_slice), unit, copy=False)
+                for v, w, unit in zip(values, weights, units)
+            ]
+            chunk = u.Quantity(derived.func(*args))
+            result[phi_slice, :, :, t_idx] = chunk.to_value(derived.unit)
+
+    return xr.DataArray(
+        result,
+        dims=_DIMS + ["time"],
+        coords=dict(zip(_DIMS, coords), time=list(timesteps)),
+        name=derived.name,
+    )
+
+
+# Functions are defined at module level (instead of using lambdas) so model
+# outputs can be pickled
+def _magnitude(x, y, z):
+    return np.sqrt(x**2 + y**2 + z**2)
+
+
+def _beta(p, br, bt, bp):
+    return 2 * const.mu0 * p / (br**2 + bt**2 + bp**2)
+
+
+def _alfven_speed(rho, br, bt, bp):
+    return _magnitude(br, bt, bp) / np.sqrt(const.mu0 * const.m_p * rho)
+
+
+def _dynamic_pressure(rho, vr):
+    return const.m_p * rho * vr**2
+
+
+# MAS vector components are on staggered grids. Magnetic field and velocity
+# components are on the main mesh along their own direction, and on the half
+# mesh along the other two directions. The grids of magnitudes are chosen to
+# be on the half mesh along every direction (the cell centres, where scalars
+# such as rho are saved), so each component is only interpolated along its own
+# direction.
+MAS_DERIVED_VARIABLES = [
+    DerivedVariable(
+        "bmag",
+        ("br", "bt", "bp"),
+        _magnitude,
+        u.G,
+        grid=("br", "br", "bt"),
+        description="Magnetic field strength",
+    ),
+    DerivedVariable(
+        "vmag",
+        ("vr", "vt", "vp"),
+        _magnitude,
+        u.km / u.s,
+        grid=("vr", "vr", "vt"),
+        description="Speed",
+    ),
+    DerivedVariable(
+        "beta",
+        ("p", "br", "bt", "bp"),
+        _beta,
+        u.dimensionless_unscaled,
+        grid="p",
+        description="Plasma beta",
+    ),
+    DerivedVariable(
+        "va",
+        ("rho", "br", "bt", "bp"),
+        _alfven_speed,
+        u.km / u.s,
+        grid="rho",
+        description="Alfvén speed",
+    ),
+    DerivedVariable(
+        "pdyn",
+        ("rho", "vr"),
+        _dynamic_pressure,
+        u.Pa,
+        grid="rho",
+        description="Radial dynamic pressure",
+    ),
+]
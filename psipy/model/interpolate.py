@@ -0,0 +1,274 @@
+"""
+Linear interpolation of data on a grid to arbitrary points.
+
+Finding where points are on the grid (the indices of the surrounding grid
+points and the interpolation weights) is done separately from interpolating
+values, so the same locations can be used to interpolate several arrays on
+the same grid.
+"""
+from typing import TYPE_CHECKING, Callable, Dict, NamedTuple, Sequence, Tuple
+
+import astropy.units as u
+import numpy as np
+
+from psipy.util import instrumentation
+from .regrid import _PERIODS, _is_periodic
+
+if TYPE_CHECKING:
+    from .variable import Variable
+
+__all__ = ["PointInterpolator", "PointLocations"]
+
+
+class PointLocations(NamedTuple):
+    """
+    Locations of points on a grid, returned by `PointInterpolator.locate`.
+    """
+
+    #: Shape of the points
+    shape: Tuple[int, ...]
+    #: Offsets into the flattened grid of the lower and upper grid points
+    #: along each of the (phi, theta, r) axes
+    offsets: Tuple[Tuple[np.ndarray, np.ndarray], ...]
+    #: Interpolation weights of the upper grid points along each axis
+    weights: Tuple[np.ndarray, ...]
+    #: Points that are outside the grid
+    outside: np.ndarray
+
+    def take(self, index) -> "PointLocations":
+        """
+        Select a subset of the points.
+
+        Parameters
+        ----------
+        index : array-like
+            Indices (or a boolean mask) of the flattened points to select.
+
+        Returns
+        -------
+        PointLocations
+            Locations of the selected points, as a 1D array of points.
+        """
+        index = np.arange(self.outside.size)[index]
+        return PointLocations(
+            index.shape,
+            tuple((lower[index], upper[index]) for lower, upper in self.offsets),
+            tuple(weight[index] for weight in self.weights),
+            self.outside[index],
+        )
+
+
+class _Axis:
+    """
+    Precomputed lookup of points along one axis of a grid.
+    """
+
+    def __init__(self, source, period, stride):
+        n = source.size
+        self.periodic = _is_periodic(source, period)
+        self.period = period
+        self.bounds = source[0], source[-1]
+        index = np.arange(n)
+        if self.periodic:
+            # Pad with the points across the periodic boundary
+            source = np.concatenate(
+                [[source[-1] - period], source, [source[0] + period]]
+            )
+            index = np.concatenate([[n - 1], index, [0]])
+        elif n == 1:
+            source = np.concatenate([source, source])
+            index = np.zeros(2, dtype=int)
+        self.source = source
+        self.lower = index[:-1] * stride
+        self.upper = index[1:] * stride
+        spacing = np.diff(source)
+        with np.errstate(divide="ignore"):
+            self.inverse_width = np.where(spacing == 0, 0, 1 / spacing)
+        # Points on uniform axes can be found without a binary search. The
+        # tolerance allows for coordinates that are saved in single
+        # precision, and the weights of points found using the mean spacing
+        # are then at most slightly outside [0, 1].
+        self.uniform = n > 1 and np.allclose(spacing, spacing.mean(), rtol=1e-5, atol=0)
+        self.inverse_spacing = 1 / spacing.mean() if self.uniform else None
+
+    def locate(self, target, outside):
+        """
+        Get the offsets of the grid points either side of *target*, and the
+        weights of the upper points.
+
+        Points outside the axis are marked in *outside*.
+        """
+        source = self.source
+        if self.periodic:
+            target = source[1] + np.mod(target - source[1], self.period)
+        else:
+            outside |= (target < self.bounds[0]) | (target > self.bounds[1])
+
+        if self.uniform:
+            i = np.floor((target - source[0]) * self.inverse_spacing)
+            i = np.clip(i, 0, source.size - 2, out=i).astype(np.intp)
+        else:
+            i = np.searchsorted(source, target, side="right") - 1
+            i = np.clip(i, 0, source.size - 2, out=i)
+        weight = (target - source[i]) * self.inverse_width[i]
+        return self.lower[i], self.upper[i], weight
+
+
+class PointInterpolator:
+    """
+    Linearly interpolate data on a (phi, theta, r) grid to arbitrary points.
+
+    Longitudes are interpolated periodically if the grid covers all
+    longitudes. Values at points outside the grid are NaN.
+
+    Parameters
+    ----------
+    coords : sequence of array
+        ``(phi, theta, r)`` coordinates of the grid. Longitudes and latitudes
+        are in radians.
+
+    Examples
+    --------
+    ::
+
+        interpolator = PointInterpolator(
+            [rho.phi_coords, rho.theta_coords, rho.r_coords.value]
+        )
+        locations = interpolator.locate(lon, lat, r)
+        values = interpolator(rho.isel(time=0), locations)
+    """
+
+    def __init__(self, coords: Sequence[np.ndarray]):
+        self.coords = tuple(np.asarray(c, dtype=np.float64) for c in coords)
+        if len(self.coords) != 3:
+            raise ValueError("Grid must have (phi, theta, r) coordinates")
+        # Offset between neighbouring points along each axis of the
+        # flattened grid
+        strides = (self.shape[1] * self.shape[2], self.shape[2], 1)
+        self._axes = [
+            _Axis(c, period, stride)
+            for c, period, stride in zip(self.coords, _PERIODS, strides)
+        ]
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """
+        Shape of the grid.
+        """
+        return tuple(c.size for c in self.coords)
+
+    def locate(self, phi, theta, r) -> PointLocations:
+        """
+        Find where points are on the grid.
+
+        Parameters
+        ----------
+        phi, theta, r : array-like
+            Coordinates of the points, in the same units as the grid
+            coordinates. Must be broadcastable to the same shape.
+
+        Returns
+        -------
+        PointLocations
+            Locations, to pass to `PointInterpolator.__call__`.
+        """
+        points = np.broadcast_arrays(
+            *(np.asarray(c, dtype=np.float64) for c in (phi, theta, r))
+        )
+        outside = np.zeros(points[0].size, dtype=bool)
+        offsets = []
+        weights = []
+        for axis, target in zip(self._axes, points):
+            lower, upper, weight = axis.locate(target.ravel(), outside)
+            offsets.append((lower, upper))
+            weights.append(weight)
+        return PointLocations(points[0].shape, tuple(offsets), tuple(weights), outside)
+
+    def __call__(self, values, locations: PointLocations) -> np.ndarray:
+        """
+        Interpolate values to points.
+
+        Parameters
+        ----------
+        values : array-like
+            ``(phi, theta, r)`` values on the grid.
+        locations : PointLocations
+            Locations of the points, from `PointInterpolator.locate`.
+
+        Returns
+        -------
+        numpy.ndarray
+            Interpolated values, with the same shape as the points.
+        """
+        values = np.asarray(values)
+        if values.shape != self.shape:
+            raise ValueError(
+                f"Values have shape {values.shape}, but the grid has shape "
+                f"{self.shape}"
+            )
+        dtype = values.dtype if np.issubdtype(values.dtype, np.floating) else np.float64
+        flat = np.ascontiguousarray(values, dtype=dtype).reshape(-1)
+        (phi_lo, phi_hi), (theta_lo, theta_hi), (r_lo, r_hi) = locations.offsets
+        w_phi, w_theta, w_r = (w.astype(dtype, copy=False) for w in locations.weights)
+
+        # Interpolate along r, then theta, then phi
+        def along_r(offset):
+            lower = flat[offset + r_lo]
+            return lower + w_r * (flat[offset + r_hi] - lower)
+
+        def along_theta(offset):
+            lower = along_r(offset + theta_lo)
+            return lower + w_theta * (along_r(offset + theta_hi) - lower)
+
+        lower = along_theta(phi_lo)
+        result = lower + w_phi * (along_theta(phi_hi) - lower)
+        result[locations.outside] = np.nan
+        return result.reshape(locations.shape)
+
+
+def _grid_key(variable: "Variable") -> tuple:
+    """
+    Get a hashable key that identifies the grid of a variable, including the
+    unit of its radial coordinates.
+    """
+    coords = (variable.phi_coords, variable.theta_coords, variable.r_coords.value)
+    key = tuple(np.asarray(c, dtype=np.float64).tobytes() for c in coords)
+    return key + (variable.r_coords.unit.to_string(),)
+
+
+def _locate_on_grid(
+    variable: "Variable",
+    points: Callable[[], Tuple[np.ndarray, np.ndarray, u.Quantity]],
+    located: Dict[tuple, Tuple[PointInterpolator, PointLocations]],
+) -> Tuple[PointInterpolator, PointLocations]:
+    """
+    Get an interpolator for the grid of a variable, and the locations of a set
+    of points on that grid.
+
+    Parameters
+    ----------
+    variable : psipy.model.Variable
+        Variable whose grid the points are located on.
+    points : callable
+        Function that returns the longitudes and latitudes (in radians) and
+        radial distances (as a `~astropy.units.Quantity`) of the points. Only
+        called if the points haven't already been located on the grid.
+    located : dict
+        Interpolators and locations for each grid the points have already
+        been located on. This is updated with the grid of *variable*, so the
+        points are only located once on each distinct grid.
+    """
+    key = _grid_key(variable)
+    if key not in located:
+        lon, lat, r = points()
+        with instrumentation.timer("interpolate.locate", n_points=np.size(lon)):
+            interpolator = PointInterpolator(
+                (variable.phi_coords, variable.theta_coords, variable.r_coords.value)
+            )
+            located[key] = (
+                interpolator,
+                interpolator.locate(
+                    np.mod(lon, 2 * np.pi), lat, r.to_value(variable.r_coords.unit)
+                ),
+            )
+    return located[key]
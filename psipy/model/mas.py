@@ -2,11 +2,20 @@ from typing import Optional
 
 import astropy.units as u
 import numpy as np
-import scipy.interpolate
 import xarray as xr
 
-from psipy.io import get_mas_variables, read_mas_file
-from .base import ModelOutput
+from psipy.io import (
+    get_mas_index,
+    get_mas_variables,
+    read_mas_file,
+    write_manifest,
+)
+from psipy.io.mas import get_timestep
+from psipy.io.util import select_timesteps
+from psipy.util import instrumentation
+from .base import ModelOutput, _check_all_longitudes
+from .derived import MAS_DERIVED_VARIABLES
+from .regrid import get_regridder
 
 __all__ = ["MASOutput"]
 
@@ -62,8 +71,16 @@ class MASOutput(ModelOutput):
     Variables are loaded on demand. To see the list of available variables
     use `MASOutput.variables`, and to see the list of already loaded variables
     use `MASOutput.loaded_variables`.
+
+    As well as the variables saved by MAS, the magnetic field strength
+    (``'bmag'``), speed (``'vmag'``), plasma beta (``'beta'``), Alfvén speed
+    (``'va'``), and radial dynamic pressure (``'pdyn'``) are available if
+    the variables needed to calculate them are present. See
+    `MASOutput.derived_variables`.
     """
 
+    default_derived_variables = MAS_DERIVED_VARIABLES
+
     def get_unit(self, var):
         return _mas_units[var]
 
@@ -73,8 +90,30 @@ class MASOutput(ModelOutput):
     def get_variables(self):
         return get_mas_variables(self.path)
 
-    def load_file(self, var):
-        return read_mas_file(self.path, var)
+    def load_file(self, var, timesteps=None):
+        if timesteps is None:
+            timesteps = self.timestep_selection
+        return read_mas_file(
+            self.path,
+            var,
+            timesteps=timesteps,
+            dtype=self.dtype,
+            **self.bounds,
+        )
+
+    def get_timesteps(self, var):
+        files = get_mas_index(self.path).get(var, {})
+        files = select_timesteps(files, self.bounds["time"], self.timestep_selection)
+        return [get_timestep(f) for f in files]
+
+    def write_manifest(self):
+        """
+        Write a manifest of the output files in the model directory.
+
+        This makes opening the directory again faster. See
+        `psipy.io.write_manifest` for more information.
+        """
+        return write_manifest(self.path, "mas")
 
     def __repr__(self):
         return f'psipy.model.mas.MASOutput("{self.path}")'
@@ -82,99 +121,87 @@ class MASOutput(ModelOutput):
     def __str__(self):
         return f"MAS output in directory {self.path}\n" + super().__str__()
 
+    @instrumentation.timer("model.cell_corner_b")
     def cell_corner_b(self, t_idx: Optional[int] = None) -> xr.DataArray:
         if not set(["br", "bt", "bp"]) <= set(self.variables):
             raise RuntimeError("MAS output must have the br, bt, bp variables loaded")
 
-        # Interpolate radial coordinate
-        new_rcoord = self["bt"].r_coords
-        br = scipy.interpolate.interp1d(
-            self["br"].r_coords,
-            self["br"].data.isel(time=t_idx or 0),
-            axis=2,
-            fill_value="extrapolate",
-        )(new_rcoord)
-
-        # Interpolate theta coordinate
-        new_tcoord = self["bp"].theta_coords
-        bt = scipy.interpolate.interp1d(
-            self["bt"].theta_coords,
-            self["bt"].data.isel(time=t_idx or 0),
-            axis=1,
-            fill_value="extrapolate",
-        )(new_tcoord)
-
-        # Interoplate phi coordinate
-        new_pcoord = self["br"].phi_coords
-        bp = scipy.interpolate.interp1d(
-            self["bp"].phi_coords,
-            self["bp"].data.isel(time=t_idx or 0),
-            axis=0,
-            fill_value="extrapolate",
-        )(new_pcoord)
-        # Calculate edge/cyclic phi value
-        old_pcoord = self["bp"].phi_coords
-        edge_pcoord = [old_pcoord[-1], old_pcoord[0] + _2pi]
-        edge_data = self["bp"].data.isel(time=t_idx or 0)
-        edge_data = np.stack([edge_data[-1, :, :], edge_data[0, :, :]], axis=0)
-        bp_edge = scipy.interpolate.interp1d(edge_pcoord, edge_data, axis=0)(_2pi)
-        bp_edge = bp_edge.reshape((1, *bp_edge.shape))
-
-        # Add an extra layer of cells at phi=2pi for the tracer
-        br = np.concatenate((br, br[0:1]), axis=0)
-        bt = np.concatenate((bt, bt[0:1]), axis=0)
-        bp = np.concatenate((bp_edge, bp[1:, :, :], bp_edge), axis=0)
-        new_pcoord = np.append(new_pcoord, _2pi)
+        br_var, bt_var, bp_var = self.load_many(["br", "bt", "bp"])
+        _check_all_longitudes(br_var, "cell_corner_b")
+        dtype = np.result_type(br_var.dtype, bt_var.dtype, bp_var.dtype)
+
+        # Each component is interpolated along the axis where it is staggered
+        # relative to the other components. An extra layer of cells is added
+        # at phi=2pi for the tracer, so the phi mesh that starts at phi=0 (the
+        # main mesh) is used.
+        phi_coords = min(
+            (var.phi_coords for var in [br_var, bt_var, bp_var]),
+            key=lambda coords: abs(coords[0]),
+        )
+        new_pcoord = np.append(phi_coords, _2pi)
+        new_tcoord = bp_var.theta_coords
+        new_rcoord = bt_var.r_coords
+        target = [new_pcoord, new_tcoord, new_rcoord.to_value(bt_var._runit)]
+        components = [
+            _regrid(var, target, t_idx or 0, dtype) for var in [bp_var, bt_var, br_var]
+        ]
 
         return xr.DataArray(
-            np.stack([bp, bt, br], axis=-1),
+            np.stack(components, axis=-1),
             dims=["phi", "theta", "r", "component"],
             coords=[new_pcoord, new_tcoord, new_rcoord, ["bp", "bt", "br"]],
         )
 
-    def cell_centered_v(self, extra_phi_coord=False):
+    @instrumentation.timer("model.cell_centered_v")
+    def cell_centered_v(
+        self, extra_phi_coord: bool = False, t_idx: Optional[int] = None
+    ) -> xr.DataArray:
         """
         Get the velocity vector at the cell centres.
 
-        Because the locations of the vector component outputs
+        Because the locations of the vector component outputs are staggered,
+        each component is interpolated onto a common grid.
 
         Parameters
         ----------
         extra_phi_coord: bool
             If `True`, add an extra phi slice.
+        t_idx : int, optional
+            If more than one timestep is present in the loaded model, a
+            timestep index at which to get the vectors must be provided.
         """
         if not set(["vr", "vt", "vp"]) <= set(self.variables):
             raise RuntimeError("MAS output must have the vr, vt, vp variables loaded")
 
-        # Interpolate new radial coordinates
-        new_rcoord = self["vr"].r_coords
-        vt = scipy.interpolate.interp1d(self["vt"].r_coords, self["vt"].data, axis=2)(
-            new_rcoord
-        )
-        vp = scipy.interpolate.interp1d(self["vp"].r_coords, self["vp"].data, axis=2)(
-            new_rcoord
-        )
-
-        # Interpolate new theta coordinates
-        new_tcoord = self["vt"].theta_coords
-        vr = scipy.interpolate.interp1d(
-            self["vr"].theta_coords, self["vr"].data, axis=1
-        )(new_tcoord)
-        vp = scipy.interpolate.interp1d(self["vp"].theta_coords, vp, axis=1)(new_tcoord)
-        # Don't need to interpolate phi coords, but get a copy
-        new_pcoord = self["vr"].phi_coords
+        vr_var, vt_var, vp_var = self.load_many(["vr", "vt", "vp"])
+        dtype = np.result_type(vr_var.dtype, vt_var.dtype, vp_var.dtype)
 
+        new_pcoord = vr_var.phi_coords
+        new_tcoord = vt_var.theta_coords
+        new_rcoord = vr_var.r_coords
         if extra_phi_coord:
+            _check_all_longitudes(vr_var, "cell_centered_v with extra_phi_coord")
             dphi = np.mean(np.diff(new_pcoord))
             assert np.allclose(new_pcoord[0] + 2 * np.pi, new_pcoord[-1] + dphi)
-
             new_pcoord = np.append(new_pcoord, new_pcoord[-1] + dphi)
-            vp = np.append(vp, vp[0:1, :, :], axis=0)
-            vt = np.append(vt, vt[0:1, :, :], axis=0)
-            vr = np.append(vr, vr[0:1, :, :], axis=0)
+
+        target = [new_pcoord, new_tcoord, new_rcoord.to_value(vr_var._runit)]
+        components = [
+            _regrid(var, target, t_idx or 0, dtype) for var in [vp_var, vt_var, vr_var]
+        ]
 
         return xr.DataArray(
-            np.stack([vp, vt, vr], axis=-1),
+            np.stack(components, axis=-1),
             dims=["phi", "theta", "r", "component"],
             coords=[new_pcoord, new_tcoord, new_rcoord, ["vp", "vt", "vr"]],
         )
+
+
+def _regrid(var, target, t_idx, dtype):
+    """
+    Interpolate a single timestep of a variable onto a (phi, theta, r) grid,
+    extrapolating outside the grid of the variable.
+    """
+    source = [var.phi_coords, var.theta_coords, var.r_coords.value]
+    regridder = get_regridder(source, target, extrapolate=True)
+    return regridder(var.isel(time=t_idx).values).astype(dtype, copy=False)
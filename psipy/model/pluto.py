@@ -4,8 +4,16 @@ import astropy.units as u
 import numpy as np
 import xarray as xr
 
-from psipy.io import get_pluto_variables, read_pluto_files
-from .base import ModelOutput
+from psipy.io import (
+    get_pluto_index,
+    get_pluto_variables,
+    read_pluto_files,
+    write_manifest,
+)
+from psipy.io.pluto import get_timestep
+from psipy.io.util import select_timesteps
+from psipy.util import instrumentation
+from .base import ModelOutput, _check_all_longitudes
 
 __all__ = ["PLUTOOutput"]
 
@@ -36,22 +44,47 @@ class PLUTOOutput(ModelOutput):
     def get_variables(self):
         return get_pluto_variables(self.path)
 
-    def load_file(self, var):
-        return read_pluto_files(self.path, var)
+    def load_file(self, var, timesteps=None):
+        if timesteps is None:
+            timesteps = self.timestep_selection
+        return read_pluto_files(
+            self.path,
+            var,
+            timesteps=timesteps,
+            dtype=self.dtype,
+            **self.bounds,
+        )
+
+    def get_timesteps(self, var):
+        files = get_pluto_index(self.path).get(var, {})
+        files = select_timesteps(files, self.bounds["time"], self.timestep_selection)
+        return [get_timestep(f) for f in files]
+
+    def write_manifest(self):
+        """
+        Write a manifest of the output files in the model directory.
+
+        This makes opening the directory again faster. See
+        `psipy.io.write_manifest` for more information.
+        """
+        return write_manifest(self.path, "pluto")
 
+    @instrumentation.timer("model.cell_corner_b")
     def cell_corner_b(self, t_idx: Optional[int] = None) -> xr.DataArray:
         if not set(["Bx1", "Bx2", "Bx3"]) <= set(self.variables):
             raise RuntimeError(
                 "PLUTO output must have the Bx1, Bx2, Bx3 variables loaded"
             )
 
-        r_coords = self["Bx1"].r_coords
-        t_coords = self["Bx1"].theta_coords
-        p_coords = self["Bx1"].phi_coords
+        br_var, bt_var, bp_var = self.load_many(["Bx1", "Bx2", "Bx3"])
+        _check_all_longitudes(br_var, "cell_corner_b")
+        r_coords = br_var.r_coords
+        t_coords = br_var.theta_coords
+        p_coords = br_var.phi_coords
 
-        br = self["Bx1"].data.isel(time=t_idx or 0)
-        bt = self["Bx2"].data.isel(time=t_idx or 0)
-        bp = self["Bx3"].data.isel(time=t_idx or 0)
+        br = br_var.isel(time=t_idx or 0)
+        bt = bt_var.isel(time=t_idx or 0)
+        bp = bp_var.isel(time=t_idx or 0)
 
         # Add an extra layer of cells around phi=2pi for the tracer
         br = np.concatenate((br, br[0:1, :, :]), axis=0)
@@ -0,0 +1,220 @@
+"""
+Reductions over time that read one timestep at a time.
+
+These are used by `Variable.reduce_time` and `ModelOutput.reduce_time`.
+"""
+import collections
+import concurrent.futures
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+import xarray as xr
+
+__all__ = ["reduce_time", "TIME_REDUCTIONS"]
+
+#: Reductions supported by `reduce_time`
+TIME_REDUCTIONS = ["mean", "std", "min", "max", "quantile"]
+
+
+def _prefetch(read: Callable, keys: Iterable, max_workers: Optional[int]) -> Iterator:
+    """
+    Call ``read`` on each key in turn, yielding the results in order.
+
+    If ``max_workers > 1``, up to ``max_workers`` results are read ahead in a
+    pool of threads. No more than this are read ahead, so only a bounded
+    number of results are ever held in memory.
+    """
+    if max_workers is None or max_workers <= 1:
+        for key in keys:
+            yield read(key)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        futures: collections.deque = collections.deque()
+        for key in keys:
+            futures.append(pool.submit(read, key))
+            if len(futures) >= max_workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+class _Moments:
+    """
+    Running mean and variance, using Welford's algorithm.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = None
+        self.m2 = None
+
+    def update(self, x):
+        self.n += 1
+        if self.mean is None:
+            self.mean = x.astype(np.float64)
+            self.m2 = np.zeros_like(self.mean)
+            return
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / self.n)
+
+
+class _Extremum:
+    """
+    Running minimum or maximum.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x.copy()
+        else:
+            self.func(self.value, x, out=self.value)
+
+
+class _P2Quantile:
+    """
+    Running estimate of a quantile, using the P² algorithm.
+
+    The algorithm keeps the heights and positions of five markers at each
+    point, so the memory used doesn't grow with the number of values. The
+    middle marker estimates the quantile. For fewer than five values the
+    quantile is calculated exactly.
+
+    References
+    ----------
+    Jain, R. and Chlamtac, I. (1985), "The P² algorithm for dynamic
+    calculation of quantiles and histograms without storing observations",
+    Communications of the ACM, 28, 1076-1085.
+    """
+
+    def __init__(self, q):
+        self.q = q
+        self._first = []
+        self._heights = None
+        self._positions = None
+        # Desired marker positions, and how much they increase with each value.
+        # These are the same at every point.
+        self._desired = np.array([0, 2 * q, 4 * q, 2 + 2 * q, 4])
+        self._increments = np.array([0, q / 2, q, (1 + q) / 2, 1])
+
+    def update(self, x):
+        if self._heights is None:
+            self._first.append(x.astype(np.float64))
+            if len(self._first) == 5:
+                self._heights = np.sort(np.stack(self._first), axis=0)
+                self._positions = np.empty_like(self._heights)
+                self._positions[:] = np.arange(5).reshape((5,) + (1,) * x.ndim)
+                self._first = []
+            return
+
+        h, n = self._heights, self._positions
+        # Increment the positions of markers above the new value
+        n[1:4] += x < h[1:4]
+        n[4] += 1
+        np.minimum(h[0], x, out=h[0])
+        np.maximum(h[4], x, out=h[4])
+        self._desired += self._increments
+
+        # Adjust the heights of the middle markers if they are too far from
+        # their desired positions
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for i in range(1, 4):
+                d = self._desired[i] - n[i]
+                adjust = ((d >= 1) & (n[i + 1] - n[i] > 1)) | (
+                    (d <= -1) & (n[i - 1] - n[i] < -1)
+                )
+                if not np.any(adjust):
+                    continue
+                s = np.sign(d)
+                # Piecewise parabolic prediction
+                parabolic = h[i] + s / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + s) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - s) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+                )
+                # Fall back to linear prediction if the parabolic prediction
+                # isn't between the neighbouring markers
+                h_next = np.where(s > 0, h[i + 1], h[i - 1])
+                n_next = np.where(s > 0, n[i + 1], n[i - 1])
+                linear = h[i] + s * (h_next - h[i]) / (n_next - n[i])
+                ok = (h[i - 1] < parabolic) & (parabolic < h[i + 1])
+                h[i] = np.where(adjust, np.where(ok, parabolic, linear), h[i])
+                n[i] = np.where(adjust, n[i] + s, n[i])
+
+    @property
+    def value(self):
+        if self._heights is None:
+            return np.quantile(np.stack(self._first), self.q, axis=0)
+        return self._heights[2]
+
+
+def reduce_time(
+    read: Callable[..., xr.DataArray],
+    timesteps: Iterable,
+    method: str,
+    *,
+    q: Optional[float] = None,
+    max_workers: Optional[int] = None,
+) -> xr.DataArray:
+    """
+    Reduce data over time, reading one timestep at a time.
+
+    Parameters
+    ----------
+    read : callable
+        Function that takes a single item from ``timesteps`` and returns the
+        ``(phi, theta, r)`` data at that timestep.
+    timesteps :
+        Timesteps to reduce over.
+    method : {'mean', 'std', 'min', 'max', 'quantile'}
+        Reduction. 'std' is the population standard deviation.
+    q : float, optional
+        Quantile to calculate, between 0 and 1. Only used (and required) if
+        ``method='quantile'``. Quantiles are estimated with the P² algorithm,
+        so are approximate if there are five or more timesteps.
+    max_workers : int, optional
+        If greater than one, read up to this many timesteps ahead in a pool of
+        threads.
+
+    Returns
+    -------
+    xarray.DataArray
+        Reduced data, with the same coordinates as the data at the first
+        timestep.
+    """
+    if method not in TIME_REDUCTIONS:
+        raise ValueError(f"method must be one of {TIME_REDUCTIONS}, got '{method}'")
+    if method == "quantile":
+        if q is None or not 0 <= q <= 1:
+            raise ValueError(f"q must be between 0 and 1 for quantiles, got {q}")
+        reducer = _P2Quantile(q)
+    elif method in ["mean", "std"]:
+        reducer = _Moments()
+    else:
+        reducer = _Extremum({"min": np.minimum, "max": np.maximum}[method])
+
+    template = None
+    for data in _prefetch(read, timesteps, max_workers):
+        if template is None:
+            template = data
+        reducer.update(np.asarray(data))
+    if template is None:
+        raise ValueError("No timesteps to reduce over")
+
+    if method == "mean":
+        result = reducer.mean
+    elif method == "std":
+        result = reducer.std
+    else:
+        result = reducer.value
+    if np.issubdtype(template.dtype, np.floating):
+        result = result.astype(template.dtype, copy=False)
+    return template.copy(data=result)
@@ -0,0 +1,219 @@
+"""
+Linear interpolation of data from one grid to another.
+
+Interpolation weights along each dimension are stored as sparse matrices,
+which are calculated once for each pair of source and target grids and then
+cached, so interpolating many variables or timesteps between the same grids
+only costs a sparse matrix product along each dimension.
+"""
+import functools
+from typing import Sequence
+
+import numpy as np
+
+__all__ = ["Regridder", "get_regridder"]
+
+_PERIODS = [2 * np.pi, None, None]
+
+
+def _is_periodic(source, period):
+    """
+    Whether *source* coordinates cover a whole *period*.
+    """
+    if period is None or source.size < 2:
+        return False
+    spacing = (source[-1] - source[0]) / (source.size - 1)
+    return source[-1] - source[0] + spacing >= period * 0.999
+
+
+def _linear_weights(source, target, period=None):
+    """
+    Get the indices and weights to linearly interpolate from *source* to
+    *target* coordinates.
+
+    Values outside the source coordinates are linearly extrapolated, unless
+    *period* is given and the source coordinates cover the whole period, in
+    which case they are interpolated across the periodic boundary.
+
+    Returns `None` if the source and target coordinates are the same.
+    """
+    source = np.asarray(source, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    if source.shape == target.shape and np.all(source == target):
+        return None
+
+    n = source.size
+    if n == 1:
+        zeros = np.zeros(target.size, dtype=int)
+        return zeros, zeros, np.zeros(target.size)
+
+    index = np.arange(n)
+    if _is_periodic(source, period):
+        source = np.concatenate([[source[-1] - period], source, [source[0] + period]])
+        index = np.concatenate([[n - 1], index, [0]])
+        target = source[1] + np.mod(target - source[1], period)
+
+    i = np.clip(np.searchsorted(source, target, side="right") - 1, 0, source.size - 2)
+    width = source[i + 1] - source[i]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(width == 0, 0, (target - source[i]) / width)
+    return index[i], index[i + 1], weight
+
+
+class Regridder:
+    """
+    Linearly interpolate data from one (phi, theta, r) grid to another.
+
+    Longitudes are interpolated periodically if the source grid covers all
+    longitudes. Regridders are usually created with `get_regridder`, which
+    caches them.
+
+    Parameters
+    ----------
+    source, target : sequence of array
+        ``(phi, theta, r)`` coordinates of the source and target grids.
+    extrapolate : bool, optional
+        If `True`, linearly extrapolate to target points outside the source
+        grid. Otherwise these points are set to NaN.
+    """
+
+    def __init__(
+        self,
+        source: Sequence[np.ndarray],
+        target: Sequence[np.ndarray],
+        *,
+        extrapolate: bool = False,
+    ):
+        import scipy.sparse
+
+        self.source = tuple(np.asarray(c, dtype=np.float64) for c in source)
+        self.target = tuple(np.asarray(c, dtype=np.float64) for c in target)
+        if len(self.source) != 3 or len(self.target) != 3:
+            raise ValueError("Grids must have (phi, theta, r) coordinates")
+        self.extrapolate = extrapolate
+
+        # Sparse weight matrices along each axis, or None if the source and
+        # target coordinates are the same
+        self.matrices = []
+        # Target points outside the source grid along each axis
+        self._outside = []
+        for source, target, period in zip(self.source, self.target, _PERIODS):
+            weights = _linear_weights(source, target, period)
+            if weights is None:
+                self.matrices.append(None)
+                self._outside.append(None)
+                continue
+            lower, upper, weight = weights
+            rows = np.arange(target.size)
+            self.matrices.append(
+                scipy.sparse.csr_matrix(
+                    (
+                        np.concatenate([1 - weight, weight]),
+                        (np.concatenate([rows, rows]), np.concatenate([lower, upper])),
+                    ),
+                    shape=(target.size, source.size),
+                )
+            )
+            if extrapolate or _is_periodic(source, period):
+                self._outside.append(None)
+            else:
+                self._outside.append((target < source.min()) | (target > source.max()))
+        self._typed_matrices = {}
+
+    @property
+    def shape(self):
+        """
+        Shape of the target grid.
+        """
+        return tuple(c.size for c in self.target)
+
+    def _matrix(self, axis, dtype):
+        # Store a copy of the weights with the data type of the data, so the
+        # result has the same data type
+        key = (axis, dtype)
+        if key not in self._typed_matrices:
+            self._typed_matrices[key] = self.matrices[axis].astype(dtype)
+        return self._typed_matrices[key]
+
+    def __call__(self, data) -> np.ndarray:
+        """
+        Regrid data.
+
+        Parameters
+        ----------
+        data : array
+            Data with shape ``(phi, theta, r, ...)`` on the source grid. Any
+            extra trailing dimensions (e.g. time) are regridded
+            independently.
+
+        Returns
+        -------
+        numpy.ndarray
+            Data on the target grid.
+        """
+        data = np.asarray(data)
+        source_shape = tuple(c.size for c in self.source)
+        if data.shape[:3] != source_shape:
+            raise ValueError(
+                f"Data has shape {data.shape[:3]}, but the source grid has shape "
+                f"{source_shape}"
+            )
+        dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else np.float64
+
+        # Apply the axes that shrink the data most first
+        axes = [axis for axis in range(3) if self.matrices[axis] is not None]
+        axes.sort(key=lambda axis: self.shape[axis] / source_shape[axis])
+        for axis in axes:
+            moved = np.moveaxis(data, axis, 0)
+            result = self._matrix(axis, dtype) @ moved.reshape(moved.shape[0], -1)
+            result = result.reshape((self.shape[axis],) + moved.shape[1:])
+            data = np.moveaxis(result, 0, axis)
+        data = np.ascontiguousarray(data, dtype=dtype)
+
+        for axis, outside in enumerate(self._outside):
+            if outside is not None and np.any(outside):
+                index = [slice(None)] * data.ndim
+                index[axis] = outside
+                data[tuple(index)] = np.nan
+        return data
+
+
+def get_regridder(
+    source: Sequence[np.ndarray],
+    target: Sequence[np.ndarray],
+    *,
+    extrapolate: bool = False,
+) -> Regridder:
+    """
+    Get a (cached) `Regridder` between two grids.
+
+    The most recently used regridders are cached, so calling this again with
+    the same grids returns the same regridder without recalculating the
+    interpolation weights.
+
+    Parameters
+    ----------
+    source, target : sequence of array
+        ``(phi, theta, r)`` coordinates of the source and target grids.
+    extrapolate : bool, optional
+        If `True`, linearly extrapolate to target points outside the source
+        grid. Otherwise these points are set to NaN.
+
+    Returns
+    -------
+    Regridder
+    """
+
+    def key(coords):
+        return tuple(np.asarray(c, dtype=np.float64).tobytes() for c in coords)
+
+    return _cached_regridder(key(source), key(target), extrapolate)
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_regridder(source, target, extrapolate):
+    return Regridder(
+        [np.frombuffer(c) for c in source],
+        [np.frombuffer(c) for c in target],
+        extrapolate=extrapolate,
+    )
@@ -0,0 +1,197 @@
+"""
+Sampling several variables along several trajectories at once.
+
+All the trajectories are concatenated and sampled together. Finding where the
+points are on a grid is only done once for each distinct grid, and shared by
+all the variables on that grid (e.g. all the cell-centred MAS variables).
+"""
+from dataclasses import dataclass
+from typing import Mapping, Optional, Sequence, Tuple, Union
+
+import astropy.units as u
+import numpy as np
+import xarray as xr
+
+from psipy.util import instrumentation
+from .interpolate import PointInterpolator, PointLocations, _locate_on_grid
+from .regrid import _linear_weights
+from .variable import Variable
+
+__all__ = ["Trajectory", "sample_trajectories"]
+
+
+@dataclass
+class Trajectory:
+    """
+    Coordinates of the points along a trajectory.
+
+    Parameters
+    ----------
+    lon, lat : astropy.units.Quantity
+        Longitudes and latitudes.
+    r : astropy.units.Quantity
+        Radial distances.
+    t : array-like, optional
+        Timesteps, in the same units as the time coordinates of the sampled
+        variables. Not needed if the variables only have a single timestep.
+    """
+
+    lon: u.Quantity
+    lat: u.Quantity
+    r: u.Quantity
+    t: Optional[np.ndarray] = None
+
+    def __post_init__(self):
+        for name, unit in [("lon", u.deg), ("lat", u.deg), ("r", u.m)]:
+            coords = np.atleast_1d(u.Quantity(getattr(self, name)))
+            if not coords.unit.is_equivalent(unit):
+                raise u.UnitsError(
+                    f"{name} must be in units of {unit.physical_type}, but has "
+                    f"unit {coords.unit}"
+                )
+            setattr(self, name, coords)
+        if self.t is not None:
+            self.t = np.atleast_1d(np.asarray(self.t))
+        for name in ["lat", "r", "t"]:
+            coords = getattr(self, name)
+            if coords is not None and coords.shape != self.lon.shape:
+                raise ValueError(
+                    f"Shapes of {name} {coords.shape} and longitude "
+                    f"{self.lon.shape} coordinates do not match"
+                )
+        if self.lon.ndim != 1:
+            raise ValueError("Trajectory coordinates must be 1D")
+
+    def __len__(self):
+        return self.lon.size
+
+
+def _sample_variable(
+    var: Variable,
+    interpolator: PointInterpolator,
+    locations: PointLocations,
+    t: Optional[np.ndarray],
+) -> np.ndarray:
+    """
+    Sample a variable at located points, linearly interpolating in time.
+    """
+    if var.n_timesteps == 1:
+        return interpolator(np.asarray(var.isel(time=0)), locations)
+    if t is None:
+        raise ValueError(
+            f"{var.name} has {var.n_timesteps} timesteps, so the timesteps of "
+            "each trajectory must be given"
+        )
+
+    times = var.time_coords
+    weights = _linear_weights(times, t)
+    if weights is None:
+        # Points are exactly on the timesteps
+        weights = (np.arange(t.size),) * 2 + (np.zeros(t.size),)
+    lower, upper, weight = weights
+    outside = (t < times.min()) | (t > times.max())
+
+    dtype = var.dtype if np.issubdtype(var.dtype, np.floating) else np.float64
+    result = np.zeros(t.size, dtype=dtype)
+    # Only read the timesteps that points are between
+    for t_idx in np.unique(np.concatenate([lower[~outside], upper[~outside]])):
+        t_weight = np.where(lower == t_idx, 1 - weight, 0) + np.where(
+            upper == t_idx, weight, 0
+        )
+        index = np.nonzero((t_weight != 0) & ~outside)[0]
+        if not index.size:
+            continue
+        values = interpolator(np.asarray(var.isel(time=t_idx)), locations.take(index))
+        result[index] += t_weight[index].astype(dtype) * values
+    result[outside] = np.nan
+    return result
+
+
+def sample_trajectories(
+    variables: Sequence[Variable],
+    trajectories: Mapping[str, Union[Trajectory, Tuple]],
+) -> xr.Dataset:
+    """
+    Sample several variables along several trajectories.
+
+    Values are linearly interpolated in space, and in time if the variables
+    have more than one timestep. Points outside a variable's grid are NaN.
+
+    Parameters
+    ----------
+    variables : list of Variable
+        Variables to sample. Variable names must be unique.
+    trajectories : dict
+        Mapping from trajectory names (e.g. spacecraft) to the
+        `Trajectory` to sample along, or a ``(lon, lat, r)`` or
+        ``(lon, lat, r, t)`` tuple of its coordinates.
+
+    Returns
+    -------
+    xarray.Dataset
+        Sampled values of each variable, along a single ``'point'`` dimension
+        that runs through each trajectory in turn. The ``'trajectory'``
+        coordinate gives the name of the trajectory each point belongs to,
+        and the ``'lon'``, ``'lat'``, ``'r'`` (and ``'t'``) coordinates its
+        position.
+
+    Examples
+    --------
+    ::
+
+        samples = sample_trajectories(
+            mas_output.load_many(['vr', 'rho', 'br']),
+            {'psp': (psp_lon, psp_lat, psp_r), 'solo': (solo_lon, solo_lat, solo_r)},
+        )
+        psp_vr = samples['vr'].where(samples.trajectory == 'psp', drop=True)
+    """
+    names = [var.name for var in variables]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Variable names must be unique, got {names}")
+    trajectories = {
+        name: traj if isinstance(traj, Trajectory) else Trajectory(*traj)
+        for name, traj in trajectories.items()
+    }
+    if not trajectories:
+        raise ValueError("At least one trajectory must be given")
+    has_time = [traj.t is not None for traj in trajectories.values()]
+    if any(has_time) and not all(has_time):
+        raise ValueError("Either all or none of the trajectories must have timesteps")
+
+    lon = np.concatenate([traj.lon for traj in trajectories.values()])
+    lat = np.concatenate([traj.lat for traj in trajectories.values()])
+    r = np.concatenate([traj.r for traj in trajectories.values()])
+    t = (
+        np.concatenate([traj.t for traj in trajectories.values()])
+        if all(has_time)
+        else None
+    )
+
+    def points():
+        return lon.to_value(u.rad), lat.to_value(u.rad), r
+
+    # Interpolators and point locations for each distinct grid
+    located = {}
+    data_vars = {}
+    for var in variables:
+        interpolator, locations = _locate_on_grid(var, points, located)
+        with instrumentation.timer(
+            "sampling.interpolate", var=var.name, n_points=lon.size
+        ):
+            values = _sample_variable(var, interpolator, locations, t)
+        data_vars[var.name] = ("point", values, {"units": var.unit.to_string()})
+
+    coords = {
+        "trajectory": (
+            "point",
+            np.repeat(
+                list(trajectories), [len(traj) for traj in trajectories.values()]
+            ),
+        ),
+        "lon": ("point", lon.to_value(u.deg), {"units": "deg"}),
+        "lat": ("point", lat.to_value(u.deg), {"units": "deg"}),
+        "r": ("point", r.value, {"units": r.unit.to_string()}),
+    }
+    if t is not None:
+        coords["t"] = ("point", t)
+    return xr.Dataset(data_vars, coords=coords)
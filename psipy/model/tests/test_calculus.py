@@ -0,0 +1,152 @@
+import astropy.units as u
+import numpy as np
+import pytest
+import xarray as xr
+
+from psipy.conftest import get_mas_directory
+from psipy.model import MASOutput, Variable, curl, divergence, gradient
+from psipy.model.calculus import _difference_weights
+
+# Main and half meshes, like MAS
+phi_main = np.linspace(0, 2 * np.pi, 64, endpoint=False)
+lat_main = np.linspace(-1.4, 1.4, 60)
+r_main = np.geomspace(1, 5, 50)
+phi_half = phi_main + np.pi / 64
+lat_half = (lat_main[1:] + lat_main[:-1]) / 2
+r_half = (r_main[1:] + r_main[:-1]) / 2
+
+
+def make_variable(func, phi, lat, r, name="var"):
+    p, t, rr = np.meshgrid(phi, lat, r, indexing="ij")
+    data = xr.Dataset(
+        {name: (("phi", "theta", "r", "time"), func(p, t, rr)[..., None])},
+        coords={"phi": phi, "theta": lat, "r": r, "time": [0]},
+    )
+    return Variable(data, name, u.km / u.s, u.R_sun)
+
+
+def grid_values(var, func):
+    p, t, rr = np.meshgrid(
+        var.phi_coords, var.theta_coords, var.r_coords.value, indexing="ij"
+    )
+    return func(p, t, rr)
+
+
+def test_difference_weights():
+    source = np.array([0, 1, 3, 4])
+    values = source**2
+    lower, upper, lower_coeff, upper_coeff = _difference_weights(source, [0.5, 1, 2, 4])
+    derivative = values[lower] * lower_coeff + values[upper] * upper_coeff
+    # Between points, on a point, and a one-sided difference at the end
+    np.testing.assert_allclose(derivative, [1, 3, 4, 7])
+
+    with pytest.raises(ValueError, match="At least two coordinates"):
+        _difference_weights([1], [1])
+
+
+def test_divergence():
+    # A radial field with constant divergence, on staggered grids
+    vr = make_variable(lambda p, t, r: r, phi_half, lat_half, r_main)
+    vt = make_variable(lambda p, t, r: 0 * r, phi_half, lat_main, r_half)
+    vp = make_variable(lambda p, t, r: 0 * r, phi_main, lat_half, r_half)
+    div = divergence(vr, vt, vp)
+    assert div.unit == u.km / u.s / u.R_sun
+    # On the cell centres
+    np.testing.assert_equal(div.phi_coords, phi_half)
+    np.testing.assert_equal(div.theta_coords, lat_half)
+    np.testing.assert_equal(div.r_coords.value, r_half)
+    np.testing.assert_allclose(div.data.values, 3, rtol=1e-3)
+
+
+def test_curl():
+    # Solid body rotation, with a curl of 2 along the rotation axis
+    vr = make_variable(lambda p, t, r: 0 * r, phi_half, lat_half, r_main)
+    vt = make_variable(lambda p, t, r: 0 * r, phi_half, lat_main, r_half)
+    vp = make_variable(lambda p, t, r: r * np.cos(t), phi_main, lat_half, r_half)
+    curl_r, curl_t, curl_p = curl(vr, vt, vp)
+    # Exclude the outermost latitudes and radii, which are outside the grids
+    # of the other components so use one-sided differences
+    np.testing.assert_allclose(
+        curl_r.data.values[:, 1:-1, :, 0],
+        grid_values(curl_r, lambda p, t, r: 2 * np.sin(t))[:, 1:-1],
+        atol=1e-3,
+    )
+    np.testing.assert_allclose(
+        curl_t.data.values[:, :, 1:-1, 0],
+        grid_values(curl_t, lambda p, t, r: -2 * np.cos(t))[:, :, 1:-1],
+        atol=1e-3,
+    )
+    np.testing.assert_allclose(curl_p.data.values, 0, atol=1e-6)
+    # Components are on the grids of the other components along their own
+    # dimension
+    np.testing.assert_equal(curl_r.r_coords.value, r_half)
+    np.testing.assert_equal(curl_r.theta_coords, lat_main)
+    np.testing.assert_equal(curl_r.phi_coords, phi_main)
+
+
+def test_gradient():
+    f = make_variable(
+        lambda p, t, r: r**2 * np.sin(t) * np.cos(p), phi_half, lat_half, r_half
+    )
+    grad_r, grad_t, grad_p = gradient(f)
+    np.testing.assert_allclose(
+        grad_r.data.values[..., 0],
+        grid_values(grad_r, lambda p, t, r: 2 * r * np.sin(t) * np.cos(p)),
+        atol=1e-6,
+    )
+    np.testing.assert_allclose(
+        grad_t.data.values[..., 0],
+        grid_values(grad_t, lambda p, t, r: -r * np.cos(t) * np.cos(p)),
+        atol=2e-3,
+    )
+    np.testing.assert_allclose(
+        grad_p.data.values[..., 0],
+        grid_values(grad_p, lambda p, t, r: -r * np.sin(t) * np.sin(p) / np.cos(t)),
+        atol=2e-2,
+    )
+
+
+def test_mas_div_b(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    br, bt, bp = model.load_many(["br", "bt", "bp"])
+    div_b = divergence(br, bt, bp)
+    assert div_b.n_timesteps == 2
+    # The divergence is on the cell centres
+    rho = model["rho"]
+    np.testing.assert_equal(div_b.r_coords, rho.r_coords)
+    np.testing.assert_equal(div_b.theta_coords, rho.theta_coords)
+    np.testing.assert_equal(div_b.phi_coords, rho.phi_coords)
+    # The synthetic field is a dipole, so has no divergence (away from the
+    # poles and boundaries)
+    interior = div_b.data.values[:, 5:-5, 5:-5]
+    b_over_r = br.data.values[:, 5:-5, 5:-5] / br.r_coords.value[5:-5, None]
+    assert np.nanmedian(np.abs(interior)) < 1e-3 * np.nanmedian(np.abs(b_over_r))
+
+    with pytest.raises(ValueError, match="same unit"):
+        divergence(br, bt, model["rho"])
+
+
+def test_mas_grids():
+    # Check where the outputs are on the staggered MAS grid, using the MAS
+    # sample data
+    model = MASOutput(get_mas_directory("mas_hdf5"))
+    br, bt, bp = model.load_many(["br", "bt", "bp"])
+    rho = model["rho"]
+    div_b = divergence(br, bt, bp)
+    for dim in ["r", "theta", "phi"]:
+        np.testing.assert_equal(
+            getattr(div_b, f"{dim}_coords"), getattr(rho, f"{dim}_coords")
+        )
+
+    # Each component of the curl is on the half mesh along its own direction,
+    # and the main mesh along the other two directions
+    curl_r, curl_t, curl_p = curl(br, bt, bp)
+    np.testing.assert_equal(curl_r.r_coords, rho.r_coords)
+    np.testing.assert_equal(curl_r.theta_coords, bt.theta_coords)
+    np.testing.assert_equal(curl_r.phi_coords, bp.phi_coords)
+    np.testing.assert_equal(curl_t.r_coords, br.r_coords)
+    np.testing.assert_equal(curl_t.theta_coords, rho.theta_coords)
+    np.testing.assert_equal(curl_t.phi_coords, bp.phi_coords)
+    np.testing.assert_equal(curl_p.r_coords, br.r_coords)
+    np.testing.assert_equal(curl_p.theta_coords, bt.theta_coords)
+    np.testing.assert_equal(curl_p.phi_coords, rho.phi_coords)
@@ -0,0 +1,85 @@
+import astropy.constants as const
+import astropy.units as u
+import numpy as np
+import pytest
+
+from psipy.conftest import get_mas_directory
+from psipy.model import DerivedVariable, MASOutput
+
+
+def test_mas_derived_variables(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    assert {"bmag", "vmag", "va", "pdyn"} <= set(model.variables)
+    assert set(model.derived_variables) == {"bmag", "vmag", "va", "pdyn"}
+    # No pressure saved, so can't calculate beta
+    assert "beta" not in model.variables
+
+    bmag = model["bmag"]
+    assert bmag.unit == u.G
+    assert bmag.dtype == np.float32
+    # Inputs are read one timestep at a time, without loading them
+    assert model.loaded_variables == ["bmag"]
+    # Magnitude is on the cell centres
+    assert bmag.data.shape == model["rho"].data.shape
+    np.testing.assert_equal(bmag.r_coords, model["rho"].r_coords)
+
+    # Compare to interpolating each component
+    lon = bmag.phi_coords[[5, 60]] * u.rad
+    lat = bmag.theta_coords[[30, 55]] * u.rad
+    r = bmag.r_coords[[20, 100]]
+    t = np.array([2, 2])
+    components = [
+        model[var].sample_at_coords(lon, lat, r, t) for var in "br bt bp".split()
+    ]
+    expected = np.sqrt(sum(c**2 for c in components))
+    assert u.allclose(bmag.sample_at_coords(lon, lat, r, t), expected, rtol=1e-5)
+
+    # Calculating from loaded inputs gives the same result
+    model.unload("bmag")
+    assert u.allclose(model["bmag"].data.values, bmag.data.values)
+
+
+def test_mas_derived_grids():
+    # Magnitudes are on the cell centres of the MAS sample data
+    model = MASOutput(get_mas_directory("mas_hdf5"))
+    rho = model["rho"]
+    for var in ["bmag", "vmag"]:
+        assert model[var].data.shape == rho.data.shape
+        for dim in ["phi", "theta", "r"]:
+            np.testing.assert_allclose(
+                model[var].data.coords[dim], rho.data.coords[dim], rtol=1e-6
+            )
+
+
+def test_derived_reductions(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    mean = model.reduce_time("va", "mean")
+    assert mean.unit == u.km / u.s
+    assert "va" not in model.loaded_variables
+    np.testing.assert_allclose(
+        mean.data.values[..., 0],
+        model["va"].data.values.mean(axis=-1),
+        rtol=1e-5,
+    )
+
+
+def test_add_derived_variable(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    pmag = DerivedVariable(
+        "pmag",
+        ("br", "bt", "bp"),
+        lambda br, bt, bp: (br**2 + bt**2 + bp**2) / (2 * const.mu0),
+        u.Pa,
+        grid=("br", "br", "bt"),
+    )
+    model.add_derived_variable(pmag)
+    assert "pmag" in model.variables
+    expected = (model["bmag"].data.values * u.G) ** 2 / (2 * const.mu0)
+    assert u.allclose(model["pmag"].data.values * u.Pa, expected, rtol=1e-5)
+
+    with pytest.raises(ValueError, match="already a saved variable"):
+        model.add_derived_variable(DerivedVariable("rho", ("br",), abs, u.G))
+    with pytest.raises(ValueError, match="are not variables of this model"):
+        model.add_derived_variable(DerivedVariable("x", ("not_a_var",), abs, u.G))
+    with pytest.raises(ValueError, match="are not inputs"):
+        DerivedVariable("x", ("br",), abs, u.G, grid="rho")
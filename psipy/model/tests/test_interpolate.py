@@ -0,0 +1,59 @@
+import astropy.units as u
+import numpy as np
+import pytest
+
+from psipy.model import MASOutput, PointInterpolator
+
+
+def linear_field(phi, theta, r):
+    p, t, rr = np.meshgrid(phi, theta, r, indexing="ij")
+    return np.cos(p) + 2 * t + 3 * rr
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_point_interpolator(dtype):
+    coords = [
+        np.linspace(0, 2 * np.pi, 100, endpoint=False),
+        np.linspace(-1, 1, 20),
+        np.geomspace(1, 2, 10),
+    ]
+    values = linear_field(*coords).astype(dtype)
+    interpolator = PointInterpolator(coords)
+    assert interpolator.shape == (100, 20, 10)
+
+    phi = np.array([[0.01, 2 * np.pi - 0.01], [1, 7]])
+    theta = np.array([0.5, -0.5])
+    r = np.array([[1.5, 1.2], [1, 2]])
+    result = interpolator(values, interpolator.locate(phi, theta, r))
+    assert result.shape == (2, 2)
+    assert result.dtype == dtype
+    # Longitudes are interpolated across 2 pi, and wrapped
+    np.testing.assert_allclose(result, np.cos(phi) + 2 * theta + 3 * r, atol=1e-3)
+
+    # Points outside the grid are NaN
+    result = interpolator(values, interpolator.locate([1, 1], [-1.1, 0], [1.5, 2.1]))
+    assert np.isnan(result).all()
+
+    with pytest.raises(ValueError, match="grid has shape"):
+        interpolator(values[1:], interpolator.locate(1, 0, 1.5))
+
+
+def test_point_interpolator_locations_reused(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    rho, vp = model["rho"], model["vp"]
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(0, 2 * np.pi, 100)
+    lat = rng.uniform(-1.4, 1.4, 100)
+    r = rng.uniform(2, 25, 100)
+
+    interpolator = PointInterpolator(
+        [rho.phi_coords, rho.theta_coords, rho.r_coords.value]
+    )
+    locations = interpolator.locate(lon, lat, r)
+    for var in [rho, vp]:
+        expected = var.sample_at_coords(
+            lon * u.rad, lat * u.rad, r * u.R_sun, np.full(100, 1)
+        )
+        np.testing.assert_allclose(
+            interpolator(var.isel(time=0), locations), expected.value, rtol=1e-5
+        )
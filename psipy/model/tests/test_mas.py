@@ -1,8 +1,13 @@
+import concurrent.futures
+import pickle
+import time
+
 import astropy.units as u
 import numpy as np
+import pytest
 import xarray as xr
 
-from psipy.model import base
+from psipy.model import MASOutput, base
 
 
 def test_mas_model(mas_model):
@@ -41,7 +46,217 @@ def test_change_units(mas_model):
     # Check that loading a single file works
     rho = mas_model["rho"]
     assert rho.unit == u.cm**-3
-    old_data = rho._data.copy()
+    old_data = rho.data.copy()
+    raw_data = rho._data
     rho.unit = u.m**-3
     assert rho.unit == u.m**-3
-    assert np.allclose(rho._data.values, 1e6 * old_data.values)
+    # Changing units shouldn't touch the data until it's needed
+    assert rho._data is raw_data
+    np.testing.assert_allclose(rho.isel(r=0).values, 1e6 * old_data.isel(r=0).values)
+    np.testing.assert_allclose(rho.data.values, 1e6 * old_data.values)
+    # Change back for other tests using this model
+    rho.unit = u.cm**-3
+
+
+def test_max_memory(mas_model):
+    model = MASOutput(mas_model.path)
+    nbytes = model["rho"].nbytes
+    assert model.loaded_nbytes == {"rho": nbytes}
+    assert model.memory_usage == nbytes
+
+    # Room for one variable, but not two
+    model = MASOutput(mas_model.path, max_memory=int(1.5 * nbytes))
+    model["rho"]
+    model["br"]
+    assert model.loaded_variables == ["br"]
+    model["rho"]
+    assert model.loaded_variables == ["rho"]
+
+    # Pinned variables shouldn't be unloaded
+    model.pin("rho")
+    with pytest.warns(UserWarning, match="no more variables can be unloaded"):
+        model["br"]
+    assert model.loaded_variables == ["rho", "br"]
+    model.unpin("rho")
+    assert model.loaded_variables == ["br"]
+
+    model.unload("br")
+    assert model.loaded_variables == []
+    with pytest.raises(ValueError, match="rho is not loaded"):
+        model.unload("rho")
+
+
+@pytest.mark.parametrize(
+    "max_memory, nbytes",
+    [(1000, 1000), ("2 kB", 2000), ("1GiB", 2**30), (3 * u.MB, 3_000_000)],
+)
+def test_max_memory_units(mas_model, max_memory, nbytes):
+    model = MASOutput(mas_model.path, max_memory=max_memory)
+    assert model.max_memory == nbytes
+
+
+def test_concurrent_loading(mas_model, monkeypatch):
+    model = MASOutput(mas_model.path)
+    load_file = model.load_file
+    loaded = []
+
+    def slow_load_file(var):
+        loaded.append(var)
+        time.sleep(0.1)
+        return load_file(var)
+
+    monkeypatch.setattr(model, "load_file", slow_load_file)
+
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(model.__getitem__, ["rho"] * 8))
+    # Only loaded once
+    assert loaded == ["rho"]
+    assert all(result is results[0] for result in results)
+
+    variables = model.load_many(["br", "bt", "rho", "br"])
+    assert [var.name for var in variables] == ["br", "bt", "rho", "br"]
+    assert variables[0] is variables[3]
+    assert sorted(loaded) == ["br", "bt", "rho"]
+
+    with pytest.raises(RuntimeError, match="not in list of known variables"):
+        model.load_many(["br", "not_a_variable"])
+
+
+def test_pickle_model(mas_model):
+    mas_model["rho"]
+    model = pickle.loads(pickle.dumps(mas_model))
+    assert model.loaded_variables == mas_model.loaded_variables
+    model["br"]
+
+
+def test_bounds(mas_model):
+    model = MASOutput(
+        mas_model.path,
+        r=(None, 10 * u.R_sun),
+        lat=(-30 * u.deg, 30 * u.deg),
+        lon=(1, 2),
+    )
+    assert model.bounds["r"] == (None, 10)
+    np.testing.assert_allclose(model.bounds["lat"], np.deg2rad([-30, 30]))
+    assert model.bounds["lon"] == (1, 2)
+    assert model.bounds["time"] is None
+
+    rho = model["rho"]
+    assert rho.r_coords.max() >= 10 * u.R_sun
+    assert rho.r_coords[-2] < 10 * u.R_sun
+    assert rho.data.shape < mas_model["rho"].data.shape
+
+    with pytest.raises(ValueError, match="must be a"):
+        MASOutput(mas_model.path, r=(1, 2, 3))
+
+
+def test_lon_bounds(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory, lon=(1, 2))
+    rho = model["rho"]
+    lon = [1.5, 3, 4, 6] * u.rad
+    # Points outside the loaded longitudes shouldn't be wrapped around
+    with pytest.warns(UserWarning, match="outside bounds"):
+        values = rho.sample_at_coords(
+            lon, [0] * 4 * u.deg, [5] * 4 * u.R_sun, t=np.full(4, 1)
+        )
+    assert np.isfinite(values[0])
+    assert np.all(np.isnan(values[1:]))
+
+    with pytest.raises(ValueError, match="cover all longitudes"):
+        model.cell_corner_b(0)
+    with pytest.raises(ValueError, match="cover all longitudes"):
+        model.cell_centered_v(extra_phi_coord=True, t_idx=0)
+    with pytest.raises(ValueError, match="wrap around"):
+        MASOutput(synthetic_mas_directory, lon=(6, 1))
+
+
+def test_timestep_selection(mas_model, tmp_path):
+    src = next(mas_model.path.glob("rho*"))
+    for t in range(1, 13):
+        (tmp_path / f"rho{t:03}{src.suffix}").symlink_to(src)
+
+    model = MASOutput(tmp_path, timesteps=slice(None, None, 4))
+    assert model.timestep_selection == slice(None, None, 4)
+    np.testing.assert_array_equal(model["rho"].data.coords["time"], [1, 5, 9])
+
+    model = MASOutput(tmp_path, time=(2, 12), timesteps=[2, 12])
+    np.testing.assert_array_equal(model["rho"].data.coords["time"], [2, 12])
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_dtype(mas_model, dtype):
+    model = MASOutput(mas_model.path, dtype=dtype)
+    assert model.dtype == dtype
+    assert model["br"].dtype == dtype
+    assert model["br"].isel(r=0).dtype == dtype
+    assert model.cell_corner_b().dtype == dtype
+    np.testing.assert_allclose(model["br"].data, mas_model["br"].data, rtol=1e-6)
+
+    with pytest.raises(ValueError, match="must be a floating point type"):
+        MASOutput(mas_model.path, dtype=int)
+
+
+@pytest.mark.parametrize(
+    "method, kwargs, func",
+    [
+        ("mean", {}, np.mean),
+        ("std", {}, np.std),
+        ("min", {}, np.min),
+        ("max", {}, np.max),
+        ("quantile", {"q": 0.25}, lambda x, axis: np.quantile(x, 0.25, axis=axis)),
+    ],
+)
+def test_reduce_time(synthetic_mas_directory, method, kwargs, func):
+    model = MASOutput(synthetic_mas_directory)
+    reduced = model.reduce_time("rho", method, max_workers=2, **kwargs)
+    assert "rho" not in model.loaded_variables
+    assert reduced.unit == u.cm**-3
+    assert reduced.data.shape == (128, 111, 141, 1)
+    assert reduced.data.dtype == np.float32
+    assert list(reduced.time_coords) == [1]
+
+    expected = func(model["rho"].data.values.astype(np.float64), axis=-1)
+    np.testing.assert_allclose(reduced.data.values[..., 0], expected, rtol=1e-5)
+    # Reducing an already loaded variable shouldn't read it from disk again
+    np.testing.assert_allclose(
+        model["rho"].reduce_time(method, **kwargs).data, reduced.data, rtol=1e-5
+    )
+
+
+def test_reduce_time_errors(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    with pytest.raises(ValueError, match="method must be one of"):
+        model.reduce_time("rho", "median")
+    with pytest.raises(ValueError, match="q must be between 0 and 1"):
+        model.reduce_time("rho", "quantile")
+    with pytest.raises(RuntimeError, match="not in list of known variables"):
+        model.reduce_time("not_a_var", "mean")
+
+
+@pytest.mark.parametrize("method", ["volume_integral", "shell_integral"])
+def test_streamed_integrals(synthetic_mas_directory, method):
+    model = MASOutput(synthetic_mas_directory)
+    streamed = getattr(model, method)("br", power=2, max_workers=2)
+    assert "br" not in model.loaded_variables
+    assert streamed.shape[-1] == 2
+    expected = getattr(model["br"], method)(power=2)
+    assert u.allclose(streamed, expected)
+    assert u.allclose(getattr(model, method)("br", power=2), expected)
+    with pytest.raises(RuntimeError, match="not in list of known variables"):
+        getattr(model, method)("not_a_var")
+
+
+def test_cell_centered_v(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    v = model.cell_centered_v(t_idx=1)
+    vr = model["vr"]
+    assert v.dims == ("phi", "theta", "r", "component")
+    assert v.shape == (128, 110, 140, 3)
+    np.testing.assert_equal(v.coords["r"].values, vr.r_coords.value)
+    np.testing.assert_equal(v.coords["theta"].values, model["vt"].theta_coords)
+    # vr is only interpolated in theta
+    expected = vr.regrid(theta=model["vt"].theta_coords).isel(time=1)
+    np.testing.assert_allclose(v.sel(component="vr").values, expected, rtol=1e-6)
+    v = model.cell_centered_v(extra_phi_coord=True)
+    assert v.shape == (129, 110, 140, 3)
+    np.testing.assert_allclose(v[0].values, v[-1].values, rtol=1e-6)
@@ -3,6 +3,7 @@ Plotting tests. These are currently just smoke tests to check the code runs,
 and does not check that the correct plot is produced.
 """
 import matplotlib.pyplot as plt
+import numpy as np
 
 
 def test_radial_cut(mas_model):
@@ -33,3 +34,39 @@ def test_equatorial_cut(mas_model):
 def test_contour_equatorial_cut(mas_model):
     mas_model["rho"].contour_equatorial_cut([200])
     plt.close("all")
+
+
+def test_radial_cut_level_of_detail(mas_model):
+    rho = mas_model["rho"]
+    full_shape = rho.data.isel(r=0, time=0).T.shape
+    # Axes with far fewer pixels than cells, so data should be downsampled
+    plt.figure(figsize=(1, 1), dpi=50)
+    quad_mesh = rho.plot_radial_cut(0)
+    assert quad_mesh.get_array().shape == tuple((n + 1) // 2 for n in full_shape)
+    # Plotting again should use the cached downsampled slice
+    n_cached = len(rho._lod_cache)
+    rho.plot_radial_cut(0)
+    assert len(rho._lod_cache) == n_cached
+    plt.close("all")
+
+    # Integer indices that can't be hashed should use the same cache
+    plt.figure(figsize=(1, 1), dpi=50)
+    quad_mesh = rho.plot_radial_cut(np.array(0))
+    assert quad_mesh._lod_level == 1
+    assert len(rho._lod_cache) == n_cached
+    # Other indices aren't cached, but are still downsampled
+    ax = plt.figure(figsize=(1, 1), dpi=50).gca()
+    sliced, level = rho._plot_slice(ax, ["phi", "theta"], 0, r=[0])
+    assert level == 1
+    assert sliced.isel(r=0, time=0).T.shape == quad_mesh.get_array().shape
+    assert len(rho._lod_cache) == n_cached
+    plt.close("all")
+
+    rho.lod_method = None
+    try:
+        plt.figure(figsize=(1, 1), dpi=50)
+        quad_mesh = rho.plot_radial_cut(0)
+        assert quad_mesh.get_array().shape == full_shape
+    finally:
+        del rho.lod_method
+    plt.close("all")
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from psipy.model.reductions import _P2Quantile
+
+
+@pytest.mark.parametrize("q", [0.05, 0.5, 0.95])
+def test_p2_quantile(q):
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(2000, 100))
+    quantile = _P2Quantile(q)
+    for row in data:
+        quantile.update(row)
+    np.testing.assert_allclose(
+        quantile.value, np.quantile(data, q, axis=0), rtol=0, atol=0.1
+    )
+
+
+def test_p2_quantile_few_values():
+    # Quantiles of fewer than five values are exact
+    data = np.random.default_rng(0).normal(size=(3, 10))
+    quantile = _P2Quantile(0.3)
+    for row in data:
+        quantile.update(row)
+    np.testing.assert_equal(quantile.value, np.quantile(data, 0.3, axis=0))
@@ -0,0 +1,101 @@
+import astropy.units as u
+import numpy as np
+import pytest
+
+from psipy.model import MASOutput
+from psipy.model.regrid import Regridder, _linear_weights, get_regridder
+
+
+def test_linear_weights():
+    source = np.array([0, 1, 3])
+    assert _linear_weights(source, source) is None
+
+    lower, upper, weight = _linear_weights(source, [-1, 0.5, 2, 4])
+    values = np.array([1, 2, 6])
+    interpolated = values[lower] + weight * (values[upper] - values[lower])
+    np.testing.assert_allclose(interpolated, [0, 1.5, 4, 8])
+
+
+def test_linear_weights_periodic():
+    source = np.linspace(0, 2 * np.pi, 4, endpoint=False) + np.pi / 4
+    lower, upper, weight = _linear_weights(source, [0, 2 * np.pi], period=2 * np.pi)
+    np.testing.assert_equal(lower, [3, 3])
+    np.testing.assert_equal(upper, [0, 0])
+    np.testing.assert_allclose(weight, [0.5, 0.5])
+
+
+def linear_field(phi, theta, r):
+    p, t, rr = np.meshgrid(phi, theta, r, indexing="ij")
+    return np.cos(p) + 2 * t + 3 * rr
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_regridder(dtype):
+    source = [
+        np.linspace(0, 2 * np.pi, 100, endpoint=False),
+        np.linspace(-1, 1, 20),
+        np.linspace(1, 2, 10),
+    ]
+    target = [np.linspace(0, 2 * np.pi, 30), np.linspace(-1.2, 0.9, 15), source[2]]
+    regridder = Regridder(source, target)
+    assert regridder.shape == (30, 15, 10)
+    # No interpolation is needed along r
+    assert regridder.matrices[2] is None
+
+    data = linear_field(*source).astype(dtype)
+    data = np.stack([data, 2 * data], axis=-1)
+    regridded = regridder(data)
+    assert regridded.dtype == dtype
+    assert regridded.shape == (30, 15, 10, 2)
+    # Points outside the source latitudes are NaN
+    outside = target[1] < -1
+    assert np.all(np.isnan(regridded[:, outside]))
+    expected = linear_field(*target)
+    np.testing.assert_allclose(
+        regridded[..., 0][:, ~outside], expected[:, ~outside], atol=2e-3
+    )
+    np.testing.assert_allclose(
+        regridded[..., 1][:, ~outside], 2 * expected[:, ~outside], atol=4e-3
+    )
+
+    extrapolated = Regridder(source, target, extrapolate=True)(data[..., 0])
+    np.testing.assert_allclose(extrapolated, expected, atol=2e-3)
+
+    with pytest.raises(ValueError, match="source grid has shape"):
+        regridder(data[1:])
+
+
+def test_regridder_cache():
+    source = [np.arange(4.0), np.arange(3.0), np.arange(2.0)]
+    target = [np.arange(4.0) + 0.5, np.arange(3.0), np.arange(2.0)]
+    regridder = get_regridder(source, target)
+    assert get_regridder([c.copy() for c in source], target) is regridder
+    assert get_regridder(source, target, extrapolate=True) is not regridder
+
+
+def test_variable_regrid(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    rho = model["rho"]
+    phi = np.linspace(0, 2 * np.pi, 36, endpoint=False)
+    theta = np.linspace(-1.5, 1.5, 18)
+    r = np.linspace(2, 20, 10) * u.R_sun
+    coarse = rho.regrid(phi, theta, r)
+    assert coarse.data.shape == (36, 18, 10, 2)
+    assert coarse.unit == rho.unit
+    assert coarse.dtype == rho.dtype
+
+    lon, lat = phi[[3, 20]] * u.rad, theta[[4, 10]] * u.rad
+    rs = r[[2, 7]]
+    t = np.array([1, 2])
+    np.testing.assert_allclose(
+        coarse.sample_at_coords(lon, lat, rs, t),
+        rho.sample_at_coords(lon, lat, rs, t),
+        rtol=1e-5,
+    )
+
+    # Regrid onto the grid of another variable
+    br = model["br"]
+    on_br = rho.regrid(like=br)
+    np.testing.assert_equal(on_br.phi_coords, br.phi_coords)
+    np.testing.assert_equal(on_br.theta_coords, br.theta_coords)
+    assert u.allclose(on_br.r_coords, br.r_coords)
@@ -0,0 +1,73 @@
+import astropy.units as u
+import numpy as np
+import pytest
+
+from psipy.model import MASOutput, Trajectory, sample_trajectories
+from psipy.util import instrumentation
+
+
+def random_trajectory(seed, n, t=None):
+    rng = np.random.default_rng(seed)
+    return Trajectory(
+        rng.uniform(0, 360, n) * u.deg,
+        rng.uniform(-80, 80, n) * u.deg,
+        rng.uniform(2, 25, n) * u.R_sun,
+        t,
+    )
+
+
+def test_sample_trajectories(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    trajectories = {
+        "a": random_trajectory(0, 20, np.full(20, 1.5)),
+        "b": random_trajectory(1, 30, np.linspace(1, 2, 30)),
+    }
+    with instrumentation.record() as report:
+        samples = model.sample_trajectories(["rho", "vr", "br"], trajectories)
+    # vr and br are on the same grid, so points are only located on two grids
+    assert report.counts["interpolate.locate"] == 2
+    assert report.counts["sampling.interpolate"] == 3
+
+    assert samples.sizes == {"point": 50}
+    assert list(samples.data_vars) == ["rho", "vr", "br"]
+    assert samples["rho"].attrs["units"] == "1 / cm3"
+    assert list(np.unique(samples.trajectory)) == ["a", "b"]
+    assert samples.r.attrs["units"] == "solRad"
+
+    for name, traj in trajectories.items():
+        selected = samples.where(samples.trajectory == name, drop=True)
+        np.testing.assert_allclose(selected.lon, traj.lon.to_value(u.deg))
+        for var in ["rho", "vr", "br"]:
+            expected = model[var].sample_at_coords(traj.lon, traj.lat, traj.r, traj.t)
+            np.testing.assert_allclose(selected[var], expected.value, rtol=1e-5)
+
+
+def test_sample_trajectories_time_bounds(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    traj = random_trajectory(0, 4, np.array([0.5, 1, 2, 2.5]))
+    samples = model.sample_trajectories(["rho"], {"a": traj})
+    np.testing.assert_equal(np.isnan(samples["rho"].values), [True, False, False, True])
+
+    # Tuples are converted to trajectories
+    samples = model.sample_trajectories(
+        ["rho"], {"a": (traj.lon, traj.lat, traj.r, traj.t)}
+    )
+    assert samples.sizes == {"point": 4}
+
+
+def test_sample_trajectories_errors(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    rho = model["rho"]
+    with pytest.raises(ValueError, match="timesteps of each trajectory"):
+        sample_trajectories([rho], {"a": random_trajectory(0, 4)})
+    with pytest.raises(ValueError, match="all or none"):
+        sample_trajectories(
+            [rho],
+            {"a": random_trajectory(0, 4), "b": random_trajectory(0, 4, [1] * 4)},
+        )
+    with pytest.raises(ValueError, match="must be unique"):
+        sample_trajectories([rho, rho], {"a": random_trajectory(0, 4)})
+    with pytest.raises(ValueError, match="do not match"):
+        Trajectory([1, 2] * u.deg, [1] * u.deg, [1, 2] * u.R_sun)
+    with pytest.raises(u.UnitsError, match="r must be in units of length"):
+        Trajectory([1, 2] * u.deg, [1, 2] * u.deg, [1, 2] * u.deg)
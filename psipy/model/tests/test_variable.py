@@ -1,8 +1,88 @@
+import concurrent.futures
+import pickle
+import sys
+import threading
+import tracemalloc
+
 import astropy.units as u
 import numpy as np
 import pytest
+import xarray as xr
+
+from psipy.model import MASOutput, Variable
+
+
+def test_variable_no_copy(all_mas_models):
+    # Check that creating a variable doesn't copy the data
+    data = all_mas_models.load_file("rho")
+    tracemalloc.start()
+    try:
+        rho = Variable(data, "rho", u.cm**-3, u.R_sun)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 0.01 * data["rho"].nbytes
+    assert np.shares_memory(rho._data.values, data["rho"].values)
+    for dim in ["phi", "theta", "r", "time"]:
+        assert np.all(np.diff(rho._data.coords[dim].values) >= 0)
+
+
+def test_variable_sorting():
+    # Check that unsorted coordinates are still sorted
+    data = np.arange(24, dtype=float).reshape((2, 3, 4, 1))
+    phi = [1, 0]
+    theta = [0, 2, 1]
+    r = [4, 3, 2, 1]
+    data = xr.DataArray(
+        data, coords=[phi, theta, r, [0]], dims=["phi", "theta", "r", "time"]
+    )
+    var = Variable(xr.Dataset({"var": data}), "var", u.m, u.m)
+    np.testing.assert_equal(var.phi_coords, [0, 1])
+    np.testing.assert_equal(var.theta_coords, [0, 1, 2])
+    np.testing.assert_equal(var.r_coords.value, [1, 2, 3, 4])
+    expected = data.sortby(["phi", "theta", "r"]).values
+    np.testing.assert_equal(var.data.values, expected)
 
-from psipy.model import Variable
+
+def test_data_scale_threads():
+    # Applying a pending unit conversion from several threads at once should
+    # only apply it once
+    data = xr.DataArray(
+        np.ones((64, 32, 32, 1)),
+        coords=[np.arange(64), np.arange(32), np.arange(32), [0]],
+        dims=["phi", "theta", "r", "time"],
+    )
+    n_threads = 4
+    # Switch between threads often, to make a race more likely
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(200):
+            var = Variable(xr.Dataset({"var": data}), "var", u.m, u.m, scale=2)
+            barrier = threading.Barrier(n_threads)
+
+            def read(_):
+                barrier.wait()
+                return var.data.values
+
+            with concurrent.futures.ThreadPoolExecutor(n_threads) as pool:
+                results = list(pool.map(read, range(n_threads)))
+            for result in results:
+                np.testing.assert_equal(result, 2)
+            np.testing.assert_equal(var.isel().values, 2)
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+def test_variable_pickle():
+    data = xr.DataArray(
+        np.ones((4, 3, 2, 1)),
+        coords=[np.arange(4), np.arange(3), np.arange(2), [0]],
+        dims=["phi", "theta", "r", "time"],
+    )
+    var = Variable(xr.Dataset({"var": data}), "var", u.m, u.m, scale=2)
+    var = pickle.loads(pickle.dumps(var))
+    np.testing.assert_equal(var.data.values, 2)
 
 
 def test_var_error(mas_model):
@@ -11,8 +91,31 @@ def test_var_error(mas_model):
 
 
 def test_radial_normalised(mas_model):
-    norm = mas_model["rho"].radial_normalized(-2)
+    rho = mas_model["rho"]
+    norm = rho.radial_normalized(-2)
     assert isinstance(norm, Variable)
+    # Data shouldn't have been copied
+    assert norm._data.data is rho._data.data
+
+    r_factor = (rho.r_coords[10] / u.R_sun).to_value(u.dimensionless_unscaled)
+    np.testing.assert_allclose(
+        norm.isel(r=10).values, rho.isel(r=10).values * r_factor**-2, rtol=1e-6
+    )
+    # Normalisations should compose
+    norm2 = norm.radial_normalized(-1)
+    np.testing.assert_allclose(
+        norm2.isel(r=10).values, rho.isel(r=10).values * r_factor**-3, rtol=1e-6
+    )
+    np.testing.assert_allclose(
+        norm2.data.isel(r=10).values, rho.isel(r=10).values * r_factor**-3, rtol=1e-6
+    )
+
+
+def test_weighted_error(mas_model):
+    with pytest.raises(ValueError, match="Weights for r must have shape"):
+        mas_model["rho"].weighted(r=[1, 2])
+    with pytest.raises(ValueError, match="one of the dimensions .*got 'lat'"):
+        mas_model["rho"].weighted(lat=[1, 2])
 
 
 # Check different shaped input, including lon/lat points that go up/down in
@@ -76,3 +179,57 @@ def test_sample_out_of_bounds(pluto_model):
     assert np.isnan(samples[0])
     assert not np.isnan(samples[1])
     assert np.isnan(samples[2])
+
+
+def test_cell_volumes(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    rho = model["rho"]
+    volumes = rho.cell_volumes
+    assert volumes.shape == rho.data.shape[:3]
+    assert volumes.unit == u.R_sun**3
+    # Weights are cached
+    assert rho.cell_volumes is volumes
+    # Ghost cells beyond the poles have (almost) no volume
+    assert volumes[:, 0, :].sum() < 1e-8 * volumes.sum()
+    assert volumes[:, -1, :].sum() < 1e-8 * volumes.sum()
+
+    # Cells fill a spherical shell
+    r = rho.r_coords.to_value(u.R_sun)
+    r_lo = (3 * r[0] - r[1]) / 2
+    r_hi = (3 * r[-1] - r[-2]) / 2
+    expected = 4 * np.pi / 3 * (r_hi**3 - r_lo**3) * u.R_sun**3
+    assert u.allclose(volumes.sum(), expected)
+    areas = rho.shell_areas.sum(axis=(0, 1))
+    assert u.allclose(areas, 4 * np.pi * rho.r_coords**2)
+
+    # Weights are updated when the coordinates change units
+    rho.r_coords = rho.r_coords.to(u.km)
+    assert u.allclose(rho.cell_volumes.sum(), expected)
+
+
+def test_volume_integral(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    rho = model["rho"]
+    integral = rho.volume_integral()
+    assert integral.shape == (rho.n_timesteps,)
+    assert integral.unit == u.cm**-3 * u.R_sun**3
+    for i in range(rho.n_timesteps):
+        expected = np.sum(rho.isel(time=i).values * rho.cell_volumes.value)
+        assert np.isclose(integral[i].value, expected, rtol=1e-5)
+
+    squared = rho.volume_integral(power=2)
+    assert squared.unit == u.cm**-6 * u.R_sun**3
+
+
+def test_shell_integral(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    br = model["br"]
+    unsigned = br.shell_integral(absolute=True)
+    assert unsigned.shape == (br.r_coords.size, br.n_timesteps)
+    assert unsigned.unit == u.G * u.R_sun**2
+    # The unsigned flux of a dipole falls off as 1/r
+    flux_r = (unsigned[:, 0] * br.r_coords).value
+    np.testing.assert_allclose(flux_r[1:-1], flux_r[1], rtol=1e-2)
+    # and the net flux through each shell is much smaller
+    net = br.shell_integral()
+    assert np.all(np.abs(net) < 0.1 * unsigned)
@@ -0,0 +1,89 @@
+import astropy.units as u
+import numpy as np
+import pytest
+import xarray as xr
+from scipy import integrate
+
+from psipy.model import MASOutput, Variable, thomson_image
+from psipy.model.whitelight import _SIGMA_E, _van_de_hulst
+
+
+def spherical_density(func):
+    phi = np.linspace(0, 2 * np.pi, 32, endpoint=False)
+    lat = np.linspace(-1.5, 1.5, 31)
+    r = np.geomspace(1, 30, 400)
+    data = np.broadcast_to(func(r), (32, 31, 400))[..., None]
+    dataset = xr.Dataset(
+        {"rho": (("phi", "theta", "r", "time"), data)},
+        coords={"phi": phi, "theta": lat, "r": r, "time": [0]},
+    )
+    return Variable(dataset, "rho", u.cm**-3, u.R_sun)
+
+
+def plane_of_sky_distance(image):
+    return np.hypot(image.x.values[None, :], image.y.values[:, None])
+
+
+def test_van_de_hulst():
+    # Far from the Sun, scattering is from a point source
+    a, b, c, d = _van_de_hulst(np.array([100.0]))
+    np.testing.assert_allclose([a, c], 1e-4, rtol=1e-3)
+    np.testing.assert_allclose([b, d], 2 / 3 * 1e-4, rtol=1e-3)
+
+
+def test_thomson_image():
+    def density(r):
+        return 1e6 * r**-3
+
+    ne = spherical_density(density)
+    # A distant observer, so rays are almost parallel
+    image = thomson_image(
+        ne, 0 * u.deg, 0 * u.deg, 1e4 * u.AU, fov=4 * u.R_sun, shape=(20, 24)
+    )
+    assert image["B"].shape == (20, 24)
+    assert image.x.size == 24
+    np.testing.assert_allclose(image.x[[0, -1]], [-4 + 1 / 6, 4 - 1 / 6])
+
+    # Pixels that see the disk of the Sun are NaN
+    impact = plane_of_sky_distance(image)
+    np.testing.assert_equal(np.isnan(image["B"].values), impact < 1)
+    # The image of a spherically symmetric corona is symmetric
+    pb = image["pB"].values
+    np.testing.assert_allclose(pb, pb[::-1, ::-1], rtol=1e-6)
+    assert (pb[impact > 1] < image["B"].values[impact > 1]).all()
+
+    # Compare a pixel to integrating along the line of sight
+    y_idx, x_idx = 12, 20
+    rho = impact[y_idx, x_idx]
+
+    def integrand(z, polarized):
+        r = np.hypot(rho, z)
+        a, b, c, d = _van_de_hulst(r)
+        pb = (rho / r) ** 2 * (0.37 * a + 0.63 * b)
+        return density(r) * (pb if polarized else 2 * (0.37 * c + 0.63 * d) - pb)
+
+    scale = np.pi * _SIGMA_E / (2 * (1 - 0.63 / 3)) * u.R_sun.to(u.cm)
+    z_max = np.sqrt(30**2 - rho**2)
+    for name, polarized in [("B", False), ("pB", True)]:
+        expected = integrate.quad(integrand, -z_max, z_max, args=(polarized,))[0]
+        np.testing.assert_allclose(
+            image[name][y_idx, x_idx], expected * scale, rtol=1e-3
+        )
+
+
+def test_thomson_image_mas(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    rho = model["rho"]
+    kwargs = dict(fov=10 * u.R_sun, shape=32, occulter=2 * u.R_sun, t_idx=1)
+    image = thomson_image(rho, 30 * u.deg, 10 * u.deg, **kwargs)
+    impact = plane_of_sky_distance(image)
+    np.testing.assert_equal(np.isnan(image["pB"].values), impact < 2)
+    assert (image["pB"].values[impact > 2] > 0).all()
+    # Using more than one thread gives the same result
+    threaded = thomson_image(rho, 30 * u.deg, 10 * u.deg, max_workers=4, **kwargs)
+    xr.testing.assert_identical(image, threaded)
+
+    with pytest.raises(ValueError, match="must be a number density"):
+        thomson_image(model["vr"], 0 * u.deg, 0 * u.deg)
+    with pytest.raises(ValueError, match="above a pole"):
+        thomson_image(rho, 0 * u.deg, 90 * u.deg)
@@ -1,15 +1,19 @@
+import collections
 import copy
+import operator
 import textwrap
+import threading
 import warnings
 from typing import Optional
 
 import astropy.units as u
 import numpy as np
 import xarray as xr
-from scipy import interpolate
 
-import psipy.visualization as viz
+from psipy.util import instrumentation
 from psipy.util.decorators import add_common_docstring
+from .reductions import reduce_time
+from .regrid import _is_periodic, get_regridder
 
 __all__ = ["Variable"]
 
@@ -29,6 +33,108 @@ returns_doc = textwrap.indent(
 )
 
 
+def _lod_level(shape, ax):
+    """
+    Get the level of detail needed to plot an array of *shape* on *ax*.
+
+    This is the number of times the array can be downsampled by a factor of
+    two along every dimension and still have at least as many cells as there
+    are pixels across the axes.
+    """
+    bbox = ax.get_window_extent()
+    n_pixels = max(bbox.width, bbox.height, 1)
+    ratio = min(shape) / n_pixels
+    if ratio < 2:
+        return 0
+    return int(np.floor(np.log2(ratio)))
+
+
+def _block_mean(data, dim):
+    """
+    Average *data* over blocks of two cells along *dim*.
+
+    If there are an odd number of cells the last block only contains a single
+    cell, so the full extent of the data is kept.
+    """
+    axis = data.get_axis_num(dim)
+    n = data.sizes[dim]
+    starts = np.arange(0, n, 2)
+    counts = np.diff(np.append(starts, n))
+    shape = [1] * data.ndim
+    shape[axis] = -1
+    values = np.add.reduceat(np.asarray(data), starts, axis=axis)
+    values = values / counts.reshape(shape)
+    coord = np.add.reduceat(data.coords[dim].values, starts) / counts
+    return data.isel({dim: starts}).copy(data=values).assign_coords({dim: coord})
+
+
+def _downsample(data, dims, method):
+    """
+    Downsample *data* by a factor of two along each of *dims*.
+    """
+    if method == "stride":
+        return data.isel({dim: slice(None, None, 2) for dim in dims})
+    elif method == "mean":
+        for dim in dims:
+            data = _block_mean(data, dim)
+        return data
+    raise ValueError(f"lod_method must be 'mean', 'stride' or None, not {method}")
+
+
+def _sort_coords(data, dims):
+    """
+    Sort *data* so the coordinates along each of *dims* are increasing.
+
+    Dimensions that are already sorted are left alone, and dimensions that are
+    sorted in reverse are reversed with a slice, so in both these cases the
+    data is not copied.
+    """
+    unsorted = []
+    for dim in dims:
+        diff = np.diff(data.coords[dim].values)
+        if np.all(diff >= 0):
+            continue
+        elif np.all(diff <= 0):
+            data = data.isel({dim: slice(None, None, -1)})
+        else:
+            unsorted.append(dim)
+
+    if unsorted:
+        data = data.sortby(unsorted)
+    return data
+
+
+def _bounding_slice(coords, values):
+    """
+    Get the slice of sorted *coords* needed to interpolate at *values*.
+    """
+    values = values[np.isfinite(values)]
+    if not values.size:
+        return slice(None)
+    start = np.searchsorted(coords, np.min(values), side="right") - 1
+    stop = np.searchsorted(coords, np.max(values), side="left") + 1
+    # Always keep at least two coordinates to interpolate between
+    start = min(max(start, 0), len(coords) - 2)
+    stop = max(min(stop, len(coords)), start + 2)
+    return slice(start, stop)
+
+
+def _cell_edges(coords, lo=-np.inf, hi=np.inf):
+    """
+    Get the edges of the cells centred on *coords*.
+
+    Inner edges are halfway between coordinates, and the outer edges are half
+    a cell beyond the first and last coordinates. Edges are clipped to the
+    range [*lo*, *hi*], so cells outside this range have zero width.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    if len(coords) < 2:
+        return np.repeat(coords, 2)
+    mid = (coords[1:] + coords[:-1]) / 2
+    edges = np.concatenate([[2 * coords[0] - mid[0]], mid, [2 * coords[-1] - mid[-1]]])
+    return np.clip(edges, lo, hi)
+
+
 class Variable:
     """
     A single scalar variable.
@@ -47,17 +153,50 @@ class Variable:
         Variable unit for the scalar data.
     r_unit : astropy.units.Quantity
         Unit for the radial coordinates.
+    scale : float, optional
+        Factor that *data* must be multiplied by to give values in *unit*.
+
+    Notes
+    -----
+    Unit conversions are deferred: the conversion factor is stored, and only
+    applied to values as they are selected (by `Variable.isel`), sampled, or
+    plotted. This means changing the units of a variable takes the same time
+    regardless of its size. Scaling along individual axes (e.g. with
+    `Variable.radial_normalized`) is deferred in the same way.
+
+    If a slice of data has many more cells than there are pixels in the axes
+    it is plotted on, the plotting methods plot a downsampled copy instead.
+    The data is downsampled by factors of two, either by averaging blocks of
+    cells (``lod_method = 'mean'``, the default) or by taking every other cell
+    (``lod_method = 'stride'``). Downsampled slices are cached, so plotting the
+    same slice again is fast. To always plot data at full resolution set
+    ``lod_method = None``.
     """
 
-    def __init__(self, data, name, unit, runit):
+    #: Method used to downsample slices before plotting.
+    lod_method = "mean"
+    #: Maximum number of downsampled slices to cache.
+    lod_cache_size = 16
+
+    def __init__(self, data, name, unit, runit, scale=1):
         # Convert from xarray Dataset to DataArray
-        self._data = data[name]
+        data = data[name]
         # Sort the data once now for any interpolation later
-        self._data = self._data.transpose(*["phi", "theta", "r", "time"])
-        self._data = self._data.sortby(["phi", "theta", "r", "time"])
+        dims = ["phi", "theta", "r", "time"]
+        if list(data.dims) != dims:
+            data = data.transpose(*dims)
+        self._data = _sort_coords(data, dims)
         self.name = name
         self._unit = unit
         self._runit = runit
+        self._scale = scale
+        # 1D weights along individual dimensions, applied with the scale
+        self._weights = {}
+        # Guards changes to the data, scale and weights, which must be swapped
+        # together
+        self._lock = threading.Lock()
+        self._lod_cache = collections.OrderedDict()
+        self._geometry_cache = {}
 
     def __str__(self):
         return textwrap.dedent(
@@ -74,8 +213,139 @@ class Variable:
     def data(self):
         """
         `xarray.DataArray` with the data.
+
+        Notes
+        -----
+        If there is a pending unit conversion, the first access applies it to
+        the whole array. To only work with a subset of the data, use
+        `Variable.isel`, which avoids this.
+        """
+        with self._lock:
+            data, scale, weights = self._data, self._scale, self._weights
+            if scale == 1 and not weights:
+                return data
+            # Don't modify in place, as the unscaled data may be shared
+            data = self._apply_scale(data.isel(), {}, scale, weights)
+            self._data, self._scale, self._weights = data, 1, {}
+            return data
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Locks can't be pickled
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def isel(self, **indexers):
+        """
+        Select a subset of the data by index.
+
+        Any pending unit conversion or axis weights are only applied to the
+        selected data.
+
+        Parameters
+        ----------
+        indexers :
+            Passed to `xarray.DataArray.isel`.
+
+        Returns
+        -------
+        xarray.DataArray
+        """
+        with self._lock:
+            data, scale, weights = self._data, self._scale, self._weights
+        sliced = data.isel(**indexers)
+        if scale == 1 and not weights:
+            return sliced
+        return self._apply_scale(sliced, indexers, scale, weights)
+
+    def _apply_scale(self, sliced, indexers, scale, weights):
+        """
+        Apply a scale and axis weights to data selected with *indexers*.
+        """
+        with instrumentation.timer("variable.apply_scale", var=self.name):
+            for dim, weight in weights.items():
+                weight = xr.DataArray(
+                    weight, dims=[dim], coords={dim: self._data.coords[dim]}
+                )
+                if dim in indexers:
+                    weight = weight.isel({dim: indexers[dim]})
+                sliced = sliced * weight.astype(sliced.dtype, copy=False)
+            if scale != 1:
+                if np.issubdtype(sliced.dtype, np.floating):
+                    # Keep the data type of the stored data
+                    scale = sliced.dtype.type(scale)
+                sliced = sliced * scale
+        instrumentation.count("variable.bytes_allocated", sliced.nbytes, var=self.name)
+        return sliced
+
+    def weighted(self, name=None, **weights):
+        """
+        Return a copy of this variable multiplied by weights along one or more
+        dimensions.
+
+        The data is not copied, and the weights are only applied to values as
+        they are selected, sampled, or plotted.
+
+        Parameters
+        ----------
+        name : str, optional
+            Name of the new variable. Defaults to the name of this variable.
+        weights :
+            Mapping from dimension names to 1D arrays of weights, with one
+            weight for each coordinate along that dimension.
+
+        Returns
+        -------
+        Variable
+
+        Examples
+        --------
+        To multiply a variable by :math:`\\cos(\\theta)`::
+
+            var.weighted(theta=np.cos(var.theta_coords))
+        """
+        new = copy.copy(self)
+        with self._lock:
+            data, new._scale, new._weights = self._data, self._scale, self._weights
+        # Shallow copy so the data is shared but coordinates aren't
+        new._data = data.copy(deep=False)
+        new.name = name or self.name
+        new._weights = dict(new._weights)
+        new._lock = threading.Lock()
+        for dim, weight in weights.items():
+            if dim not in self._data.dims:
+                raise ValueError(
+                    f"Weights must be along one of the dimensions "
+                    f"{list(self._data.dims)}, got '{dim}'"
+                )
+            weight = np.asarray(weight)
+            if weight.shape != (self._data.sizes[dim],):
+                raise ValueError(
+                    f"Weights for {dim} must have shape {(self._data.sizes[dim],)}, "
+                    f"got {weight.shape}"
+                )
+            new._weights[dim] = new._weights.get(dim, 1) * weight
+        new._lod_cache = collections.OrderedDict()
+        new._geometry_cache = {}
+        return new
+
+    @property
+    def nbytes(self):
+        """
+        Number of bytes used by the data.
+        """
+        return self._data.nbytes
+
+    @property
+    def dtype(self):
+        """
+        Data type of the data.
         """
-        return self._data
+        return self._data.dtype
 
     @property
     def unit(self):
@@ -88,8 +358,10 @@ class Variable:
     def unit(self, new_unit):
         # This line will error if untis aren't compatible
         conversion = float(1 * self._unit / new_unit)
-        self._data *= conversion
-        self._unit = new_unit
+        with self._lock:
+            self._scale *= conversion
+            self._unit = new_unit
+        self._lod_cache.clear()
 
     @property
     def r_coords(self):
@@ -102,6 +374,8 @@ class Variable:
     def r_coords(self, coords: u.m):
         self._data.coords["r"] = coords.value
         self._runit = coords.unit
+        self._lod_cache.clear()
+        self._geometry_cache = {}
 
     @property
     def theta_coords(self):
@@ -137,6 +411,8 @@ class Variable:
 
         Multiplies the variable by :math:`(r / r_{\odot})^{\gamma}`,
         where :math:`\gamma` = ``radial_exponent`` is the given exponent.
+        The data is not copied; the normalisation is only applied to values
+        as they are selected, sampled, or plotted (see `Variable.weighted`).
 
         Parameters
         ----------
@@ -149,10 +425,317 @@ class Variable:
         norm_factor = (self.r_coords / u.R_sun).to_value(
             u.dimensionless_unscaled
         ) ** radial_exponent
-        data = xr.dot(self.data, xr.Variable("r", norm_factor), dims=())
         name = self.name + f" $r^{radial_exponent}$"
-        unit = self.unit
-        return Variable(xr.Dataset({name: data}), name, unit, self._runit)
+        return self.weighted(name, r=norm_factor)
+
+    def reduce_time(
+        self,
+        method: str,
+        *,
+        q: Optional[float] = None,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Reduce this variable over time.
+
+        The data is reduced one timestep at a time, so only one timestep at a
+        time has any pending unit conversion applied. To reduce a variable
+        without loading all of its timesteps into memory first, use
+        `ModelOutput.reduce_time <psipy.model.base.ModelOutput.reduce_time>`.
+
+        Parameters
+        ----------
+        method : {'mean', 'std', 'min', 'max', 'quantile'}
+            Reduction. 'std' is the population standard deviation.
+        q : float, optional
+            Quantile to calculate, between 0 and 1. Only used (and required)
+            if ``method='quantile'``. Quantiles are estimated using the P²
+            algorithm, so are approximate if there are five or more
+            timesteps.
+        max_workers : int, optional
+            If greater than one, prepare up to this many timesteps ahead in a
+            pool of threads.
+
+        Returns
+        -------
+        Variable
+            Variable with a single timestep. The time coordinate is the first
+            timestep of this variable.
+        """
+        data = reduce_time(
+            lambda i: self.isel(time=i),
+            range(self.n_timesteps),
+            method,
+            q=q,
+            max_workers=max_workers,
+        )
+        return Variable(
+            data.expand_dims("time", axis=-1).to_dataset(name=self.name),
+            self.name,
+            self._unit,
+            self._runit,
+        )
+
+    def regrid(
+        self,
+        phi=None,
+        theta=None,
+        r=None,
+        *,
+        like: Optional["Variable"] = None,
+        extrapolate: bool = False,
+    ):
+        """
+        Linearly interpolate this variable onto a new grid.
+
+        The interpolation weights are cached, so regridding several variables
+        (or timesteps) between the same pair of grids only calculates them
+        once. Longitudes are interpolated periodically if this variable covers
+        all longitudes.
+
+        Parameters
+        ----------
+        phi, theta : array, optional
+            New longitude and latitude coordinates, in radians. Defaults to
+            the current coordinates.
+        r : astropy.units.Quantity, optional
+            New radial coordinates. Defaults to the current coordinates.
+        like : Variable, optional
+            Variable (e.g. from another model run) to take any coordinates
+            that aren't given from.
+        extrapolate : bool, optional
+            If `True`, linearly extrapolate to points outside the current
+            grid. Otherwise values outside the current grid are NaN.
+
+        Returns
+        -------
+        Variable
+        """
+        if like is not None:
+            phi = like.phi_coords if phi is None else phi
+            theta = like.theta_coords if theta is None else theta
+            r = like.r_coords if r is None else r
+        phi = self.phi_coords if phi is None else u.Quantity(phi, u.rad).value
+        theta = self.theta_coords if theta is None else u.Quantity(theta, u.rad).value
+        r = self.r_coords if r is None else r
+        r = r.to_value(self._runit)
+
+        source = [self.phi_coords, self.theta_coords, self._data.coords["r"].values]
+        regridder = get_regridder(source, [phi, theta, r], extrapolate=extrapolate)
+        data = np.empty(regridder.shape + (self.n_timesteps,), dtype=self.dtype)
+        for i in range(self.n_timesteps):
+            data[..., i] = regridder(self.isel(time=i).values)
+
+        data = xr.DataArray(
+            data,
+            dims=["phi", "theta", "r", "time"],
+            coords={"phi": phi, "theta": theta, "r": r, "time": self.time_coords},
+        )
+        return Variable(
+            data.to_dataset(name=self.name), self.name, self._unit, self._runit
+        )
+
+    def _axis_weights(self):
+        """
+        Get the factors of the cell volumes along each axis.
+
+        The volume of a cell is the product of the phi, theta, and r factors,
+        in units of ``runit**3``.
+        """
+        if "axis_weights" not in self._geometry_cache:
+            phi = np.diff(_cell_edges(self.phi_coords))
+            theta = np.diff(
+                np.sin(_cell_edges(self.theta_coords, -np.pi / 2, np.pi / 2))
+            )
+            r = np.diff(_cell_edges(self.r_coords.value, lo=0) ** 3) / 3
+            self._geometry_cache["axis_weights"] = phi, theta, r
+        return self._geometry_cache["axis_weights"]
+
+    @property
+    def cell_volumes(self) -> u.Quantity:
+        """
+        Volume of each cell, as a (phi, theta, r) shaped array.
+
+        Cell edges are taken to be halfway between coordinates, with the
+        outer cells extending half a cell beyond the first and last
+        coordinates. Cells beyond the poles have zero volume.
+        """
+        if "cell_volumes" not in self._geometry_cache:
+            phi, theta, r = self._axis_weights()
+            self._geometry_cache["cell_volumes"] = (
+                phi[:, None, None] * theta[None, :, None] * r[None, None, :]
+            ) * self._runit**3
+        return self._geometry_cache["cell_volumes"]
+
+    @property
+    def shell_areas(self) -> u.Quantity:
+        """
+        Area of each cell on the spherical shell through its radial
+        coordinate, as a (phi, theta, r) shaped array.
+
+        Cell edges are defined in the same way as for
+        `Variable.cell_volumes`.
+        """
+        if "shell_areas" not in self._geometry_cache:
+            phi, theta, _ = self._axis_weights()
+            r = self.r_coords.value
+            self._geometry_cache["shell_areas"] = (
+                phi[:, None, None] * theta[None, :, None] * r[None, None, :] ** 2
+            ) * self._runit**2
+        return self._geometry_cache["shell_areas"]
+
+    def _integrand(self, t_idx, power, absolute):
+        values = self.isel(time=t_idx).values
+        if absolute:
+            values = np.abs(values)
+        if power != 1:
+            values = values**power
+        return values
+
+    def volume_integral(self, *, power: float = 1, absolute: bool = False):
+        """
+        Integrate this variable over the volume of the model, at each
+        timestep.
+
+        The integral is calculated one timestep at a time, without creating
+        any arrays larger than a single timestep.
+
+        Parameters
+        ----------
+        power : float, optional
+            Raise the data to this power before integrating, e.g. ``power=2``
+            to integrate the square of a magnetic field component.
+        absolute : bool, optional
+            If `True`, integrate the absolute value of the data.
+
+        Returns
+        -------
+        astropy.units.Quantity
+            Integral at each timestep.
+
+        Examples
+        --------
+        To calculate the magnetic energy in a MAS model::
+
+            energy = sum(
+                model[var].volume_integral(power=2) for var in ["br", "bt", "bp"]
+            ) / (8 * np.pi)
+
+        See Also
+        --------
+        Variable.cell_volumes
+        """
+        phi, theta, r = self._axis_weights()
+        integral = [
+            np.einsum("ptr,p,t,r->", self._integrand(i, power, absolute), phi, theta, r)
+            for i in range(self.n_timesteps)
+        ]
+        return np.array(integral) * self._unit**power * self._runit**3
+
+    def shell_integral(self, *, power: float = 1, absolute: bool = False):
+        """
+        Integrate this variable over the spherical shell through each radial
+        coordinate, at each timestep.
+
+        For example, ``br.shell_integral(absolute=True)`` is the unsigned
+        magnetic flux through each shell. The integral is calculated one
+        timestep at a time, without creating any arrays larger than a single
+        timestep.
+
+        Parameters
+        ----------
+        power : float, optional
+            Raise the data to this power before integrating.
+        absolute : bool, optional
+            If `True`, integrate the absolute value of the data.
+
+        Returns
+        -------
+        astropy.units.Quantity
+            (r, time) shaped array with the integral over each shell at each
+            timestep.
+
+        See Also
+        --------
+        Variable.shell_areas
+        """
+        phi, theta, _ = self._axis_weights()
+        r2 = self.r_coords.value**2
+        integral = [
+            np.einsum("ptr,p,t->r", self._integrand(i, power, absolute), phi, theta)
+            * r2
+            for i in range(self.n_timesteps)
+        ]
+        return np.stack(integral, axis=-1) * self._unit**power * self._runit**2
+
+    def _plot_slice(self, ax, dims, t_idx, level=None, **indexers):
+        """
+        Get a slice of data to plot on *ax*, at a level of detail suited to
+        the resolution of *ax*.
+
+        Parameters
+        ----------
+        ax : matplotlib.axes.Axes
+            Axes the slice will be plotted on.
+        dims : list of str
+            The two dimensions that are plotted.
+        t_idx : int, optional
+            Time index. If `None`, all timesteps are kept.
+        level : int, optional
+            Level of detail. If not given, this is worked out from the current
+            size of *ax*. Frames used to update an existing plot should pass
+            the level of that plot, because the size of *ax* changes once a
+            colorbar has been added.
+        indexers :
+            Indices for the dimension that is sliced.
+
+        Returns
+        -------
+        sliced : xarray.DataArray
+            Slice with the two plotted dimensions, and a time dimension.
+        level : int
+            Level of detail of the slice.
+        """
+        try:
+            # Normalise integer indices (e.g. numpy integers or 0D arrays) so
+            # they can be used in the cache key
+            key = (
+                self.lod_method,
+                tuple(dims),
+                tuple((dim, operator.index(idx)) for dim, idx in indexers.items()),
+                None if t_idx is None else operator.index(t_idx),
+            )
+        except TypeError:
+            # Slices aren't cached if they aren't indexed by integers
+            key = None
+        if t_idx is not None:
+            indexers["time"] = [t_idx]
+        sliced = self.isel(**indexers)
+        if self.lod_method is None:
+            return sliced, 0
+
+        if level is None:
+            level = _lod_level([sliced.sizes[dim] for dim in dims], ax)
+        if key is None:
+            for _ in range(level):
+                sliced = _downsample(sliced, dims, self.lod_method)
+            return sliced, level
+
+        # Find the most downsampled cached level that is still detailed enough
+        for base_level in range(level, 0, -1):
+            if key + (base_level,) in self._lod_cache:
+                sliced = self._lod_cache[key + (base_level,)]
+                self._lod_cache.move_to_end(key + (base_level,))
+                break
+        else:
+            base_level = 0
+
+        for lod in range(base_level + 1, level + 1):
+            sliced = _downsample(sliced, dims, self.lod_method)
+            self._lod_cache[key + (lod,)] = sliced
+            if len(self._lod_cache) > self.lod_cache_size:
+                self._lod_cache.popitem(last=False)
+        return sliced, level
 
     # Methods for radial cuts
     @add_common_docstring(returns_doc=returns_doc)
@@ -177,14 +760,16 @@ class Variable:
         -------
         {returns_doc}
         """
-        r_slice = self.data.isel(r=r_idx)
-        time_slice = r_slice.isel(time=t_idx or 0)
+        from psipy import visualization as viz
 
         # Setup axes
         ax = viz.setup_radial_ax(ax)
+        r_slice, level = self._plot_slice(ax, ["phi", "theta"], t_idx, r=r_idx)
+        time_slice = r_slice.isel(time=0)
         # Set colorbar string
         kwargs = self._set_cbar_label(kwargs, self.unit.to_string("latex"))
         quad_mesh = time_slice.plot(x="phi", y="theta", ax=ax, **kwargs)
+        quad_mesh._lod_level = level
         # Plot formatting
         r = r_slice["r"].values
         ax.set_title(f"{self.name}, r={r:.2f}" + r"$R_{\odot}$")
@@ -212,8 +797,10 @@ class Variable:
         kwargs :
             Additional keyword arguments are passed to `xarray.plot.contour`.
         """
+        from psipy import visualization as viz
+
         ax = viz.setup_radial_ax(ax)
-        sliced = self.data.isel(r=r_idx, time=t_idx)
+        sliced = self.isel(r=r_idx, time=t_idx)
         # Need to save a copy of the title to reset it later, since xarray
         # tries to set it's own title that we don't want
         title = ax.get_title()
@@ -243,13 +830,16 @@ class Variable:
         -------
         {returns_doc}
         """
-        phi_slice = self.data.isel(phi=phi_idx)
-        time_slice = phi_slice.isel(time=t_idx or 0)
+        from psipy import visualization as viz
 
         ax = viz.setup_polar_ax(ax)
+        phi_slice, level = self._plot_slice(ax, ["theta", "r"], t_idx, phi=phi_idx)
+        time_slice = phi_slice.isel(time=0)
+
         kwargs = self._set_cbar_label(kwargs, self.unit.to_string("latex"))
         # Take slice of data and plot
         quad_mesh = time_slice.plot(x="theta", y="r", ax=ax, **kwargs)
+        quad_mesh._lod_level = level
         viz.format_polar_ax(ax)
 
         phi = np.rad2deg(time_slice["phi"].values)
@@ -277,8 +867,10 @@ class Variable:
         kwargs :
             Additional keyword arguments are passed to `xarray.plot.contour`.
         """
+        from psipy import visualization as viz
+
         ax = viz.setup_polar_ax(ax)
-        sliced = self.data.isel(phi=i, time=t_idx)
+        sliced = self.isel(phi=i, time=t_idx)
         # Need to save a copy of the title to reset it later, since xarray
         # tries to set it's own title that we don't want
         title = ax.get_title()
@@ -291,7 +883,7 @@ class Variable:
         """
         The theta index of the solar equator.
         """
-        return (self.data.shape[1] - 1) // 2
+        return (self._data.shape[1] - 1) // 2
 
     # Methods for equatorial cuts
     @add_common_docstring(returns_doc=returns_doc)
@@ -314,13 +906,18 @@ class Variable:
         -------
         {returns_doc}
         """
-        theta_slice = self.data.isel(theta=self._equator_theta_idx)
-        time_slice = theta_slice.isel(time=t_idx or 0)
+        from psipy import visualization as viz
 
         ax = viz.setup_polar_ax(ax)
+        theta_slice, level = self._plot_slice(
+            ax, ["phi", "r"], t_idx, theta=self._equator_theta_idx
+        )
+        time_slice = theta_slice.isel(time=0)
+
         kwargs = self._set_cbar_label(kwargs, self.unit.to_string("latex"))
         # Take slice of data and plot
         quad_mesh = time_slice.plot(x="phi", y="r", ax=ax, **kwargs)
+        quad_mesh._lod_level = level
         viz.format_equatorial_ax(ax)
 
         ax.set_title(f"{self.name}, equatorial plane")
@@ -345,8 +942,10 @@ class Variable:
         kwargs :
             Additional keyword arguments are passed to `xarray.plot.contour`.
         """
+        from psipy import visualization as viz
+
         ax = viz.setup_polar_ax(ax)
-        sliced = self.data.isel(theta=self._equator_theta_idx, time=t_idx)
+        sliced = self.isel(theta=self._equator_theta_idx, time=t_idx)
         # Need to save a copy of the title to reset it later, since xarray
         # tries to set it's own title that we don't want
         title = ax.get_title()
@@ -395,7 +994,13 @@ class Variable:
         -----
         Linear interpolation is used to interpoalte between cells. See the
         docstring of `scipy.interpolate.interpn` for more information.
+
+        Longitudes are wrapped around 360 degrees if the variable covers all
+        longitudes. If it only covers some longitudes (e.g. it was loaded with
+        longitude bounds), values outside those longitudes are NaN.
         """
+        from scipy import interpolate
+
         if lat.shape != lon.shape:
             raise ValueError(
                 f"Shapes of latitude {lat.shape} and longitude {lon.shape} coordinates do not match."
@@ -409,23 +1014,25 @@ class Variable:
                 f"Shapes of time {t.shape} and longitude {lon.shape} coordinates do not match."
             )
         dims = ["phi", "theta", "r", "time"]
-        points = [self.data.coords[dim].values for dim in dims]
-        values = self.data.values
+        points = [self._data.coords[dim].values for dim in dims]
 
         # Pad phi points so it's possible to interpolate all the way from
-        # 0 to 360 deg
+        # 0 to 360 deg. This is only done if the data covers all longitudes
+        # (e.g. it wasn't loaded with longitude bounds); otherwise points
+        # outside the loaded longitudes are NaN.
         pcoords = points[0]
+        pad_phi = False
         if np.allclose(pcoords[1], pcoords[-1] - (2 * np.pi), rtol=0, atol=1e-6):
             # If second and last points are the same, don't need to wrap
             pass
-        elif not np.allclose(pcoords[0], pcoords[-1] - (2 * np.pi), rtol=0, atol=1e-6):
+        elif _is_periodic(pcoords, 2 * np.pi) and not np.allclose(
+            pcoords[0], pcoords[-1] - (2 * np.pi), rtol=0, atol=1e-6
+        ):
             # If first and last coordinate aren't the same when wrapped by 2pi
             pcoords = np.append(pcoords, pcoords[0] + 2 * np.pi)
             pcoords = np.insert(pcoords, 0, pcoords[-2] - 2 * np.pi)
             points[0] = pcoords
-
-            values = np.append(values, values[0:1, :, :, :], axis=0)
-            values = np.insert(values, 0, values[-2:-1, :, :, :], axis=0)
+            pad_phi = True
 
         # Check that coordinates are increasing
         if not np.all(np.diff(points[0]) >= 0):
@@ -435,12 +1042,11 @@ class Variable:
         if not np.all(np.diff(points[2]) > 0):
             raise RuntimeError("Radial coordinates are not monotonically increasing")
 
-        if len(points[3]) == 1:
-            # Only one timestep
+        single_timestep = len(points[3]) == 1
+        if single_timestep:
             xi = np.column_stack(
                 [lon.to_value(u.rad), lat.to_value(u.rad), r.to_value(self._runit)]
             )
-            values = values[:, :, :, 0]
             points = points[:-1]
         else:
             xi = np.column_stack(
@@ -455,7 +1061,20 @@ class Variable:
                     f"At least one sample coordinate is outside bounds {bounds} in {dim} dimension. Sample coordinate min/max values are {coord_bounds}."
                 )
 
-        values_x = interpolate.interpn(
-            points, values, xi, bounds_error=False, fill_value=np.nan
-        )
+        # Only get values for the radial shells that are needed
+        r_slice = _bounding_slice(points[2], xi[:, 2])
+        points[2] = points[2][r_slice]
+        values = self.isel(r=r_slice).values
+        if pad_phi:
+            values = np.append(values, values[0:1, :, :, :], axis=0)
+            values = np.insert(values, 0, values[-2:-1, :, :, :], axis=0)
+        if single_timestep:
+            values = values[:, :, :, 0]
+
+        with instrumentation.timer(
+            "variable.sample_at_coords", var=self.name, n_points=len(xi)
+        ):
+            values_x = interpolate.interpn(
+                points, values, xi, bounds_error=False, fill_value=np.nan
+            )
         return values_x * self._unit
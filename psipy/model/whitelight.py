@@ -0,0 +1,267 @@
+"""
+Synthetic white-light images of the corona.
+
+White light from the corona is photospheric light that has been Thomson
+scattered by free electrons. Images are calculated by integrating the
+scattered light along a ray from the observer through each pixel, using the
+scattering coefficients of van de Hulst (1950) for a limb-darkened Sun (see
+e.g. Billings 1966, *A Guide to the Solar Corona*, or Howard & Tappin 2009,
+Space Sci. Rev. 147, 31).
+
+Rays are integrated in chunks of pixels, which can be spread over a pool of
+threads. The electron density is interpolated to all the points along the
+rays in a chunk at once, using a single interpolator for the whole image.
+"""
+import os
+from typing import Optional, Tuple, Union
+
+import astropy.constants as const
+import astropy.units as u
+import numpy as np
+import xarray as xr
+
+from .interpolate import PointInterpolator
+from .reductions import _prefetch
+from .variable import Variable
+
+__all__ = ["thomson_image"]
+
+# Thomson scattering cross section per unit solid angle (the square of the
+# classical electron radius)
+_SIGMA_E = (3 * const.sigma_T / (8 * np.pi)).to_value(u.cm**2)
+# Maximum number of points along rays that are integrated at once
+_CHUNK_SIZE = 2**18
+
+
+def _van_de_hulst(r):
+    """
+    Van de Hulst coefficients A, B, C, D at distances *r* (in solar radii)
+    from the centre of the Sun.
+    """
+    sin = np.minimum(1 / r, 1)
+    sin2 = sin**2
+    cos = np.sqrt(1 - sin2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log = cos**2 / sin * np.log((1 + sin) / cos)
+    a = cos * sin2
+    b = -(1 - 3 * sin2 - (1 + 3 * sin2) * log) / 8
+    c = 4 / 3 - cos - cos**3 / 3
+    d = (5 + sin2 - (5 - sin2) * log) / 8
+    return a, b, c, d
+
+
+def _image_axes(observer):
+    """
+    Unit vectors along the x (solar west) and y (solar north) axes of the
+    plane of the sky of an observer.
+    """
+    towards_observer = observer / np.linalg.norm(observer)
+    north = np.array([0, 0, 1]) - towards_observer[2] * towards_observer
+    if np.linalg.norm(north) < 1e-9:
+        raise ValueError("Observer can't be directly above a pole")
+    north /= np.linalg.norm(north)
+    return np.cross(north, towards_observer), north
+
+
+def _integrate_rays(
+    observer, directions, interpolator, values, r_max, n_steps, rscale, limb
+):
+    """
+    Integrate the total and polarized brightness along rays from *observer*.
+
+    Returns the integrals along each ray of the density times the total and
+    polarized scattering coefficients. Positions and distances are in the
+    radial unit of the model, and *rscale* converts them to solar radii.
+    """
+    # Closest approach of each ray to the centre of the Sun
+    s_closest = -directions @ observer
+    closest = observer + s_closest[:, None] * directions
+    impact = np.linalg.norm(closest, axis=1)
+
+    # Only integrate the part of each ray that is inside the model and in
+    # front of the observer. Integrate in the angle from the plane of the sky
+    # (s = s_closest + impact * tan(angle)), which puts more points close to
+    # the Sun where the density changes most rapidly.
+    half_length = np.sqrt(np.maximum(r_max**2 - impact**2, 0))
+    start = np.maximum(-half_length, -s_closest)
+    end = np.maximum(half_length, start)
+    angle_lo = np.arctan2(start, impact)
+    angle_hi = np.arctan2(end, impact)
+    d_angle = (angle_hi - angle_lo) / n_steps
+    angle = angle_lo[:, None] + (np.arange(n_steps) + 0.5) * d_angle[:, None]
+    cos_angle = np.cos(angle)
+    ds = impact[:, None] * d_angle[:, None] / cos_angle**2
+
+    s = s_closest[:, None] + impact[:, None] * np.tan(angle)
+    x, y, z = (observer[i] + s * directions[:, i, None] for i in range(3))
+    r = impact[:, None] / cos_angle
+    with np.errstate(invalid="ignore"):
+        lat = np.arcsin(np.clip(z / r, -1, 1))
+    lon = np.mod(np.arctan2(y, x), 2 * np.pi)
+    # Extend the density to the poles, which aren't on the grid of
+    # cell-centred variables
+    lat = np.clip(lat, interpolator.coords[1][0], interpolator.coords[1][-1])
+    density = interpolator(values, interpolator.locate(lon, lat, r))
+
+    a, b, c, d = _van_de_hulst(r * rscale)
+    # The angle between the scattering direction and the radial direction is
+    # pi / 2 minus the angle from the plane of the sky
+    polarized = cos_angle**2 * ((1 - limb) * a + limb * b)
+    total = 2 * ((1 - limb) * c + limb * d) - polarized
+    weights = density * ds
+    # Points outside the grid (e.g. inside the inner boundary) don't
+    # contribute
+    weights[~np.isfinite(weights)] = 0
+    total = np.sum(weights * total, axis=1)
+    polarized = np.sum(weights * polarized, axis=1)
+    # Rays that hit the Sun
+    total[impact * rscale < 1] = np.nan
+    polarized[impact * rscale < 1] = np.nan
+    return total, polarized
+
+
+@u.quantity_input
+def thomson_image(
+    ne: Variable,
+    observer_lon: u.deg,
+    observer_lat: u.deg,
+    observer_r: u.m = 1 * u.AU,
+    *,
+    fov: u.m = 6 * u.R_sun,
+    shape: Union[int, Tuple[int, int]] = 512,
+    t_idx: int = 0,
+    n_steps: int = 100,
+    occulter: u.m = 1 * u.R_sun,
+    limb_darkening: float = 0.63,
+    max_workers: Optional[int] = None,
+) -> xr.Dataset:
+    """
+    Calculate a synthetic white-light image of the corona.
+
+    Images are of the total (B) and polarized (pB) brightness of photospheric
+    light Thomson scattered by electrons, as seen by an observer. The
+    observer sees along rays that diverge from its position, and each ray is
+    integrated through the whole model domain.
+
+    Parameters
+    ----------
+    ne : Variable
+        Electron number density, e.g. the ``'rho'`` variable of a
+        `~psipy.model.MASOutput`.
+    observer_lon, observer_lat : astropy.units.Quantity
+        Longitude and latitude of the observer, in the same coordinate system
+        as the model.
+    observer_r : astropy.units.Quantity, optional
+        Distance of the observer from the centre of the Sun.
+    fov : astropy.units.Quantity, optional
+        Half width of the field of view, in the plane of the sky (the plane
+        through the centre of the Sun perpendicular to the line of sight to
+        the observer).
+    shape : int or tuple of int, optional
+        Number of ``(y, x)`` pixels in the image. A single number gives a
+        square image.
+    t_idx : int, optional
+        Index of the timestep to image.
+    n_steps : int, optional
+        Number of points each ray is integrated over.
+    occulter : astropy.units.Quantity, optional
+        Radius of the occulting disk, in the plane of the sky. Pixels behind
+        the occulter, or that see the solar disk, are NaN.
+    limb_darkening : float, optional
+        Linear limb darkening coefficient of the photosphere.
+    max_workers : int, optional
+        Maximum number of threads used to integrate rays. Defaults to the
+        number of CPUs.
+
+    Returns
+    -------
+    xarray.Dataset
+        Dataset with ``'B'`` and ``'pB'`` images, in units of the mean
+        brightness of the solar disk. The ``x`` (solar west) and ``y`` (solar
+        north) coordinates of each pixel are in the plane of the sky, in the
+        radial unit of *ne*.
+
+    Notes
+    -----
+    Parts of rays outside the grid of *ne*, or inside its inner boundary,
+    don't contribute to the images. Density values at latitudes beyond the
+    grid are taken to be the values at the edge of the grid.
+
+    Examples
+    --------
+    To image the corona out to 6 solar radii, as seen from Earth (here
+    assumed to be at a Carrington longitude of 120 degrees)::
+
+        image = thomson_image(mas_output["rho"], 120 * u.deg, 0 * u.deg)
+        image["pB"].plot(norm=matplotlib.colors.LogNorm())
+    """
+    if not ne.unit.is_equivalent(u.cm**-3):
+        raise ValueError(f"ne must be a number density, but has unit {ne.unit}")
+    if isinstance(shape, int):
+        shape = (shape, shape)
+
+    runit = ne.r_coords.unit
+    r_coords = ne.r_coords.value
+    interpolator = PointInterpolator([ne.phi_coords, ne.theta_coords, r_coords])
+    values = np.asarray(ne.isel(time=t_idx)) * ne.unit.to(u.cm**-3)
+
+    lon = observer_lon.to_value(u.rad)
+    lat = observer_lat.to_value(u.rad)
+    distance = observer_r.to_value(runit)
+    observer = distance * np.array(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+    )
+    x_axis, y_axis = _image_axes(observer)
+
+    # Pixel centres in the plane of the sky
+    half_width = fov.to_value(runit)
+    y, x = ((np.arange(n) + 0.5) / n * 2 * half_width - half_width for n in shape)
+    pixels = x[None, :, None] * x_axis + y[:, None, None] * y_axis
+    directions = (pixels - observer).reshape(-1, 3)
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+
+    def integrate(chunk):
+        return _integrate_rays(
+            observer,
+            directions[chunk],
+            interpolator,
+            values,
+            r_coords.max(),
+            n_steps,
+            (1 * runit).to_value(u.R_sun),
+            limb_darkening,
+        )
+
+    chunk_size = max(1, _CHUNK_SIZE // n_steps)
+    chunks = [
+        slice(start, start + chunk_size)
+        for start in range(0, directions.shape[0], chunk_size)
+    ]
+    total = np.empty(directions.shape[0])
+    polarized = np.empty(directions.shape[0])
+    for chunk, (b, pb) in zip(
+        chunks, _prefetch(integrate, chunks, max_workers or os.cpu_count())
+    ):
+        total[chunk] = b
+        polarized[chunk] = pb
+
+    # Convert from the integral of the density along each ray (in the radial
+    # unit of the model) to units of the mean solar brightness
+    scale = (
+        np.pi * _SIGMA_E / (2 * (1 - limb_darkening / 3)) * (1 * runit).to_value(u.cm)
+    )
+    occulted = np.hypot(x[None, :], y[:, None]) < occulter.to_value(runit)
+    images = {}
+    for name, image in [("B", total), ("pB", polarized)]:
+        image = image.reshape(shape) * scale
+        image[occulted] = np.nan
+        images[name] = (("y", "x"), image)
+    coord_attrs = {"units": str(runit)}
+    return xr.Dataset(
+        images,
+        coords={
+            "x": ("x", x, coord_attrs),
+            "y": ("y", y, coord_attrs),
+        },
+        attrs={"units": "mean solar brightness"},
+    )
@@ -0,0 +1,66 @@
+"""
+Check that importing psipy doesn't import heavy optional dependencies.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+test_data_dir = (Path(__file__) / ".." / ".." / ".." / "data").resolve()
+
+# Modules that should only be imported when they are needed
+deferred_modules = [
+    "astropy.coordinates",
+    "h5py",
+    "matplotlib",
+    "pyhdf",
+    "pyvista",
+    "scipy",
+]
+
+
+def imported_modules(code):
+    """
+    Run *code* in a new interpreter, and return which of the deferred modules
+    have been imported.
+    """
+    code += (
+        "\nimport json, sys"
+        f"\nprint(json.dumps([m for m in {deferred_modules} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import psipy",
+        "import psipy.io",
+        "import psipy.model",
+        "import psipy.tracing",
+        "import psipy.data",
+    ],
+)
+def test_import(code):
+    assert imported_modules(code) == []
+
+
+def test_sample_without_plotting():
+    # Reading and sampling data shouldn't import any plotting libraries
+    directory = test_data_dir / "mas_hdf5"
+    if not directory.exists():
+        pytest.xfail(f"Could not find MAS data directory at {directory}")
+    code = f"""
+import astropy.units as u
+from psipy.model import MASOutput
+model = MASOutput({str(directory)!r})
+model["rho"].sample_at_coords([1, 2] * u.rad, [0, 0] * u.rad, [10, 20] * u.R_sun)
+"""
+    imported = imported_modules(code)
+    assert "matplotlib" not in imported
+    assert "pyvista" not in imported
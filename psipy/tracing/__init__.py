@@ -1,2 +1,3 @@
 from .flines import *
+from .mapping import *
 from .tracing import *
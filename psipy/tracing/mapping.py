@@ -0,0 +1,326 @@
+"""
+Lookup tables that map points at a given height to their magnetic footpoints.
+
+Building a map traces field lines from a dense grid of seeds on a sphere
+once. Footpoints of other points on the sphere are then found by
+interpolating between the footpoints of the seeds, which is much faster than
+tracing new field lines. Between seeds whose footpoints disagree (e.g. either
+side of a boundary between open and closed field lines), the footpoint of the
+nearest seed is used instead.
+"""
+import itertools
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import astropy.units as u
+import numpy as np
+
+from psipy.model import MASOutput
+from psipy.model.interpolate import PointInterpolator
+from psipy.tracing.flines import FieldLines
+from psipy.tracing.tracing import FortranTracer
+
+__all__ = ["FootpointMap"]
+
+
+def _footpoints(flines: FieldLines, r_inner: float, r_outer: float, tol: float):
+    """
+    Get the footpoints of field lines, and whether they are open.
+
+    The footpoint of each field line is the end closest to the Sun, if it is
+    within *tol* of *r_inner*. Field lines are open if they have a footpoint
+    and their other end is within *tol* of *r_outer*.
+    """
+    offsets = flines.offsets
+    n_flines = len(offsets) - 1
+    footpoint_lon = np.full(n_flines, np.nan)
+    footpoint_lat = np.full(n_flines, np.nan)
+    is_open = np.zeros(n_flines, dtype=bool)
+
+    lon, lat, r = flines._points()
+    coords = np.column_stack([lon, lat, r.to_value(flines.runit)])
+    traced = np.diff(offsets) > 0
+    first = coords[offsets[:-1][traced]]
+    last = coords[offsets[1:][traced] - 1]
+    swap = (last[:, 2] < first[:, 2])[:, None]
+    lower = np.where(swap, last, first)
+    upper = np.where(swap, first, last)
+
+    has_footpoint = lower[:, 2] <= r_inner + tol
+    index = np.nonzero(traced)[0][has_footpoint]
+    footpoint_lon[index] = np.mod(lower[has_footpoint, 0], 2 * np.pi)
+    footpoint_lat[index] = lower[has_footpoint, 1]
+    is_open[index] = upper[has_footpoint, 2] >= r_outer - tol
+    return footpoint_lon, footpoint_lat, is_open
+
+
+@dataclass
+class FootpointMap:
+    """
+    Magnetic footpoints of points on a sphere.
+
+    Maps are usually created with `FootpointMap.build`, and can be saved and
+    loaded to reuse them later.
+
+    Parameters
+    ----------
+    lon, lat : numpy.ndarray
+        Longitudes and latitudes (in radians) of the grid of seed points.
+    r : astropy.units.Quantity
+        Radius of the sphere the seed points are on.
+    footpoint_lon, footpoint_lat : numpy.ndarray
+        ``(lon, lat)`` shaped arrays of the footpoint longitudes and latitudes
+        (in radians) of the field lines through each seed point. These are
+        NaN for field lines that don't reach the inner boundary.
+    is_open : numpy.ndarray
+        ``(lon, lat)`` shaped array of whether the field line through each
+        seed point is open (reaches both the inner and outer boundaries).
+    t_idx : int, optional
+        Index of the timestep the field lines were traced at.
+    """
+
+    lon: np.ndarray = field(repr=False)
+    lat: np.ndarray = field(repr=False)
+    r: u.Quantity
+    footpoint_lon: np.ndarray = field(repr=False)
+    footpoint_lat: np.ndarray = field(repr=False)
+    is_open: np.ndarray = field(repr=False)
+    t_idx: Optional[int] = None
+
+    def __post_init__(self):
+        self.lon = np.asarray(self.lon, dtype=np.float64)
+        self.lat = np.asarray(self.lat, dtype=np.float64)
+        shape = (self.lon.size, self.lat.size)
+        for name in ["footpoint_lon", "footpoint_lat", "is_open"]:
+            if getattr(self, name).shape != shape:
+                raise ValueError(
+                    f"{name} has shape {getattr(self, name).shape}, but the "
+                    f"seed grid has shape {shape}"
+                )
+        self._interpolator = PointInterpolator([self.lon, self.lat, [0]])
+        # Interpolate footpoints as unit vectors, so footpoints either side
+        # of 0 longitude are interpolated correctly
+        cos_lat = np.cos(self.footpoint_lat)
+        self._vectors = np.stack(
+            [
+                cos_lat * np.cos(self.footpoint_lon),
+                cos_lat * np.sin(self.footpoint_lon),
+                np.sin(self.footpoint_lat),
+            ],
+            axis=-1,
+        )
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """
+        Shape of the grid of seed points.
+        """
+        return (self.lon.size, self.lat.size)
+
+    @classmethod
+    @u.quantity_input
+    def build(
+        cls,
+        tracer: FortranTracer,
+        mas_output: MASOutput,
+        r: u.m,
+        *,
+        shape: Tuple[int, int] = (360, 180),
+        t_idx: Optional[int] = None,
+    ):
+        """
+        Build a map by tracing field lines from a grid of seed points.
+
+        Seed points are evenly spaced in longitude and latitude, at the
+        centres of a ``shape`` grid of cells covering the sphere.
+
+        Parameters
+        ----------
+        tracer : FortranTracer
+            Tracer used to trace the field lines. Its maximum number of steps
+            must be large enough for field lines to reach the inner boundary.
+        mas_output : psipy.model.MASOutput
+            MAS model output.
+        r : astropy.units.Quantity
+            Radius to put the seed points at.
+        shape : tuple of int, optional
+            Number of seed points in longitude and latitude.
+        t_idx : int, optional
+            Time slice of ``mas_output`` to trace through. Doesn't need to be
+            specified if only one time step is present.
+
+        Returns
+        -------
+        FootpointMap
+        """
+        n_lon, n_lat = shape
+        lon = (np.arange(n_lon) + 0.5) * 2 * np.pi / n_lon
+        lat = (np.arange(n_lat) + 0.5) * np.pi / n_lat - np.pi / 2
+        runit = mas_output.get_runit()
+        seed_lon, seed_lat = np.meshgrid(lon, lat, indexing="ij")
+        seeds = np.column_stack(
+            [
+                seed_lon.ravel(),
+                seed_lat.ravel(),
+                np.full(seed_lon.size, r.to_value(runit)),
+            ]
+        )
+
+        grid = tracer._vector_grid(mas_output, t_idx)
+        flines = tracer._trace_from_grid(grid, seeds, runit)
+        # Field lines that end within two steps of a boundary are taken to
+        # reach it
+        r_coords = grid.zcoords
+        tol = 2 * tracer.step_size * np.min(np.diff(r_coords))
+        footpoint_lon, footpoint_lat, is_open = _footpoints(
+            flines, r_coords[0], r_coords[-1], tol
+        )
+        return cls(
+            lon,
+            lat,
+            r.to(runit),
+            footpoint_lon.reshape(shape),
+            footpoint_lat.reshape(shape),
+            is_open.reshape(shape),
+            t_idx,
+        )
+
+    @u.quantity_input
+    def __call__(self, lon: u.deg, lat: u.deg, *, max_separation: u.deg = None):
+        """
+        Get the footpoints of points on the sphere.
+
+        Footpoints are linearly interpolated from the footpoints of the four
+        surrounding seed points. Points closer to the poles than the seed
+        points take the footpoints of the nearest seed points in latitude.
+
+        Interpolating between footpoints that are far apart (e.g. either side
+        of a boundary between open and closed field lines) would give a
+        footpoint that isn't the footpoint of any field line. If the
+        surrounding seed points aren't all open or all closed, or any two of
+        their footpoints are more than *max_separation* apart, the footpoint
+        of the nearest seed point is used instead.
+
+        Parameters
+        ----------
+        lon, lat : astropy.units.Quantity
+            Longitudes and latitudes of the points.
+        max_separation : astropy.units.Quantity, optional
+            Largest angle between the footpoints of the surrounding seed
+            points that footpoints are interpolated between. Defaults to three
+            times the diagonal spacing of the seed points.
+
+        Returns
+        -------
+        footpoint_lon, footpoint_lat : astropy.units.Quantity
+            Footpoint longitudes (between 0 and 360 degrees) and latitudes.
+            These are NaN if the field line through any of the surrounding
+            seed points doesn't reach the inner boundary.
+        is_open : numpy.ndarray
+            Whether each point is on an open field line, taken from the
+            nearest seed point.
+        """
+        if max_separation is None:
+            max_separation = 3 * np.hypot(
+                np.max(np.diff(self.lon), initial=0),
+                np.max(np.diff(self.lat), initial=0),
+            )
+        else:
+            max_separation = max_separation.to_value(u.rad)
+
+        lat = np.clip(lat.to_value(u.rad), self.lat[0], self.lat[-1])
+        locations = self._interpolator.locate(
+            np.mod(lon.to_value(u.rad), 2 * np.pi), lat, 0
+        )
+        vectors = np.stack(
+            [
+                self._interpolator(self._vectors[..., i, None], locations)
+                for i in range(3)
+            ],
+            axis=-1,
+        ).reshape(-1, 3)
+
+        # Offsets of the surrounding seed points in the flattened seed grid
+        (lon_lo, lon_hi), (lat_lo, lat_hi), _ = locations.offsets
+        w_lon, w_lat, _ = locations.weights
+        corners = [i + j for i in (lon_lo, lon_hi) for j in (lat_lo, lat_hi)]
+        nearest = np.where(w_lon < 0.5, lon_lo, lon_hi) + np.where(
+            w_lat < 0.5, lat_lo, lat_hi
+        )
+        seed_vectors = self._vectors.reshape(-1, 3)
+        seed_is_open = self.is_open.ravel()
+
+        # Smallest cosine of the angles between pairs of surrounding
+        # footpoints. Comparisons with NaN are False, so points next to seeds
+        # without footpoints are still NaN.
+        min_cos = np.min(
+            [
+                np.sum(seed_vectors[a] * seed_vectors[b], axis=-1)
+                for a, b in itertools.combinations(corners, 2)
+            ],
+            axis=0,
+        )
+        corners_open = [seed_is_open[c] for c in corners]
+        disagree = (min_cos < np.cos(max_separation)) | (
+            np.any(corners_open, axis=0) != np.all(corners_open, axis=0)
+        )
+        vectors[disagree] = seed_vectors[nearest[disagree]]
+
+        x, y, z = (vectors[:, i].reshape(locations.shape) for i in range(3))
+        footpoint_lon = np.mod(np.arctan2(y, x), 2 * np.pi) * u.rad
+        footpoint_lat = np.arctan2(z, np.hypot(x, y)) * u.rad
+        is_open = seed_is_open[nearest].reshape(locations.shape)
+        return footpoint_lon.to(u.deg), footpoint_lat.to(u.deg), is_open
+
+    def save(self, filename):
+        """
+        Save the map to a file.
+
+        Parameters
+        ----------
+        filename : pathlib.Path, str
+            File to save the map to.
+
+        Notes
+        -----
+        Arrays are saved using `numpy.savez_compressed`.
+        """
+        np.savez_compressed(
+            filename,
+            lon=self.lon,
+            lat=self.lat,
+            r=self.r.value,
+            runit=np.array(self.r.unit.to_string()),
+            footpoint_lon=self.footpoint_lon,
+            footpoint_lat=self.footpoint_lat,
+            is_open=self.is_open,
+            t_idx=np.array(-1 if self.t_idx is None else self.t_idx),
+        )
+
+    @classmethod
+    def load(cls, filename) -> "FootpointMap":
+        """
+        Load a map from a file.
+
+        The map must have been saved using the ``.save()`` method.
+
+        Parameters
+        ----------
+        filename : pathlib.Path, str
+            File to load the map from.
+
+        Returns
+        -------
+        FootpointMap
+        """
+        with np.load(str(filename)) as arrs:
+            t_idx = int(arrs["t_idx"])
+            return cls(
+                arrs["lon"],
+                arrs["lat"],
+                float(arrs["r"]) * u.Unit(str(arrs["runit"])),
+                arrs["footpoint_lon"],
+                arrs["footpoint_lat"],
+                arrs["is_open"],
+                None if t_idx == -1 else t_idx,
+            )
@@ -0,0 +1,159 @@
+import astropy.units as u
+import numpy as np
+import pytest
+
+from psipy.model import MASOutput
+from psipy.tracing import FieldLines, FootpointMap, FortranTracer
+from psipy.tracing.mapping import _footpoints
+
+
+def test_footpoints():
+    xs = [
+        # Open, traced outwards from the inner boundary
+        np.array([[0.1, 0.2, 1], [0.2, 0.3, 15], [0.3, 0.4, 30]]),
+        # Open, traced inwards to the inner boundary from below 0 longitude
+        np.array([[0.3, 0.4, 30], [0.2, 0.3, 15], [-0.1, 0.2, 1]]),
+        # Closed
+        np.array([[1, 0.5, 1], [1.1, 0.6, 2], [1.2, 0.7, 1]]),
+        # Doesn't reach the inner boundary
+        np.array([[1, 0.5, 30], [1.1, 0.6, 10]]),
+        # Not traced
+        np.zeros((0, 3)),
+    ]
+    lon, lat, is_open = _footpoints(FieldLines(xs, u.R_sun), 1, 30, 0.1)
+    np.testing.assert_allclose(lon, [0.1, 2 * np.pi - 0.1, 1, np.nan, np.nan])
+    np.testing.assert_allclose(lat, [0.2, 0.2, 0.5, np.nan, np.nan])
+    np.testing.assert_equal(is_open, [True, True, False, False, False])
+
+
+@pytest.fixture
+def footpoint_map():
+    lon = np.deg2rad(np.arange(5, 360, 10))
+    lat = np.deg2rad(np.arange(-85, 90, 10))
+    lon_grid, lat_grid = np.meshgrid(lon, lat, indexing="ij")
+    # Footpoints shifted in longitude, with closed field lines near the
+    # equator and no footpoints at the poles
+    footpoint_lon = np.mod(lon_grid + 0.1, 2 * np.pi)
+    footpoint_lat = lat_grid / 2
+    footpoint_lon[:, [0, -1]] = np.nan
+    footpoint_lat[:, [0, -1]] = np.nan
+    is_open = np.abs(lat_grid) > np.deg2rad(30)
+    return FootpointMap(
+        lon, lat, 2.5 * u.R_sun, footpoint_lon, footpoint_lat, is_open, 1
+    )
+
+
+def test_footpoint_map_query(footpoint_map):
+    # At the seed points, the footpoints are the traced footpoints
+    lon = footpoint_map.lon[[0, 10, 35]] * u.rad
+    lat = footpoint_map.lat[[2, 9, 15]] * u.rad
+    footpoint_lon, footpoint_lat, is_open = footpoint_map(lon, lat)
+    assert footpoint_lon.unit == u.deg
+    assert u.allclose(footpoint_lon, np.mod(lon + 0.1 * u.rad, 360 * u.deg))
+    assert u.allclose(footpoint_lat, lat / 2)
+    np.testing.assert_equal(is_open, [True, False, True])
+
+    # Between open and closed seed points, points take the footpoint of the
+    # nearest seed point, instead of a footpoint between them
+    footpoint_lon, footpoint_lat, is_open = footpoint_map(
+        [21, 21, 21, 21] * u.deg, [-36, -29, 29, 31] * u.deg
+    )
+    np.testing.assert_equal(is_open, [True, False, False, True])
+    nearest_lon = np.deg2rad([25, 25, 25, 25]) + 0.1
+    nearest_lat = np.deg2rad([-35, -25, 25, 35]) / 2
+    assert u.allclose(footpoint_lon[1:], nearest_lon[1:] * u.rad)
+    assert u.allclose(footpoint_lat[1:], nearest_lat[1:] * u.rad)
+    # All the seed points around the first point are open, so it's interpolated
+    assert u.allclose(footpoint_lat[0], -18 * u.deg, atol=0.1 * u.deg)
+
+    # Interpolating across 0 longitude
+    footpoint_lon, footpoint_lat, _ = footpoint_map([0, 359] * u.deg, [10, 10] * u.deg)
+    assert u.allclose(footpoint_lon, [5.73, 4.73] * u.deg, atol=0.05 * u.deg)
+    assert u.allclose(footpoint_lat, 5 * u.deg, atol=0.05 * u.deg)
+
+    # Near the poles there are no footpoints
+    footpoint_lon, footpoint_lat, is_open = footpoint_map(
+        [20, 20] * u.deg, [-89, 80] * u.deg
+    )
+    assert np.all(np.isnan(footpoint_lon))
+    assert np.all(np.isnan(footpoint_lat))
+
+
+def test_footpoint_map_io(footpoint_map, tmp_path):
+    footpoint_map.save(tmp_path / "map.npz")
+    loaded = FootpointMap.load(tmp_path / "map.npz")
+    assert loaded.r == 2.5 * u.R_sun
+    assert loaded.t_idx == 1
+    assert loaded.shape == (36, 18)
+    for name in ["lon", "lat", "footpoint_lon", "footpoint_lat", "is_open"]:
+        np.testing.assert_equal(getattr(loaded, name), getattr(footpoint_map, name))
+
+    footpoint_map.t_idx = None
+    footpoint_map.save(tmp_path / "map.npz")
+    assert FootpointMap.load(tmp_path / "map.npz").t_idx is None
+
+
+def test_footpoint_map_shape(footpoint_map):
+    with pytest.raises(ValueError, match="is_open has shape"):
+        FootpointMap(
+            footpoint_map.lon,
+            footpoint_map.lat,
+            footpoint_map.r,
+            footpoint_map.footpoint_lon,
+            footpoint_map.footpoint_lat,
+            footpoint_map.is_open[1:],
+        )
+
+
+def test_footpoint_map_build(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    # Fake data to be unit vectors pointing in radial direction
+    bs = model.cell_corner_b(0)
+    bs.loc[..., "bp"] = 0
+    bs.loc[..., "bt"] = 0
+    bs.loc[..., "br"] = 1
+
+    def cell_corner_b(t_idx=None):
+        return bs.copy()
+
+    model.cell_corner_b = cell_corner_b
+
+    footpoint_map = FootpointMap.build(
+        FortranTracer(), model, 5 * u.R_sun, shape=(36, 18), t_idx=0
+    )
+    assert footpoint_map.shape == (36, 18)
+    assert footpoint_map.r == 5 * u.R_sun
+    np.testing.assert_allclose(footpoint_map.lon, np.deg2rad(np.arange(5, 360, 10)))
+    np.testing.assert_allclose(footpoint_map.lat, np.deg2rad(np.arange(-85, 90, 10)))
+    # All field lines are radial and open
+    assert footpoint_map.is_open.all()
+    lon, lat = np.meshgrid(footpoint_map.lon, footpoint_map.lat, indexing="ij")
+    np.testing.assert_allclose(footpoint_map.footpoint_lon, lon)
+    np.testing.assert_allclose(footpoint_map.footpoint_lat, lat)
+
+
+def test_footpoint_map_separated(footpoint_map):
+    # Move the footpoint of the seed point at (105, 5) degrees far from the
+    # footpoints of its neighbours
+    footpoint_lon = footpoint_map.footpoint_lon.copy()
+    footpoint_lon[10, 9] += np.pi / 2
+    footpoint_map = FootpointMap(
+        footpoint_map.lon,
+        footpoint_map.lat,
+        footpoint_map.r,
+        footpoint_lon,
+        footpoint_map.footpoint_lat,
+        footpoint_map.is_open,
+    )
+    # Points between seed points at (95, 5) and (105, 15) degrees take the
+    # footpoints of the nearest seed point
+    footpoint_lon, footpoint_lat, _ = footpoint_map([103, 97] * u.deg, [7, 13] * u.deg)
+    expected_lon = np.deg2rad([105 + 90, 95]) + 0.1
+    assert u.allclose(footpoint_lon, expected_lon * u.rad)
+    assert u.allclose(footpoint_lat, [2.5, 7.5] * u.deg)
+
+    # Unless the footpoints are allowed to be further apart
+    footpoint_lon, _, _ = footpoint_map(
+        [103, 97] * u.deg, [7, 13] * u.deg, max_separation=180 * u.deg
+    )
+    assert not u.allclose(footpoint_lon, expected_lon * u.rad, atol=1 * u.deg)
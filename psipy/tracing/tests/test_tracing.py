@@ -1,5 +1,6 @@
 import astropy.units as u
 import numpy as np
+import pytest
 
 from psipy.model import MASOutput, PLUTOOutput
 from psipy.tracing import FieldLines, FortranTracer
@@ -64,3 +65,59 @@ def test_fline_io(model, tmpdir):
     np.testing.assert_allclose(fline_0.r, fline_1.r)
     np.testing.assert_allclose(fline_0.lon, fline_1.lon)
     np.testing.assert_allclose(fline_0.lat, fline_1.lat)
+
+
+def test_fline_io_different_lengths(tmp_path):
+    # Field lines of different lengths should round trip through a file
+    xs = [np.random.rand(5, 3), np.random.rand(10, 3)]
+    flines = FieldLines(xs, u.R_sun)
+    flines.save(tmp_path / "flines.npz")
+    loaded = FieldLines.load(tmp_path / "flines.npz")
+    assert [len(fline.r) for fline in loaded] == [5, 10]
+    np.testing.assert_allclose(loaded[1].r.to_value(u.R_sun), xs[1][:, 2])
+
+
+def test_fline_sample(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    rng = np.random.default_rng(0)
+    xs = [
+        np.column_stack(
+            [
+                rng.uniform(0, 2 * np.pi, n),
+                rng.uniform(-1.4, 1.4, n),
+                rng.uniform(2, 25, n),
+            ]
+        )
+        for n in [5, 1, 10]
+    ]
+    flines = FieldLines(xs, u.R_sun)
+    np.testing.assert_equal(flines.offsets, [0, 5, 6, 16])
+
+    for var in ["rho", "vp", "br"]:
+        values = flines.sample(model[var], t_idx=1)
+        assert values.unit == model[var].unit
+        assert values.shape == (16,)
+        for fline, fline_values in zip(flines, flines.split(values)):
+            expected = model[var].sample_at_coords(
+                fline.lon, fline.lat, fline.r, np.full(len(fline.r), 2)
+            )
+            assert u.allclose(fline_values, expected, rtol=1e-5)
+
+    with pytest.raises(ValueError, match="t_idx must be given"):
+        flines.sample(model["rho"])
+
+    # Point locations are kept until the cache is cleared
+    assert len(flines._located) == 1
+    flines.clear_cache()
+    assert len(flines._located) == 0
+    values = flines.sample(model["rho"], t_idx=1)
+    assert values.shape == (16,)
+
+
+def test_fline_sample_empty(synthetic_mas_directory):
+    model = MASOutput(synthetic_mas_directory)
+    flines = FieldLines([], u.R_sun)
+    assert flines.offsets.dtype.kind == "i"
+    np.testing.assert_equal(flines.offsets, [0])
+    values = flines.sample(model["rho"], t_idx=1)
+    assert values.shape == (0,)
@@ -6,6 +6,7 @@ import xarray as xr
 
 from psipy.model import MASOutput
 from psipy.tracing.flines import FieldLines
+from psipy.util import instrumentation
 
 __all__ = ["FortranTracer"]
 
@@ -71,7 +72,9 @@ class FortranTracer:
             bs.coords["theta"].values,
             bs.coords["r"].values,
         ]
-        vector_grid = VectorGrid(bs.data, cyclic=cyclic, grid_coords=grid_coords)
+        # The compiled tracer only supports double precision vectors
+        vectors = np.asarray(bs.data, dtype=np.float64)
+        vector_grid = VectorGrid(vectors, cyclic=cyclic, grid_coords=grid_coords)
         return vector_grid
 
     @u.quantity_input
@@ -123,5 +126,6 @@ class FortranTracer:
         rcoords = grid.zcoords
         step_size = self.step_size * np.min(np.diff(rcoords))
         self.tracer = StreamTracer(max_steps, step_size)
-        self.tracer.trace(seeds, grid)
+        with instrumentation.timer("tracing.trace", n_seeds=len(seeds)):
+            self.tracer.trace(seeds, grid)
         return FieldLines(self.tracer.xs, runit)
@@ -0,0 +1,209 @@
+"""
+Opt-in instrumentation of where psipy spends its time.
+
+psipy records events in its slowest code paths: reading files, loading and
+unloading variables, applying unit conversions, interpolating, and tracing
+field lines. Events are only created if something is listening for them,
+so there is no cost when instrumentation isn't being used.
+
+To collect a report of the events in a block of code use `record`::
+
+    from psipy.util import instrumentation
+
+    with instrumentation.record() as report:
+        model = MASOutput('directory')
+        model['rho'].sample_at_coords(lon, lat, r)
+    print(report)
+
+To handle events as they happen, register a function with `add_callback`.
+Events are also logged to the ``'psipy.instrumentation'`` logger at
+``DEBUG`` level, so they can be seen using::
+
+    import logging
+    logging.basicConfig()
+    logging.getLogger('psipy.instrumentation').setLevel(logging.DEBUG)
+"""
+import collections
+import contextlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+__all__ = [
+    "Event",
+    "Report",
+    "record",
+    "add_callback",
+    "remove_callback",
+    "timer",
+    "count",
+]
+
+logger = logging.getLogger("psipy.instrumentation")
+
+_callbacks: List[Callable] = []
+_callbacks_lock = threading.Lock()
+
+
+@dataclass
+class Event:
+    """
+    A single instrumentation event.
+
+    Parameters
+    ----------
+    name : str
+        Name of the event, e.g. ``'io.read_file'``.
+    kind : {'time', 'count'}
+        ``'time'`` events record how long something took, and ``'count'``
+        events record a quantity (e.g. a number of bytes).
+    value : float
+        Time in seconds for ``'time'`` events, or the quantity for ``'count'``
+        events.
+    metadata : dict
+        Extra information about the event, e.g. the variable name.
+    """
+
+    name: str
+    kind: str
+    value: float
+    metadata: Dict = field(default_factory=dict)
+
+
+def add_callback(callback: Callable[[Event], None]) -> None:
+    """
+    Call a function with every instrumentation event.
+
+    Parameters
+    ----------
+    callback : callable
+        Function that takes a single `Event`. It may be called from several
+        threads at once.
+    """
+    with _callbacks_lock:
+        _callbacks.append(callback)
+
+
+def remove_callback(callback: Callable[[Event], None]) -> None:
+    """
+    Stop calling a function added with `add_callback`.
+    """
+    with _callbacks_lock:
+        _callbacks.remove(callback)
+
+
+def _enabled() -> bool:
+    return bool(_callbacks) or logger.isEnabledFor(logging.DEBUG)
+
+
+def _emit(event: Event) -> None:
+    for callback in list(_callbacks):
+        callback(event)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "%s: %s %s %s", event.name, event.kind, event.value, event.metadata
+        )
+
+
+@contextlib.contextmanager
+def timer(name: str, **metadata):
+    """
+    Time a block of code, and record the time as a ``'time'`` event.
+
+    Parameters
+    ----------
+    name : str
+        Event name.
+    metadata :
+        Stored in the event metadata.
+    """
+    if not _enabled():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _emit(Event(name, "time", time.perf_counter() - start, metadata))
+
+
+def count(name: str, value: float = 1, **metadata) -> None:
+    """
+    Record a ``'count'`` event.
+
+    Parameters
+    ----------
+    name : str
+        Event name.
+    value : float
+        Quantity to record, e.g. a number of bytes.
+    metadata :
+        Stored in the event metadata.
+    """
+    if _enabled():
+        _emit(Event(name, "count", value, metadata))
+
+
+class Report:
+    """
+    A collection of instrumentation events.
+
+    Reports are usually created with `record`. Printing a report shows the
+    number of each event and their total value.
+    """
+
+    def __init__(self):
+        self.events: List[Event] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    @property
+    def totals(self) -> Dict[str, float]:
+        """
+        Total value of each event name.
+        """
+        totals: Dict[str, float] = collections.defaultdict(float)
+        for event in self.events:
+            totals[event.name] += event.value
+        return dict(totals)
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        """
+        Number of events with each event name.
+        """
+        return dict(collections.Counter(event.name for event in self.events))
+
+    def __str__(self):
+        kinds = {event.name: event.kind for event in self.events}
+        counts = self.counts
+        lines = [f"{'Event':<32}{'Number':>8}{'Total':>16}"]
+        for name, total in sorted(self.totals.items()):
+            total = f"{total:.4f} s" if kinds[name] == "time" else f"{total:g}"
+            lines.append(f"{name:<32}{counts[name]:>8}{total:>16}")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def record():
+    """
+    Record all the instrumentation events in a block of code.
+
+    Events from all threads are recorded, including threads started by
+    psipy (e.g. in `~psipy.model.base.ModelOutput.load_many`).
+
+    Yields
+    ------
+    Report
+    """
+    report = Report()
+    add_callback(report)
+    try:
+        yield report
+    finally:
+        remove_callback(report)
@@ -0,0 +1,77 @@
+import logging
+
+import astropy.units as u
+import numpy as np
+import pytest
+
+from psipy.model import MASOutput
+from psipy.tracing import FortranTracer
+from psipy.util import instrumentation
+
+
+def test_record(synthetic_mas_directory):
+    with instrumentation.record() as report:
+        model = MASOutput(synthetic_mas_directory)
+        model["rho"]
+        model["rho"]
+        model["rho"].sample_at_coords(
+            [1, 2] * u.deg, [1, 2] * u.deg, [10, 10] * u.R_sun, t=np.array([1, 1])
+        )
+        FortranTracer().trace(
+            model, lon=[0, 90] * u.deg, lat=[10, 60] * u.deg, r=[2, 2] * u.R_sun
+        )
+
+    counts = report.counts
+    assert counts["model.cache_miss"] == 4
+    assert counts["model.cache_hit"] == 2
+    assert counts["model.load"] == 4
+    # Two timesteps for each of rho, br, bt, bp
+    assert counts["io.read_file"] == 8
+    assert counts["model.cell_corner_b"] == 1
+    assert counts["tracing.trace"] == 1
+    assert counts["variable.sample_at_coords"] == 1
+    # Each file is read in full
+    nbytes = sum(model[var].data.nbytes for var in ["rho", "br", "bt", "bp"])
+    assert report.totals["io.bytes_read"] == nbytes
+    assert "model.cache_miss" in str(report)
+    # The report no longer records events
+    model["rho"]
+    assert report.counts["model.cache_hit"] == 2
+
+
+def test_callback(synthetic_mas_directory):
+    events = []
+    instrumentation.add_callback(events.append)
+    try:
+        MASOutput(synthetic_mas_directory)["rho"]
+    finally:
+        instrumentation.remove_callback(events.append)
+
+    assert [event.name for event in events] == [
+        "model.cache_miss",
+        "io.bytes_read",
+        "io.read_file",
+        "io.bytes_read",
+        "io.read_file",
+        "model.load",
+    ]
+    assert events[0].metadata == {"var": "rho"}
+    assert events[-1].kind == "time"
+
+
+def test_logging(synthetic_mas_directory, caplog):
+    with caplog.at_level(logging.DEBUG, logger="psipy.instrumentation"):
+        MASOutput(synthetic_mas_directory)["rho"]
+    assert "model.load: time" in caplog.text
+
+
+def test_disabled(synthetic_mas_directory, monkeypatch):
+    # No events should be created if nothing is listening for them
+    def emit(event):
+        raise AssertionError("Event created")
+
+    monkeypatch.setattr(instrumentation, "_emit", emit)
+    MASOutput(synthetic_mas_directory)["rho"]
+    with pytest.raises(AssertionError, match="Event created"):
+        with instrumentation.record():
+            MASOutput(synthetic_mas_directory)["rho"]
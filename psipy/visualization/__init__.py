@@ -2,3 +2,4 @@
 Helper functions for data visualiszation.
 """
 from .matplotlib import *
+from .rendering import *
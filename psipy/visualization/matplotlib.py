@@ -1,3 +1,7 @@
+import functools
+import queue
+import threading
+
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.animation import FuncAnimation
@@ -69,15 +73,67 @@ def format_equatorial_ax(ax):
     ax.set_xticks([])
 
 
-def animate_time(ax, slice, quad_mesh):
+def prefetch_frames(slice, buffer_size=4):
     """
-    Animate *slice* over the *time* dimension.
+    Iterate over the timesteps of *slice*, reading frames ahead in a
+    background thread.
+
+    Each frame is transposed to the (y, x) order expected by
+    :meth:`matplotlib.collections.QuadMesh.set_array`. At most *buffer_size*
+    frames are held in memory at any one time.
     """
     n_timesteps = len(slice.coords["time"])
+    frames = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def put(item):
+        # Don't block forever if the consumer has gone away
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read_frames():
+        try:
+            for i in range(n_timesteps):
+                if stop.is_set():
+                    return
+                put(np.ascontiguousarray(np.asarray(slice.isel(time=i)).T))
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=read_frames, daemon=True)
+    thread.start()
+    try:
+        for _ in range(n_timesteps):
+            frame = frames.get()
+            if isinstance(frame, Exception):
+                raise frame
+            yield frame
+    finally:
+        stop.set()
+
+
+def animate_time(ax, slice, quad_mesh, buffer_size=4):
+    """
+    Animate *slice* over the *time* dimension.
 
-    def animate(frame_number):
-        time_slice = slice.isel(time=frame_number)
-        quad_mesh.set_array(time_slice.data.T)
-        return quad_mesh
+    Frames are prefetched in a background thread (see `prefetch_frames`), and
+    the animation is blitted so only *quad_mesh* is redrawn for each frame.
+    """
+    n_timesteps = len(slice.coords["time"])
 
-    return FuncAnimation(ax.figure, animate, frames=n_timesteps)
+    def animate(frame):
+        quad_mesh.set_array(frame)
+        return (quad_mesh,)
+
+    return FuncAnimation(
+        ax.figure,
+        animate,
+        frames=functools.partial(prefetch_frames, slice, buffer_size),
+        save_count=n_timesteps,
+        blit=True,
+        cache_frame_data=False,
+    )
@@ -0,0 +1,507 @@
+"""
+Tools for rendering plots of variables straight to files.
+
+Rendering is done with the Agg backend in worker processes, without using
+pyplot, so these functions can be used on machines without a display.
+"""
+import collections
+import itertools
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+import xarray as xr
+from matplotlib import rcParams
+from matplotlib.animation import FFMpegWriter
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+if TYPE_CHECKING:
+    from psipy.model import Variable
+
+__all__ = ["save_animation", "render_batch", "RenderJob", "RenderReport"]
+
+
+# Dimension that is sliced for each type of cut
+_cut_dims = {"radial": "r", "phi": "phi", "equatorial": "theta"}
+# Dimensions that are plotted for each type of cut
+_plot_dims = {
+    "radial": ["phi", "theta"],
+    "phi": ["theta", "r"],
+    "equatorial": ["phi", "r"],
+}
+# Keyword arguments that control the colour limits of a plot
+_clim_kwargs = ["vmin", "vmax", "norm", "levels", "robust", "center"]
+# Figures that are re-used between tasks run in a worker process. This is
+# only set in worker processes (by _init_worker), so figures aren't shared
+# between threads or kept alive in the main process.
+_figures = None
+
+
+def _check_cut(cut):
+    if cut not in _cut_dims:
+        raise ValueError(f"cut must be one of {list(_cut_dims)}, got '{cut}'")
+
+
+def _restrict_to_cut(variable, cut, index, t_indices=None):
+    """
+    Get a copy of *variable* that only contains the data needed to plot a
+    single cut, optionally at a subset of time indices.
+
+    This keeps the amount of data sent to worker processes small.
+    """
+    from psipy.model import Variable
+
+    dim = _cut_dims[cut]
+    if cut == "equatorial":
+        index = variable._equator_theta_idx
+    indexers = {dim: [index]}
+    if t_indices is not None:
+        indexers["time"] = list(t_indices)
+    data = variable.isel(**indexers)
+    return Variable(
+        xr.Dataset({variable.name: data}), variable.name, variable.unit, variable._runit
+    )
+
+
+def _plot_cut(variable, cut, t_idx, ax, **kwargs):
+    """
+    Plot a cut of a variable that has been restricted using `_restrict_to_cut`.
+    """
+    if cut == "radial":
+        return variable.plot_radial_cut(0, t_idx=t_idx, ax=ax, **kwargs)
+    elif cut == "phi":
+        return variable.plot_phi_cut(0, t_idx=t_idx, ax=ax, **kwargs)
+    elif cut == "equatorial":
+        return variable.plot_equatorial_cut(t_idx=t_idx, ax=ax, **kwargs)
+
+
+def _init_worker():
+    """
+    Set up a worker process to re-use figures between tasks.
+    """
+    global _figures
+    _figures = {}
+
+
+def _get_axes(cut, figsize, dpi):
+    """
+    Get an empty axes to plot a cut on.
+
+    Figures are not managed by pyplot. In worker processes they are re-used
+    between calls to avoid the cost of setting up a new figure each time,
+    otherwise a new figure is created for each call.
+    """
+    polar = cut != "radial"
+    key = (polar, tuple(figsize), dpi)
+    if _figures is not None and key in _figures:
+        fig = _figures[key]
+        fig.clear()
+    else:
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        if _figures is not None:
+            _figures[key] = fig
+    return fig.add_subplot(projection="polar" if polar else None)
+
+
+def _colour_limit_kwargs(frame, kwargs):
+    """
+    Add colour limits for *frame* to the plotting keyword arguments.
+
+    These are the same as the limits xarray would choose when plotting
+    *frame*, but fixing them means a plot can be updated with new frames
+    without changing the limits. If any colour limit keyword arguments have
+    already been given, *kwargs* is returned unchanged.
+    """
+    if any(k in kwargs for k in _clim_kwargs):
+        return kwargs
+    frame = frame[np.isfinite(frame)]
+    if not frame.size:
+        return kwargs
+    vmin, vmax = float(frame.min()), float(frame.max())
+    kwargs = dict(kwargs)
+    if vmin < 0 < vmax:
+        # Same heuristic xarray uses for a divergent colour map
+        vmax = max(-vmin, vmax)
+        vmin = -vmax
+        kwargs.setdefault("cmap", xr.get_options()["cmap_divergent"])
+    kwargs["vmin"] = vmin
+    kwargs["vmax"] = vmax
+    # Otherwise xarray adds arrows to the colorbar if a frame plotted later
+    # is outside the limits
+    kwargs.setdefault("extend", "neither")
+    return kwargs
+
+
+def _get_frame(variable, cut, t_idx, ax, level=None):
+    """
+    Get a single 2D frame to plot on *ax* from a variable restricted with
+    `_restrict_to_cut`.
+
+    This is the same data (including any downsampling) that the plotting
+    methods would plot. To update an existing plot, pass the level of detail
+    of its quad mesh as *level*, so the frame has the same shape.
+    """
+    frame, _ = variable._plot_slice(
+        ax, _plot_dims[cut], t_idx, level=level, **{_cut_dims[cut]: 0}
+    )
+    return np.asarray(frame.isel(time=0))
+
+
+def _bounded_map(pool, fn, args, max_pending):
+    """
+    Like ``pool.map(fn, *args)``, but only submits a bounded number of tasks
+    ahead of the results being consumed.
+
+    This stops results (and arguments created lazily by *args*) piling up in
+    memory.
+    """
+    args = iter(args)
+    pending = collections.deque(
+        pool.submit(fn, *a) for a in itertools.islice(args, max_pending)
+    )
+    while pending:
+        result = pending.popleft().result()
+        for a in itertools.islice(args, 1):
+            pending.append(pool.submit(fn, *a))
+        yield result
+
+
+def _render_frames(variable, cut, figsize, dpi, kwargs):
+    """
+    Render all the timesteps of a restricted variable to RGBA buffers.
+
+    This is run in worker processes.
+    """
+    ax = _get_axes(cut, figsize, dpi)
+    canvas = ax.figure.canvas
+    quad_mesh = _plot_cut(variable, cut, 0, ax, **kwargs)
+    frames = []
+    for t_idx in range(variable.n_timesteps):
+        if t_idx > 0:
+            frame = _get_frame(variable, cut, t_idx, ax, quad_mesh._lod_level)
+            quad_mesh.set_array(frame.T)
+        canvas.draw()
+        frames.append(bytes(canvas.buffer_rgba()))
+    return canvas.get_width_height(), frames
+
+
+def _chunks(n, chunk_size):
+    """
+    Split ``range(n)`` into (start, stop) chunks of at most *chunk_size*.
+    """
+    return [(i, min(i + chunk_size, n)) for i in range(0, n, chunk_size)]
+
+
+def _ffmpeg_args(filename, size, fps, codec, extra_args):
+    args = [
+        FFMpegWriter.bin_path(),
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "rawvideo",
+        "-vcodec",
+        "rawvideo",
+        "-s",
+        f"{size[0]}x{size[1]}",
+        "-pix_fmt",
+        "rgba",
+        "-framerate",
+        str(fps),
+        "-i",
+        "pipe:",
+        "-vcodec",
+        codec,
+    ]
+    if codec == "h264":
+        # Most players only support h264 with this pixel format, which needs
+        # even frame dimensions
+        args += ["-pix_fmt", "yuv420p", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+    return args + list(extra_args or []) + [str(filename)]
+
+
+def save_animation(
+    variable,
+    filename,
+    cut,
+    index=None,
+    *,
+    fps=5,
+    figsize=None,
+    dpi=100,
+    processes=None,
+    frames_per_task=8,
+    codec=None,
+    extra_args=None,
+    **kwargs,
+):
+    """
+    Render an animated cut over all timesteps of a variable to a movie file.
+
+    Frames are rendered in parallel across a pool of worker processes, and
+    streamed in order to ``ffmpeg``.
+
+    Parameters
+    ----------
+    variable : psipy.model.Variable
+        Variable to animate.
+    filename : str, pathlib.Path
+        Movie file to save to.
+    cut : {'radial', 'phi', 'equatorial'}
+        Type of cut to plot. These correspond to
+        `~psipy.model.Variable.plot_radial_cut`,
+        `~psipy.model.Variable.plot_phi_cut` and
+        `~psipy.model.Variable.plot_equatorial_cut`.
+    index : int, optional
+        Radial or phi index at which to slice the data. Must be given for
+        radial and phi cuts.
+    fps : float, optional
+        Frames per second of the movie.
+    figsize : tuple, optional
+        Figure size in inches. Defaults to the Matplotlib default.
+    dpi : float, optional
+        Figure resolution.
+    processes : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    frames_per_task : int, optional
+        Number of frames rendered by a worker process in one go.
+    codec : str, optional
+        Video codec. Defaults to ``rcParams['animation.codec']``.
+    extra_args : list of str, optional
+        Extra arguments passed to ``ffmpeg`` before the output filename.
+    kwargs :
+        Additional keyword arguments are passed to the plotting method.
+
+    Notes
+    -----
+    Unless colour limits are given, they are fixed to the limits of the first
+    frame, which is the same behaviour as animations created by the
+    plotting methods.
+    """
+    _check_cut(cut)
+    if index is None and cut != "equatorial":
+        raise ValueError(f"index must be given for a {cut} cut")
+    if variable.n_timesteps == 0:
+        raise ValueError(f"{variable.name} has no timesteps to animate")
+    if not FFMpegWriter.isAvailable():
+        raise RuntimeError("Saving animations requires ffmpeg to be installed")
+    if figsize is None:
+        figsize = rcParams["figure.figsize"]
+    codec = codec or rcParams["animation.codec"]
+    processes = processes or os.cpu_count()
+
+    first_frame = _get_frame(
+        _restrict_to_cut(variable, cut, index, [0]),
+        cut,
+        0,
+        _get_axes(cut, figsize, dpi),
+    )
+    kwargs = _colour_limit_kwargs(first_frame, kwargs)
+    tasks = (
+        (
+            _restrict_to_cut(variable, cut, index, range(start, stop)),
+            cut,
+            figsize,
+            dpi,
+            kwargs,
+        )
+        for start, stop in _chunks(variable.n_timesteps, frames_per_task)
+    )
+
+    proc = None
+    broken_pipe = False
+    try:
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker
+        ) as pool:
+            # Keep a bounded number of tasks in flight, so rendered frames
+            # don't pile up in memory if ffmpeg is slower than the workers
+            for size, frames in _bounded_map(
+                pool, _render_frames, tasks, 2 * processes
+            ):
+                if proc is None:
+                    args = _ffmpeg_args(filename, size, fps, codec, extra_args)
+                    proc = subprocess.Popen(
+                        args,
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.PIPE,
+                    )
+                try:
+                    for frame in frames:
+                        proc.stdin.write(frame)
+                except BrokenPipeError:
+                    # ffmpeg has exited early, and its error is raised below
+                    broken_pipe = True
+                    break
+    finally:
+        if proc is not None:
+            # Closes stdin, which lets ffmpeg finish writing the file
+            _, err = proc.communicate()
+
+    if proc is None:
+        raise RuntimeError("No frames were rendered")
+    if proc.returncode or broken_pipe:
+        raise RuntimeError(f"ffmpeg exited with code {proc.returncode}: {err.decode()}")
+
+
+@dataclass
+class RenderJob:
+    """
+    A single plot to render with `render_batch`.
+
+    Parameters
+    ----------
+    variable : psipy.model.Variable
+        Variable to plot.
+    cut : {'radial', 'phi', 'equatorial'}
+        Type of cut to plot.
+    index : int, optional
+        Radial or phi index at which to slice the data. Not needed for
+        equatorial cuts.
+    t_idx : int
+        Time index at which to slice the data.
+    filename : str, pathlib.Path
+        Image file to save the plot to.
+    """
+
+    variable: "Variable"
+    cut: str
+    index: Optional[int]
+    t_idx: int
+    filename: os.PathLike
+
+
+@dataclass
+class RenderReport:
+    """
+    Summary of a call to `render_batch`.
+    """
+
+    n_frames: int
+    seconds: float
+
+    @property
+    def fps(self) -> float:
+        """
+        Number of frames rendered per second.
+        """
+        return self.n_frames / self.seconds
+
+    def __str__(self):
+        return (
+            f"Rendered {self.n_frames} frames in {self.seconds:.2f} s "
+            f"({self.fps:.1f} frames per second)"
+        )
+
+
+def _render_files(variable, cut, jobs, figsize, dpi, kwargs):
+    """
+    Render a set of (time index, filename) jobs for a restricted variable.
+
+    This is run in worker processes. Where possible the same plot is updated
+    with new data for each job, instead of being created from scratch.
+    """
+    reusable = not any(k in kwargs for k in _clim_kwargs)
+    quad_mesh = None
+    quad_mesh_kwargs = {}
+    ax = _get_axes(cut, figsize, dpi)
+    for t_idx, filename in jobs:
+        level = None if quad_mesh is None else quad_mesh._lod_level
+        frame = _get_frame(variable, cut, t_idx, ax, level)
+        frame_kwargs = _colour_limit_kwargs(frame, kwargs)
+        if (
+            quad_mesh is None
+            or not reusable
+            or frame_kwargs.get("cmap") != quad_mesh_kwargs.get("cmap")
+        ):
+            if quad_mesh is not None:
+                ax = _get_axes(cut, figsize, dpi)
+            quad_mesh = _plot_cut(variable, cut, t_idx, ax, **frame_kwargs)
+            quad_mesh_kwargs = frame_kwargs
+        else:
+            quad_mesh.set_array(frame.T)
+            quad_mesh.set_clim(frame_kwargs.get("vmin"), frame_kwargs.get("vmax"))
+        ax.figure.savefig(filename)
+    return len(jobs)
+
+
+def _group_jobs(jobs, frames_per_task):
+    """
+    Group jobs into tasks that each plot a single cut of a single variable.
+    """
+    groups = {}
+    for job in jobs:
+        if not isinstance(job, RenderJob):
+            job = RenderJob(*job)
+        _check_cut(job.cut)
+        if job.index is None and job.cut != "equatorial":
+            raise ValueError(f"index must be given for a {job.cut} cut")
+        key = (id(job.variable), job.cut, job.index)
+        groups.setdefault(key, []).append(job)
+
+    for group in groups.values():
+        for start, stop in _chunks(len(group), frames_per_task):
+            yield group[start:stop]
+
+
+def render_batch(
+    jobs,
+    *,
+    figsize=None,
+    dpi=100,
+    processes=None,
+    frames_per_task=32,
+    **kwargs,
+) -> RenderReport:
+    """
+    Render a batch of plots to image files.
+
+    Plots are rendered across a pool of worker processes using the Agg
+    backend. Jobs that plot the same cut of the same variable are grouped
+    together, so only the data needed for that cut is sent to the workers, and
+    each worker re-uses its figure between plots.
+
+    Parameters
+    ----------
+    jobs : list of RenderJob
+        Plots to render. Tuples of ``(variable, cut, index, t_idx, filename)``
+        are also accepted.
+    figsize : tuple, optional
+        Figure size in inches. Defaults to the Matplotlib default.
+    dpi : float, optional
+        Figure resolution.
+    processes : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    frames_per_task : int, optional
+        Maximum number of plots rendered by a worker process in one go.
+    kwargs :
+        Additional keyword arguments are passed to the plotting methods.
+
+    Returns
+    -------
+    RenderReport
+        Number of plots rendered, and the time taken.
+    """
+    if figsize is None:
+        figsize = rcParams["figure.figsize"]
+    processes = processes or os.cpu_count()
+
+    def tasks():
+        for group in _group_jobs(jobs, frames_per_task):
+            job = group[0]
+            t_indices = sorted(set(j.t_idx for j in group))
+            variable = _restrict_to_cut(job.variable, job.cut, job.index, t_indices)
+            files = [(t_indices.index(j.t_idx), j.filename) for j in group]
+            yield variable, job.cut, files, figsize, dpi, kwargs
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        n_frames = sum(_bounded_map(pool, _render_files, tasks(), 2 * processes))
+    return RenderReport(n_frames, time.perf_counter() - start)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from psipy.visualization import prefetch_frames
+
+
+@pytest.fixture
+def time_slice():
+    data = np.random.default_rng(0).random((4, 3, 5))
+    return xr.DataArray(data, dims=["phi", "theta", "time"])
+
+
+def test_prefetch_frames(time_slice):
+    frames = list(prefetch_frames(time_slice, buffer_size=2))
+    assert len(frames) == 5
+    for i, frame in enumerate(frames):
+        np.testing.assert_equal(frame, time_slice.isel(time=i).values.T)
+
+
+def test_prefetch_frames_stop_early(time_slice):
+    # Check that stopping iteration before the end doesn't hang
+    for frame in prefetch_frames(time_slice, buffer_size=1):
+        break
@@ -0,0 +1,136 @@
+import sys
+
+import pytest
+from matplotlib.animation import FFMpegWriter
+
+from psipy.data import synthetic
+from psipy.model import MASOutput
+from psipy.visualization import (
+    RenderJob,
+    render_batch,
+    rendering,
+    save_animation,
+)
+from psipy.visualization.rendering import (
+    _get_axes,
+    _render_frames,
+    _restrict_to_cut,
+)
+
+cuts = [("radial", 0), ("phi", 0), ("equatorial", None)]
+
+
+@pytest.mark.parametrize("cut, index", cuts)
+def test_save_animation(mas_model, tmp_path, cut, index):
+    if not FFMpegWriter.isAvailable():
+        pytest.skip("ffmpeg is not available")
+    path = tmp_path / "animation.mp4"
+    save_animation(mas_model["rho"], path, cut, index, processes=2)
+    assert path.exists()
+
+
+def test_save_animation_errors(mas_model, tmp_path):
+    with pytest.raises(ValueError, match="cut must be one of"):
+        save_animation(mas_model["rho"], tmp_path / "a.mp4", "not_a_cut", 0)
+    with pytest.raises(ValueError, match="index must be given"):
+        save_animation(mas_model["rho"], tmp_path / "a.mp4", "radial")
+
+
+def test_save_animation_no_timesteps(synthetic_mas_directory, tmp_path):
+    rho = MASOutput(synthetic_mas_directory)["rho"]
+    no_timesteps = _restrict_to_cut(rho, "radial", 0, [])
+    with pytest.raises(ValueError, match="has no timesteps to animate"):
+        save_animation(no_timesteps, tmp_path / "a.mp4", "radial", 0)
+
+
+def test_save_animation_ffmpeg_error(synthetic_mas_directory, tmp_path, monkeypatch):
+    # Stand in for an ffmpeg that exits with an error before reading any frames
+    monkeypatch.setattr(FFMpegWriter, "isAvailable", classmethod(lambda cls: True))
+    monkeypatch.setattr(
+        rendering,
+        "_ffmpeg_args",
+        lambda *args: [
+            sys.executable,
+            "-c",
+            "import sys; sys.stderr.write('Unknown encoder'); sys.exit(1)",
+        ],
+    )
+    rho = MASOutput(synthetic_mas_directory)["rho"]
+    with pytest.raises(RuntimeError, match="exited with code 1: Unknown encoder"):
+        save_animation(rho, tmp_path / "a.mp4", "radial", 0, processes=1)
+
+
+def test_get_axes_main_process():
+    # Figures are only re-used in worker processes
+    ax1 = _get_axes("radial", (2, 2), 50)
+    ax2 = _get_axes("radial", (2, 2), 50)
+    assert ax1.figure is not ax2.figure
+    assert rendering._figures is None
+
+
+def test_render_batch(mas_model, tmp_path):
+    rho = mas_model["rho"]
+    jobs = [
+        RenderJob(rho, cut, index, 0, tmp_path / f"{cut}.png") for cut, index in cuts
+    ]
+    # Tuples should also work
+    jobs.append((rho, "radial", 1, 0, tmp_path / "radial_1.png"))
+
+    report = render_batch(jobs, processes=2)
+    assert report.n_frames == 4
+    assert report.fps > 0
+    assert "Rendered 4 frames" in str(report)
+    for job in jobs[:3]:
+        assert job.filename.exists()
+    assert (tmp_path / "radial_1.png").exists()
+
+
+def test_render_batch_errors(mas_model, tmp_path):
+    with pytest.raises(ValueError, match="index must be given"):
+        render_batch([(mas_model["rho"], "phi", None, 0, tmp_path / "phi.png")])
+
+
+@pytest.fixture(scope="module")
+def multi_timestep_rho(tmp_path_factory):
+    directory = synthetic.write_mas_run(
+        tmp_path_factory.mktemp("mas_synthetic"),
+        timesteps=[1, 2, 3],
+        variables=["rho"],
+    )
+    return MASOutput(directory)["rho"]
+
+
+def test_render_batch_small_figure(multi_timestep_rho, tmp_path):
+    # The data are downsampled, and adding a colorbar after the first frame
+    # shrinks the axes. Later frames should still be downsampled to the same
+    # shape as the first frame.
+    jobs = [
+        (multi_timestep_rho, cut, index, t_idx, tmp_path / f"{cut}_{t_idx}.png")
+        for cut, index in cuts
+        for t_idx in range(3)
+    ]
+    report = render_batch(jobs, figsize=(1.5, 1.5), dpi=50, processes=1)
+    assert report.n_frames == 9
+    for job in jobs:
+        assert job[-1].exists()
+
+
+@pytest.mark.parametrize("cut, index", cuts)
+def test_save_animation_small_figure(multi_timestep_rho, tmp_path, cut, index):
+    if not FFMpegWriter.isAvailable():
+        pytest.skip("ffmpeg is not available")
+    path = tmp_path / "animation.mp4"
+    save_animation(
+        multi_timestep_rho, path, cut, index, figsize=(1.5, 1.5), dpi=50, processes=1
+    )
+    assert path.exists()
+
+
+@pytest.mark.parametrize("cut, index", cuts)
+def test_render_frames_small_figure(multi_timestep_rho, cut, index):
+    # Frame rendering used by save_animation, which doesn't need ffmpeg
+    variable = _restrict_to_cut(multi_timestep_rho, cut, index)
+    (width, height), frames = _render_frames(variable, cut, (1.5, 1.5), 50, {})
+    assert (width, height) == (75, 75)
+    assert len(frames) == 3
+    assert all(len(frame) == width * height * 4 for frame in frames)